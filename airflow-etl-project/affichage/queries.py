@@ -0,0 +1,223 @@
+# --- REQUÊTES DU DASHBOARD ---
+# Filtres, pagination et statistiques sont calculés par la base (SQL) et non par
+# pandas : une page ne transfère que ``page_size`` lignes, quelle que soit la taille
+# de la table. La pagination est "par curseur" (keyset) : la page suivante reprend
+# après la dernière ligne affichée (date, nom) via l'index sur la date, au lieu d'un
+# OFFSET qui relirait toutes les lignes précédentes.
+#
+# Le dernier cours de chaque entreprise, les agrégats journaliers et la liste des
+# entreprises sont lus dans les tables de service (serving.py), rafraîchies à chaque
+# chargement : des lectures d'index au lieu d'agrégations sur la table brute.
+#
+# Ce module ne dépend pas de Streamlit : app.py met ces résultats en cache.
+
+import math
+import os
+
+import pandas as pd
+from sqlalchemy import Date, DateTime, bindparam, inspect, text
+
+from serving import daily_name, latest_name, serving_exists
+
+# Nombre de lignes par page
+PAGE_SIZE = int(os.getenv("DASHBOARD_PAGE_SIZE", "100"))
+
+
+def _quote(identifier):
+    """Entoure un identifiant SQL de guillemets (ex: 'date', 'open')."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def table_columns(engine, table_name):
+    """Colonnes de la table : [(nom, type SQL, numérique ?)] (vide si la table n'existe pas)."""
+    inspector = inspect(engine)
+    if not inspector.has_table(table_name):
+        return []
+    columns = []
+    for column in inspector.get_columns(table_name):
+        try:
+            numeric = column["type"].python_type in (int, float)
+        except NotImplementedError:
+            numeric = False
+        columns.append((column["name"], str(column["type"]), numeric))
+    return columns
+
+
+def _where(names=None, start=None, end=None, cursor=None):
+    """Clause WHERE (et paramètres) des filtres : entreprises, période [start, end], curseur."""
+    clauses, params, binds = [], {}, []
+    if names:
+        placeholders = []
+        for i, name in enumerate(names):
+            params[f"name_{i}"] = name
+            placeholders.append(f":name_{i}")
+        clauses.append(f"{_quote('name')} IN ({', '.join(placeholders)})")
+    if start is not None:
+        clauses.append(f"{_quote('date')} >= :start")
+        params["start"] = pd.Timestamp(start).to_pydatetime()
+        binds.append(bindparam("start", type_=DateTime()))
+    if end is not None:
+        # Fin incluse : toutes les lignes du dernier jour sélectionné
+        clauses.append(f"{_quote('date')} < :end")
+        params["end"] = (pd.Timestamp(end).normalize() + pd.Timedelta(days=1)).to_pydatetime()
+        binds.append(bindparam("end", type_=DateTime()))
+    if cursor is not None:
+        # Lignes strictement après le curseur dans l'ordre (date DESC, name DESC) ;
+        # la borne "date <= curseur" seule sert de condition d'index
+        clauses.append(
+            f"{_quote('date')} <= :cursor_date AND "
+            f"({_quote('date')} < :cursor_date OR {_quote('name')} < :cursor_name)"
+        )
+        params["cursor_date"] = pd.Timestamp(cursor[0]).to_pydatetime()
+        params["cursor_name"] = cursor[1]
+        binds.append(bindparam("cursor_date", type_=DateTime()))
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params, binds
+
+
+def fetch_page(engine, table_name, names=None, start=None, end=None, cursor=None, page_size=PAGE_SIZE):
+    """
+    Une page de la table, des lignes les plus récentes aux plus anciennes.
+
+    Args:
+        cursor (tuple): (date, nom) de la dernière ligne de la page précédente,
+            None pour la première page.
+
+    Returns:
+        pd.DataFrame: au plus ``page_size`` lignes.
+    """
+    where, params, binds = _where(names, start, end, cursor)
+    query = text(
+        f"SELECT * FROM {_quote(table_name)}{where} "
+        f"ORDER BY {_quote('date')} DESC, {_quote('name')} DESC LIMIT :limit"
+    ).bindparams(*binds)
+    params["limit"] = page_size
+    with engine.connect() as connection:
+        page = pd.read_sql_query(query, connection, params=params)
+    if "date" in page.columns:
+        page["date"] = pd.to_datetime(page["date"])
+    return page
+
+
+def page_cursor(page):
+    """Curseur de la page suivante (dernière ligne de ``page``), None si la page est vide."""
+    if page.empty:
+        return None
+    last = page.iloc[-1]
+    return (pd.Timestamp(last["date"]).isoformat(), last["name"])
+
+
+def summary_stats(engine, table_name, numeric_columns, names=None, start=None, end=None):
+    """
+    Statistiques descriptives calculées en une requête d'agrégation (équivalent de describe()).
+
+    L'écart-type vient de STDDEV_SAMP sous PostgreSQL. SQLite ne l'a pas : la variance y
+    est la moyenne des carrés des écarts à la moyenne (calculée par une sous-requête),
+    et non AVG(x²) - AVG(x)², qui perd toute précision sur des cours élevés et peu dispersés.
+
+    Returns:
+        (int, pd.DataFrame): nombre de lignes filtrées, statistiques (lignes count, mean,
+        std, min, max ; une colonne par colonne numérique).
+    """
+    where, params, binds = _where(names, start, end)
+    stddev = engine.dialect.name == "postgresql"
+    source = _quote(table_name)
+    aggregates = ["COUNT(*) AS total_rows"]
+    for i, column in enumerate(numeric_columns):
+        quoted = _quote(column)
+        aggregates += [
+            f"COUNT({quoted}) AS c{i}_count",
+            f"AVG({quoted}) AS c{i}_mean",
+            f"STDDEV_SAMP({quoted}) AS c{i}_std" if stddev
+            else f"AVG(({quoted} - m{i}) * ({quoted} - m{i})) AS c{i}_var",
+            f"MIN({quoted}) AS c{i}_min",
+            f"MAX({quoted}) AS c{i}_max",
+        ]
+    if not stddev and numeric_columns:
+        # Deuxième passage sur les mêmes lignes filtrées : les moyennes servent de centre
+        means = ", ".join(f"AVG({_quote(column)}) AS m{i}" for i, column in enumerate(numeric_columns))
+        source += f" CROSS JOIN (SELECT {means} FROM {_quote(table_name)}{where}) AS moments"
+    query = text(f"SELECT {', '.join(aggregates)} FROM {source}{where}").bindparams(*binds)
+    with engine.connect() as connection:
+        row = connection.execute(query, params).mappings().one()
+
+    stats = {}
+    for i, column in enumerate(numeric_columns):
+        count = row[f"c{i}_count"]
+        std = row[f"c{i}_std"] if stddev else None
+        if not stddev and count and count > 1:
+            # Variance corrigée (n - 1), comme pandas.describe()
+            std = math.sqrt(float(row[f"c{i}_var"]) * count / (count - 1))
+        stats[column] = {
+            "count": count,
+            "mean": row[f"c{i}_mean"],
+            "std": std,
+            "min": row[f"c{i}_min"],
+            "max": row[f"c{i}_max"],
+        }
+    frame = pd.DataFrame(stats, index=["count", "mean", "std", "min", "max"], dtype="float64")
+    return row["total_rows"], frame
+
+
+def distinct_names(engine, table_name):
+    """Entreprises présentes dans la table (options du filtre)."""
+    with engine.connect() as connection:
+        result = connection.execute(text(
+            f"SELECT DISTINCT {_quote('name')} FROM {_quote(table_name)} ORDER BY {_quote('name')}"
+        ))
+        return [name for (name,) in result if name is not None]
+
+
+def date_bounds(engine, table_name):
+    """Première et dernière date de la table (bornes du filtre de période)."""
+    with engine.connect() as connection:
+        first, last = connection.execute(text(
+            f"SELECT MIN({_quote('date')}), MAX({_quote('date')}) FROM {_quote(table_name)}"
+        )).one()
+    return (pd.Timestamp(first) if first is not None else None, pd.Timestamp(last) if last is not None else None)
+
+
+def serving_ready(engine, table_name):
+    """True si les tables de service de ``table_name`` existent (créées au premier chargement)."""
+    with engine.connect() as connection:
+        return all(serving_exists(connection, name) for name in (latest_name(table_name), daily_name(table_name)))
+
+
+def latest_quotes(engine, table_name, names=None):
+    """Dernier cours de chaque entreprise (une lecture de l'index unique par entreprise)."""
+    where, params, binds = _where(names)
+    query = text(
+        f"SELECT * FROM {_quote(latest_name(table_name))}{where} ORDER BY {_quote('name')}"
+    ).bindparams(*binds)
+    with engine.connect() as connection:
+        frame = pd.read_sql_query(query, connection, params=params)
+    if "date" in frame.columns:
+        frame["date"] = pd.to_datetime(frame["date"])
+    return frame
+
+
+def daily_aggregates(engine, table_name, names=None, start=None, end=None):
+    """
+    Agrégats journaliers (nombre de cours, plus bas, plus haut, moyenne, clôture) par
+    entreprise et par jour, sur la période [start, end] (bornes incluses).
+    """
+    where, params, binds = _where(names)
+    clauses = [where[len(" WHERE "):]] if where else []
+    if start is not None:
+        clauses.append("day >= :start")
+        params["start"] = pd.Timestamp(start).date()
+        binds.append(bindparam("start", type_=Date()))
+    if end is not None:
+        clauses.append("day <= :end")
+        params["end"] = pd.Timestamp(end).date()
+        binds.append(bindparam("end", type_=Date()))
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    query = text(
+        f"SELECT * FROM {_quote(daily_name(table_name))}{where} ORDER BY day, {_quote('name')}"
+    ).bindparams(*binds)
+    with engine.connect() as connection:
+        frame = pd.read_sql_query(query, connection, params=params)
+    for column in ("day", "last_at"):
+        if column in frame.columns:
+            frame[column] = pd.to_datetime(frame[column])
+    return frame
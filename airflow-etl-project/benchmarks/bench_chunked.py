@@ -0,0 +1,74 @@
+"""
+Benchmark du pipeline par morceaux (chunked.py) : pipeline d'un seul bloc
+(tous les cours, puis tout le DataFrame, puis le chargement) vs morceaux de
+--chunk-size entreprises chargés pendant le téléchargement des suivants.
+
+Faux fournisseur à latence injectable, base SQLite jetable ; affiche le temps
+total et le pic mémoire Python (tracemalloc) de chaque mode :
+
+    python benchmarks/bench_chunked.py --tickers 5000 --chunk-size 200
+"""
+import argparse
+import asyncio
+import logging
+import time
+import tracemalloc
+
+# fakes ajoute le dossier 'scripts_etl' au path
+from fakes import SyntheticQuoteProvider, synthetic_companies
+from run_benchmarks import ThrowawayDatabase
+
+from chunked import run_chunked  # noqa: E402
+from load import load_to_postgresql  # noqa: E402
+from provider_client import ProviderClient, TokenBucket  # noqa: E402
+from quotes import fetch_quotes  # noqa: E402
+from transform import transform  # noqa: E402
+
+TABLE = "bench_stock_prices"
+
+
+def client():
+    # Pas de limite de débit : seul le pipeline est mesuré
+    return ProviderClient(limiter=TokenBucket(rate=0))
+
+
+async def single_block(tickers, provider):
+    """Pipeline d'origine : chaque étape matérialise tout le résultat."""
+    records = await fetch_quotes(synthetic_companies(tickers), provider=provider, client=client())
+    load_to_postgresql(transform(records), TABLE, mode="replace")
+
+
+async def by_chunks(tickers, provider, chunk_size):
+    companies = iter(synthetic_companies(tickers))
+    await run_chunked(companies, TABLE, provider=provider, chunk_size=chunk_size, mode="replace", client=client())
+
+
+def measure(label, run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        asyncio.run(run())
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    print(f"  {label:>12} : {elapsed:6.2f} s  pic {peak / 1024 ** 2:7.1f} Mo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=5000, help="Nombre d'entreprises")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Entreprises par morceau")
+    parser.add_argument("--latency", type=float, default=0.002, help="Latence du fournisseur (s)")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    provider = SyntheticQuoteProvider(latency=args.latency)
+    print(f"Pipeline de {args.tickers} entreprises (morceaux de {args.chunk_size})")
+    with ThrowawayDatabase():
+        measure("un bloc", lambda: single_block(args.tickers, provider))
+        measure("morceaux", lambda: by_chunks(args.tickers, provider, args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
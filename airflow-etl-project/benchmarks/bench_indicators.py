@@ -0,0 +1,75 @@
+"""
+Benchmark des indicateurs techniques (indicators.py) : recalcul complet de
+l'historique (un processus, puis le pool de processus) vs run quotidien
+incrémental qui ne traite que la dernière barre de chaque entreprise.
+
+Historique synthétique (marches aléatoires) dans une base SQLite jetable :
+
+    python benchmarks/bench_indicators.py --tickers 200 --days 5000
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# fakes ajoute le dossier 'scripts_etl' au path
+import fakes  # noqa: F401
+from run_benchmarks import ThrowawayDatabase
+
+from indicators import update_indicators  # noqa: E402
+from load import load_to_postgresql  # noqa: E402
+from schema import STOCK_HISTORY_SCHEMA  # noqa: E402
+
+HISTORY = "bench_stock_history"
+TABLE = "bench_stock_indicators"
+
+
+def synthetic_history(tickers, dates):
+    rng = np.random.default_rng(0)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (tickers, len(dates))), axis=1))
+    return pd.DataFrame({
+        "name": np.repeat([f"T{i:04d}" for i in range(tickers)], len(dates)),
+        "date": np.tile(dates, tickers),
+        "close": closes.ravel(),
+    }).assign(open=lambda f: f["close"], high=lambda f: f["close"], low=lambda f: f["close"],
+              adj_close=lambda f: f["close"], volume=1000)
+
+
+def measure(label, run):
+    start = time.perf_counter()
+    summary = run()
+    print(f"  {label:>22} : {time.perf_counter() - start:6.2f} s  ({summary['rows']} lignes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=200, help="Nombre d'entreprises")
+    parser.add_argument("--days", type=int, default=5000, help="Jours de cotation par entreprise")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processus du recalcul complet")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    dates = pd.bdate_range("2005-01-03", periods=args.days + 1)
+    bars = synthetic_history(args.tickers, dates)
+    print(f"Indicateurs de {args.tickers} entreprises x {args.days} jours")
+    with ThrowawayDatabase(tables=(HISTORY, f"{HISTORY}_row_hashes", TABLE, f"{TABLE}_row_hashes")), \
+            tempfile.TemporaryDirectory() as tmp:
+        state_path = os.path.join(tmp, "state.json")
+        run = dict(table_name=TABLE, history_table=HISTORY, state_path=state_path)
+        load_to_postgresql(bars[bars["date"] < dates[-1]], HISTORY, "append", schema=STOCK_HISTORY_SCHEMA)
+
+        # Premier calcul : toutes les lignes sont écrites ; ensuite, les lignes inchangées ne le sont plus
+        measure("premier calcul", lambda: update_indicators(workers=args.workers, **run))
+        measure("complet, 1 processus", lambda: update_indicators(full=True, workers=1, **run))
+        measure(f"complet, {args.workers} processus", lambda: update_indicators(full=True, workers=args.workers, **run))
+
+        load_to_postgresql(bars[bars["date"] == dates[-1]], HISTORY, "append", schema=STOCK_HISTORY_SCHEMA)
+        measure("incrémental (1 jour)", lambda: update_indicators(**run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Benchmark du parsing de la page des entreprises : BeautifulSoup sur toute la page
+(parseur d'origine) vs lxml sur le seul tableau dont les en-têtes correspondent.
+
+Affiche le temps par page et le nombre d'entreprises trouvées par chaque backend,
+sur la page Wikipedia enregistrée (fixtures/cac40.html) :
+
+    python benchmarks/bench_parse.py --pages 50
+"""
+import argparse
+import os
+import sys
+import time
+
+# Ajouter le dossier 'scripts_etl' au path (comme les tests)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+from extract import CompanyScraper  # noqa: E402
+from html_tables import BACKENDS  # noqa: E402
+
+FIXTURE = os.path.join(PROJECT_ROOT, "benchmarks", "fixtures", "cac40.html")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20, help="Nombre d'analyses de la page par backend")
+    args = parser.parse_args()
+
+    with open(FIXTURE, encoding="utf-8") as f:
+        html = f.read()
+
+    print(f"Benchmark du parsing de {args.pages} pages ({len(html) / 1024:.0f} Ko chacune)")
+    for backend in BACKENDS:
+        scraper = CompanyScraper(parser=backend)
+        start = time.perf_counter()
+        for _ in range(args.pages):
+            companies = scraper._parse_html(html)
+        elapsed = time.perf_counter() - start
+        print(f"  {backend:>5} : {elapsed / args.pages * 1000:7.1f} ms/page  ({len(companies)} entreprises)")
+
+
+if __name__ == "__main__":
+    main()
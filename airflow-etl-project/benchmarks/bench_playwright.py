@@ -0,0 +1,132 @@
+"""
+Benchmark du scraping Playwright : mode d'origine (un Chromium par scraping, page
+chargée en entier, DOM complet sérialisé) vs mode allégé (navigateur partagé,
+images/CSS/polices bloquées, attente du DOM seulement, HTML du seul tableau).
+
+La page Wikipedia enregistrée (fixtures/cac40.html) est servie en local avec ses
+logos et sa feuille de style, chacun servi avec une latence (--latency) ; le
+benchmark affiche le temps par scraping, le nombre de requêtes et d'octets servis
+et la taille du HTML renvoyé à Python :
+
+    python benchmarks/bench_playwright.py --scrapes 5
+    PLAYWRIGHT_EXECUTABLE=/chemin/vers/chrome python benchmarks/bench_playwright.py
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from playwright.async_api import async_playwright
+
+# Ajouter le dossier 'scripts_etl' au path (comme les tests)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+from browser import PLAYWRIGHT_EXECUTABLE, LeanBrowser  # noqa: E402
+from extract import CompanyScraper  # noqa: E402
+from html_tables import CONSTITUENT_HEADERS  # noqa: E402
+
+FIXTURE = os.path.join(PROJECT_ROOT, "benchmarks", "fixtures", "cac40.html")
+
+
+class PageServer:
+    """Sert la page et ses ressources (logos, CSS) en local, en comptant requêtes et octets."""
+
+    def __init__(self, latency):
+        with open(FIXTURE, encoding="utf-8") as f:
+            page = f.read().replace("//upload.wikimedia.org/", "/img/")
+        self.page = page.encode("utf-8")
+        self.latency = latency
+        self.requests = 0
+        self.bytes = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/img/"):
+                    body, content_type = b"\x89PNG" + bytes(20_000), "image/png"
+                elif self.path.startswith("/w/load.php"):
+                    body, content_type = b"body { margin: 0 }\n" * 5_000, "text/css"
+                else:
+                    body, content_type = server.page, "text/html; charset=utf-8"
+                if content_type != "text/html; charset=utf-8":
+                    time.sleep(server.latency)
+                server.requests += 1
+                server.bytes += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/wiki/CAC_40"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def reset(self):
+        self.requests = self.bytes = 0
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+async def legacy_scrape(url):
+    """Scraping Playwright d'origine, conservé pour comparaison."""
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True, executable_path=PLAYWRIGHT_EXECUTABLE)
+        page = await browser.new_page()
+        try:
+            await page.goto(url)
+            return await page.content()
+        finally:
+            await browser.close()
+
+
+async def run(server, scrapes):
+    scraper = CompanyScraper(url=server.url)
+    lean = LeanBrowser()
+    modes = (
+        ("origine", lambda: legacy_scrape(server.url)),
+        ("allégé", lambda: lean.table_html(server.url, CONSTITUENT_HEADERS)),
+    )
+    try:
+        for label, scrape in modes:
+            server.reset()
+            start = time.perf_counter()
+            for _ in range(scrapes):
+                html = await scrape()
+            elapsed = time.perf_counter() - start
+            companies = len(scraper._parse_html(html))
+            print(
+                f"  {label:>8} : {elapsed / scrapes * 1000:7.0f} ms/scraping  "
+                f"{server.requests / scrapes:5.0f} requêtes  {server.bytes / scrapes / 1024:7.0f} Ko servis  "
+                f"HTML {len(html) / 1024:5.0f} Ko  ({companies} entreprises)"
+            )
+        print(f"  requêtes bloquées (allégé) : {lean.blocked_types}")
+    finally:
+        await lean.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scrapes", type=int, default=5, help="Nombre de scrapings par mode")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latence de chaque ressource (s)")
+    args = parser.parse_args()
+
+    server = PageServer(args.latency)
+    print(f"Benchmark de {args.scrapes} scrapings Playwright de {server.url}")
+    try:
+        asyncio.run(run(server, args.scrapes))
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark de la transformation : ancienne version (replace global + to_numeric
+colonne par colonne, float64/object) vs transformation typée par le schéma.
+
+Affiche le temps de transformation et la mémoire du DataFrame obtenu, pour une
+entrée en liste de dictionnaires (snapshots) et en DataFrame (historique) :
+
+    python benchmarks/bench_transform.py --rows 2000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Ajouter le dossier 'scripts_etl' au path (comme les tests)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+from transform import transform  # noqa: E402
+
+
+def legacy_transform(records):
+    """Transformation d'origine, conservée pour comparaison."""
+    df = pd.DataFrame(records)
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    df = df.replace("N/A", np.nan)
+    for col in ["price", "change", "open"]:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    df.reset_index(drop=True, inplace=True)
+    return df
+
+
+def make_records(rows, tickers=40):
+    """Enregistrements au format de l'extract, avec ~1% de valeurs 'N/A'."""
+    rng = np.random.default_rng(42)
+    prices = rng.uniform(10, 500, rows).round(2).tolist()
+    missing = rng.random(rows) < 0.01
+    dates = pd.date_range("2000-01-03", periods=rows // tickers + 1, freq="D")
+    return [
+        {
+            "name": f"Entreprise {i % tickers}",
+            "price": "N/A" if missing[i] else prices[i],
+            "change": prices[i] / 100,
+            "open": prices[i],
+            "date": dates[i // tickers],
+        }
+        for i in range(rows)
+    ]
+
+
+def make_frame(rows, tickers=40):
+    """Barres historiques déjà en DataFrame (float64/object), comme après un téléchargement."""
+    frame = pd.DataFrame(make_records(rows, tickers))
+    frame.loc[frame["price"] == "N/A", "price"] = np.nan
+    return frame.astype({"price": "float64"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Nombre d'enregistrements")
+    args = parser.parse_args()
+
+    inputs = (("liste de dictionnaires", make_records(args.rows)), ("DataFrame", make_frame(args.rows)))
+    print(f"Benchmark de la transformation de {args.rows} lignes")
+    for input_label, data in inputs:
+        print(f"Entrée : {input_label}")
+        for label, func in (("ancienne", legacy_transform), ("schéma", transform)):
+            start = time.perf_counter()
+            frame = func(data)
+            elapsed = time.perf_counter() - start
+            memory = frame.memory_usage(deep=True).sum() / 1024 ** 2
+            print(f"  {label:>8} : {elapsed:6.2f} s  ({args.rows / elapsed:,.0f} lignes/s)  {memory:8.1f} Mo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Données et fournisseurs synthétiques pour les benchmarks (aucun accès réseau).
+
+- ``synthetic_companies`` : entreprises avec un symbole déjà résolu,
+- ``synthetic_quotes`` : enregistrements au format de l'extract (tickers x jours),
+- ``SyntheticQuoteProvider`` : faux fournisseur de cours à latence injectable,
+- ``FIXTURES_DIR`` : pages HTML locales (copie hors-ligne de la page Wikipedia).
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Ajouter le dossier 'scripts_etl' au path (comme les tests)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+FIXTURES_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "fixtures")
+
+from quotes import QuoteProvider  # noqa: E402
+
+START_DATE = "2000-01-03"
+
+
+def read_fixture(name="cac40.html"):
+    """Contenu d'une page HTML locale du dossier fixtures."""
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def synthetic_companies(tickers):
+    """Entreprises fictives avec leur symbole (pas de résolution de ticker)."""
+    return [{"name": f"Entreprise {i:03d}", "sector": "Test", "symbol": f"T{i:03d}.PA"} for i in range(tickers)]
+
+
+def synthetic_quotes(tickers, days, missing_rate=0.01, seed=42):
+    """Enregistrements de cours (liste de dictionnaires) pour ``tickers`` x ``days`` jours ouvrés.
+
+    Reprend le format de l'extract : dates en Timestamp, 'N/A' pour les valeurs manquantes.
+    """
+    rng = np.random.default_rng(seed)
+    rows = tickers * days
+    prices = rng.uniform(10, 500, rows).round(2).tolist()
+    changes = rng.normal(0, 2, rows).round(3).tolist()
+    missing = (rng.random(rows) < missing_rate).tolist()
+    dates = list(pd.bdate_range(START_DATE, periods=days))
+    names = [company["name"] for company in synthetic_companies(tickers)]
+    return [
+        {
+            "name": names[i % tickers],
+            "price": "N/A" if missing[i] else prices[i],
+            "change": changes[i],
+            "open": prices[i],
+            "date": dates[i // tickers],
+        }
+        for i in range(rows)
+    ]
+
+
+class SyntheticQuoteProvider(QuoteProvider):
+    """Faux fournisseur de cours : valeurs déterministes, ``latency`` secondes par requête."""
+
+    def __init__(self, latency=0.0, supports_batch=False):
+        self.latency = latency
+        self.supports_batch = supports_batch
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    @staticmethod
+    def _quote(symbol):
+        price = 10.0 + sum(map(ord, symbol)) % 490
+        return {"price": price, "change": 0.5, "open": price - 0.5, "date": pd.Timestamp(START_DATE)}
+
+    def fetch_quote(self, symbol):
+        self._wait()
+        return self._quote(symbol)
+
+    def fetch_batch(self, symbols):
+        self._wait()
+        return {symbol: self._quote(symbol) for symbol in symbols}
+
+    def fetch_history(self, symbols, start, end):
+        self._wait()
+        days = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1))
+        prices = np.linspace(100.0, 110.0, len(days))
+        bars = pd.DataFrame(
+            {
+                "open": prices,
+                "high": prices + 1,
+                "low": prices - 1,
+                "close": prices + 0.5,
+                "adj_close": prices + 0.5,
+                "volume": np.full(len(days), 1000.0),
+            },
+            index=days,
+        )
+        return {symbol: bars for symbol in symbols}
@@ -0,0 +1,344 @@
+"""
+Suite de benchmarks hors-ligne de l'ETL (scraping, cours, transformation, chargement,
+staging Parquet).
+
+Chaque étape tourne sur des données synthétiques (tickers x jours), un faux
+fournisseur de cours à latence injectable, une page HTML locale et une base
+SQLite jetable (ou la base de --database-url, dont les tables de test sont recréées).
+Pour chaque étape : temps (meilleur de --repeat), débit en lignes/s et pic mémoire
+(tracemalloc, mesuré sur une exécution séparée).
+
+    python benchmarks/run_benchmarks.py                   # affiche les résultats
+    python benchmarks/run_benchmarks.py --check           # échoue si plus lent que baselines.json
+    python benchmarks/run_benchmarks.py --update-baseline # enregistre les résultats comme référence
+
+Une étape est en régression si son débit baisse ou si son pic mémoire augmente
+de plus de --tolerance (30 % par défaut) par rapport à la référence.
+
+Les débits de référence viennent d'une autre machine : chaque run chronomètre aussi
+une charge de calibration fixe, et le débit attendu est corrigé du rapport entre la
+calibration de la référence et celle du run (une machine deux fois plus lente doit
+tenir la moitié du débit de référence). La CI lance --check avec une tolérance plus
+large, pour le bruit des runners partagés.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from sqlalchemy import text
+
+# fakes ajoute le dossier 'scripts_etl' au path
+from fakes import SyntheticQuoteProvider, read_fixture, synthetic_companies, synthetic_quotes
+
+import db
+from backfill import backfill
+from extract import CompanyScraper
+from load import load_to_postgresql
+from provider_client import ProviderClient, TokenBucket
+from quotes import fetch_quotes
+from staging import read_dataset, write_dataset
+from transform import transform
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_TOLERANCE = 0.30
+# Écart absolu toléré sur le pic mémoire (les petites étapes varient de quelques centaines de Ko)
+MEMORY_SLACK_MB = 1.0
+# Étapes dont la durée dépend surtout de la latence injectée (--latency), pas de la
+# vitesse de la machine : leur débit de référence n'est pas corrigé par la calibration
+LATENCY_BOUND_STAGES = ("fetch",)
+
+
+# --- BASE JETABLE ---
+
+class ThrowawayDatabase:
+    """Base de test : fichier SQLite temporaire, ou base fournie dont les tables sont supprimées."""
+
+    def __init__(self, url=None, tables=(
+        "bench_stock_prices", "bench_stock_history", "bench_stock_prices_row_hashes", "bench_stock_history_row_hashes",
+    )):
+        self.url = url
+        self.tables = tables
+        self._path = None
+        self._previous_url = None
+
+    def __enter__(self):
+        self._previous_url = os.environ.get("DATABASE_URL")
+        if self.url is None:
+            fd, self._path = tempfile.mkstemp(suffix=".db", prefix="bench_")
+            os.close(fd)
+            os.environ["DATABASE_URL"] = f"sqlite:///{self._path}"
+        else:
+            os.environ["DATABASE_URL"] = self.url
+            self._drop_tables()
+        return self
+
+    def _drop_tables(self):
+        with db.get_engine().begin() as connection:
+            for table in self.tables:
+                connection.execute(text(f'DROP TABLE IF EXISTS "{table}"'))
+
+    def __exit__(self, *exc):
+        if self._path is None:
+            self._drop_tables()
+        db.dispose_engines()
+        if self._path is not None:
+            os.remove(self._path)
+        if self._previous_url is None:
+            os.environ.pop("DATABASE_URL", None)
+        else:
+            os.environ["DATABASE_URL"] = self._previous_url
+        return False
+
+
+# --- ÉTAPES ---
+# Chaque étape prépare ses données (hors mesure) et renvoie une fonction rejouable
+# qui exécute l'étape et renvoie le nombre de lignes traitées.
+
+def stage_scrape(config):
+    html = read_fixture()
+    scraper = CompanyScraper(url="file://fixtures/cac40.html")
+    pages = config["pages"]
+
+    def run():
+        return sum(len(scraper._parse_html(html)) for _ in range(pages))
+    return run
+
+
+def stage_fetch(config):
+    companies = synthetic_companies(config["tickers"])
+    provider = SyntheticQuoteProvider(latency=config["latency"])
+
+    def run():
+        # Débit illimité : l'étape mesure le moteur, pas le rythme imposé par PROVIDER_RATE
+        client = ProviderClient(limiter=TokenBucket(rate=0))
+        return len(asyncio.run(fetch_quotes(companies, provider=provider, client=client)))
+    return run
+
+
+def stage_transform(config):
+    records = synthetic_quotes(config["tickers"], config["days"])
+
+    def run():
+        return len(transform(records))
+    return run
+
+
+def stage_load(config):
+    frame = transform(synthetic_quotes(config["tickers"], config["days"]))
+
+    def run():
+        with ThrowawayDatabase(config["database_url"]):
+            load_to_postgresql(frame, "bench_stock_prices", mode="upsert")
+        return len(frame)
+    return run
+
+
+def stage_backfill(config):
+    companies = synthetic_companies(config["tickers"])
+    provider = SyntheticQuoteProvider(latency=config["latency"])
+    start = pd.Timestamp("2000-01-03")
+    end = pd.bdate_range(start, periods=config["days"])[-1] + pd.Timedelta(days=1)
+
+    def run():
+        with ThrowawayDatabase(config["database_url"]), tempfile.TemporaryDirectory() as staging_dir:
+            summary = asyncio.run(backfill(
+                companies, start, end, provider=provider, table_name="bench_stock_history", staging_dir=staging_dir,
+                client=ProviderClient(limiter=TokenBucket(rate=0)),
+            ))
+        return summary["rows"]
+    return run
+
+
+def stage_staging(config):
+    frame = transform(synthetic_quotes(config["tickers"], config["days"]))
+    names = sorted(frame["name"].unique())[: max(1, len(frame["name"].unique()) // 4)]
+
+    def run():
+        # Écriture partitionnée par jour, puis relecture d'un quart des entreprises sur 3 colonnes
+        with tempfile.TemporaryDirectory() as path:
+            write_dataset(path, frame, partition_by=("day",))
+            read_dataset(path, columns=["name", "date", "price"], filters=[("name", "in", names)])
+        return len(frame)
+    return run
+
+
+STAGES = {
+    "scrape": stage_scrape,
+    "fetch": stage_fetch,
+    "transform": stage_transform,
+    "load": stage_load,
+    "backfill": stage_backfill,
+    "staging": stage_staging,
+}
+
+
+# --- MESURE ---
+
+def _calibration_workload():
+    # Charge fixe représentative de l'ETL : boucle Python, construction et agrégation pandas
+    values = [(i * 7919) % 10007 for i in range(200_000)]
+    frame = pd.DataFrame({"key": [value % 97 for value in values], "value": values})
+    frame.groupby("key")["value"].sum()
+    sorted(values)
+
+
+def calibrate(repeat=5):
+    """Durée (s, meilleur de ``repeat``) de la charge de calibration : vitesse de la machine."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _calibration_workload()
+        timings.append(time.perf_counter() - start)
+    return round(min(timings), 4)
+
+
+def measure(run, repeat):
+    """Renvoie le nombre de lignes, le meilleur temps sur ``repeat`` exécutions et le pic mémoire (Mo)."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = run()
+        timings.append(time.perf_counter() - start)
+
+    # Exécution séparée pour la mémoire : tracemalloc ralentit le code Python
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = min(timings)
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+        "peak_mb": round(peak / 1024 ** 2, 2),
+    }
+
+
+def run_suite(config, stages=None, repeat=3):
+    """Exécute les étapes demandées (toutes par défaut) et renvoie {étape: mesures}."""
+    results = {}
+    for name in stages or STAGES:
+        results[name] = measure(STAGES[name](config), repeat)
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, calibration=None):
+    """Liste des régressions (messages) par rapport à la référence ``baseline``.
+
+    Avec ``calibration`` (durée de la charge de calibration sur cette machine) et une
+    référence calibrée, le débit de référence est ramené à la vitesse de cette machine.
+    """
+    speed = 1.0
+    if calibration and baseline.get("calibration_seconds"):
+        speed = baseline["calibration_seconds"] / calibration
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get("stages", {}).get(name)
+        if not reference:
+            continue
+        expected = reference["rows_per_sec"] * (1.0 if name in LATENCY_BOUND_STAGES else speed)
+        if current["rows_per_sec"] < expected * (1 - tolerance):
+            regressions.append(
+                f"{name} : débit {current['rows_per_sec']:,.0f} lignes/s "
+                f"< référence {expected:,.0f} lignes/s à la vitesse de cette machine "
+                f"(x{speed:.2f}, -{tolerance:.0%} toléré)"
+            )
+        if current["peak_mb"] > reference["peak_mb"] * (1 + tolerance) + MEMORY_SLACK_MB:
+            regressions.append(
+                f"{name} : pic mémoire {current['peak_mb']:.1f} Mo "
+                f"> référence {reference['peak_mb']:.1f} Mo (+{tolerance:.0%} toléré)"
+            )
+    return regressions
+
+
+def print_report(results, baseline=None):
+    print(f"{'étape':<10} {'lignes':>10} {'temps (s)':>10} {'lignes/s':>14} {'pic (Mo)':>10} {'réf. lignes/s':>14}")
+    for name, r in results.items():
+        reference = (baseline or {}).get("stages", {}).get(name, {}).get("rows_per_sec")
+        reference = f"{reference:,.0f}" if reference else "-"
+        print(f"{name:<10} {r['rows']:>10,} {r['seconds']:>10.3f} {r['rows_per_sec']:>14,.0f} {r['peak_mb']:>10.1f} {reference:>14}")
+    print(f"{'total':<10} {'':>10} {sum(r['seconds'] for r in results.values()):>10.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=40, help="Nombre de tickers synthétiques")
+    parser.add_argument("--days", type=int, default=250, help="Nombre de jours de cotation par ticker")
+    parser.add_argument("--pages", type=int, default=20, help="Nombre de pages HTML analysées (scrape)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latence du faux fournisseur (s/requête)")
+    parser.add_argument("--database-url", help="Base à utiliser au lieu d'un fichier SQLite jetable")
+    parser.add_argument("--stage", action="append", choices=list(STAGES), help="Étape(s) à exécuter (toutes par défaut)")
+    parser.add_argument("--repeat", type=int, default=3, help="Nombre d'exécutions chronométrées par étape")
+    parser.add_argument("--baseline", default=BASELINES_PATH, help="Fichier des mesures de référence")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Écart relatif toléré")
+    parser.add_argument("--check", action="store_true", help="Code de sortie 1 en cas de régression")
+    parser.add_argument("--update-baseline", action="store_true", help="Enregistre les résultats comme référence")
+    parser.add_argument("--json", help="Écrit les résultats dans ce fichier JSON")
+    parser.add_argument("--verbose", action="store_true", help="Affiche les logs de l'ETL")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    config = {
+        "tickers": args.tickers,
+        "days": args.days,
+        "pages": args.pages,
+        "latency": args.latency,
+        "database_url": args.database_url,
+    }
+    # La base utilisée ne fait pas partie de la configuration comparée
+    stored_config = {k: v for k, v in config.items() if k != "database_url"}
+    calibration = calibrate()
+    results = run_suite(config, args.stage, args.repeat)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != stored_config:
+            print(f"Configuration différente de la référence ({baseline.get('config')}), comparaison ignorée")
+            baseline = None
+
+    print_report(results, baseline)
+    reference_calibration = (baseline or {}).get("calibration_seconds")
+    print(f"calibration : {calibration:.4f} s" + (f" (référence {reference_calibration:.4f} s)" if reference_calibration else ""))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "calibration_seconds": calibration, "stages": results}, f, indent=2)
+
+    if args.update_baseline:
+        stored = {"config": stored_config, "calibration_seconds": calibration, "stages": results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(stored, f, indent=2)
+            f.write("\n")
+        print(f"Référence mise à jour : {args.baseline}")
+        return 0
+
+    if args.check:
+        if baseline is None:
+            print("ÉCHEC : aucune référence comparable, lancez --update-baseline", file=sys.stderr)
+            return 1
+        regressions = compare(results, baseline, args.tolerance, calibration)
+        if regressions:
+            print("\n!!! RÉGRESSION DE PERFORMANCE !!!", file=sys.stderr)
+            for message in regressions:
+                print(f"  - {message}", file=sys.stderr)
+            return 1
+        print("Aucune régression par rapport à la référence.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,9 @@
+import json
+
 from airflow import DAG
+from airflow.decorators import task
 from airflow.providers.docker.operators.docker import DockerOperator
+from docker.types import Mount
 from datetime import datetime, timedelta
 
 default_args = {
@@ -11,28 +15,135 @@ default_args = {
     "retry_delay": timedelta(minutes=5),
 }
 
+# Volumes persistants de l'ETL, partagés par tous les conteneurs :
+# - caches (liste des entreprises, index des tickers), qui survivent au conteneur
+#   supprimé après chaque run,
+# - zone de staging, par laquelle les tâches du pipeline se passent leurs résultats,
+# - métriques au format Prometheus (un fichier .prom par tâche), à exposer par le
+#   textfile collector de node_exporter.
+ETL_MOUNTS = [
+    Mount(source="etl_cache", target="/app/.cache", type="volume"),
+    Mount(source="etl_staging", target="/app/staging", type="volume"),
+    Mount(source="etl_metrics", target="/app/metrics", type="volume"),
+]
+
+# Paramètres communs à toutes les tâches conteneurisées
+ETL_CONTAINER = {
+    "image": "etl_image",
+    "docker_url": "unix://var/run/docker.sock",
+    "auto_remove": "success",
+    "network_mode": "airflow-etl-project_airflow_network",
+    "mount_tmp_dir": False,
+    "mounts": ETL_MOUNTS,
+    "environment": {"ETL_METRICS_TEXTFILE_DIR": "/app/metrics"},
+}
+
+# "python -u" force la sortie non mise en tampon,
+# afin que nous puissions voir les 'print' dans le log des tâches.
+PIPELINE = "python -u /app/pipeline.py"
+
+
+@task
+def shard_commands(scrape_output):
+    """Une commande fetch par shard, d'après le plan écrit par la tâche scrape (dernière ligne de sa sortie)."""
+    plan = json.loads(scrape_output)
+    return [f"{PIPELINE} fetch --run-id {plan['run_id']} --shard {shard}" for shard in plan["shards"]]
+
+
 with DAG(
     "etl_pipeline",
     default_args=default_args,
-    description="Pipeline ETL pour exécuter extract.py",
+    description="Pipeline ETL par étapes : scrape, fetch (par shard), transform, load",
     schedule_interval="@daily",
     start_date=datetime(2023, 1, 1),
     catchup=False,
 ) as dag:
 
-    etl_task = DockerOperator(
-        task_id="run_etl",
-        image="etl_image",
-        
-        # --- CORRECTION ---
-        # "python -u" force la sortie non mise en tampon,
-        # afin que nous puissions voir les 'print' dans ce log.
-        command="python -u /app/extract.py",
-        # --- FIN CORRECTION ---
-        
-        docker_url="unix://var/run/docker.sock",
-        auto_remove="success",
-        execution_timeout=timedelta(minutes=15),
-        network_mode="airflow-etl-project_airflow_network",
-        mount_tmp_dir=False,
-    )
\ No newline at end of file
+    # Liste des entreprises, découpée en shards de tickers (plan poussé en XCom)
+    scrape = DockerOperator(
+        task_id="scrape",
+        command=f"{PIPELINE} scrape --run-id {{{{ run_id }}}}",
+        execution_timeout=timedelta(minutes=5),
+        do_xcom_push=True,
+        **ETL_CONTAINER,
+    )
+
+    # Une tâche par shard (dynamic task mapping) : les shards tournent en parallèle
+    # sur les slots du LocalExecutor, et une relance ne refait que le shard en échec
+    fetch = DockerOperator.partial(
+        task_id="fetch",
+        execution_timeout=timedelta(minutes=10),
+        max_active_tis_per_dag=4,
+        do_xcom_push=False,
+        **ETL_CONTAINER,
+    ).expand(command=shard_commands(scrape.output))
+
+    transform = DockerOperator(
+        task_id="transform",
+        command=f"{PIPELINE} transform --run-id {{{{ run_id }}}}",
+        execution_timeout=timedelta(minutes=5),
+        do_xcom_push=False,
+        **ETL_CONTAINER,
+    )
+
+    load = DockerOperator(
+        task_id="load",
+        command=f"{PIPELINE} load --run-id {{{{ run_id }}}}",
+        execution_timeout=timedelta(minutes=10),
+        do_xcom_push=False,
+        **ETL_CONTAINER,
+    )
+
+    fetch >> transform >> load
+
+
+# Historique OHLCV, chaque nuit (minuit UTC, après la clôture) : chaque run reprend
+# à la dernière date chargée par entreprise, une relance ne refait que le manquant,
+# puis les indicateurs ne calculent que les barres du jour
+with DAG(
+    "etl_backfill",
+    default_args=default_args,
+    description="Chargement de l'historique journalier (backfill.py)",
+    schedule_interval="@daily",
+    start_date=datetime(2023, 1, 1),
+    catchup=False,
+    max_active_runs=1,
+) as backfill_dag:
+
+    backfill_task = DockerOperator(
+        task_id="run_backfill",
+        command="python -u /app/backfill.py",
+        execution_timeout=timedelta(hours=2),
+        **ETL_CONTAINER,
+    )
+
+    # Indicateurs techniques : seules les barres ajoutées par le backfill sont calculées
+    indicators_task = DockerOperator(
+        task_id="run_indicators",
+        command="python -u /app/indicators.py",
+        execution_timeout=timedelta(minutes=30),
+        **ETL_CONTAINER,
+    )
+
+    backfill_task >> indicators_task
+
+
+# Mode continu pendant la séance (stream.py) : un relevé par minute chargé en
+# micro-lots jusqu'à la clôture, le dashboard est notifié à chaque chargement
+with DAG(
+    "etl_intraday",
+    default_args=default_args,
+    description="Relevés des cours pendant la séance (stream.py)",
+    # Horaires Airflow en UTC : lancé avant l'ouverture (9h à Paris), du lundi au vendredi
+    schedule_interval="0 7 * * 1-5",
+    start_date=datetime(2023, 1, 1),
+    catchup=False,
+    max_active_runs=1,
+) as intraday_dag:
+
+    stream_task = DockerOperator(
+        task_id="run_stream",
+        command="python -u /app/stream.py --until 17:35",
+        execution_timeout=timedelta(hours=10),
+        **ETL_CONTAINER,
+    )
@@ -0,0 +1,296 @@
+# --- REPRISE DE L'HISTORIQUE (BACKFILL) ---
+# Télécharge les barres journalières OHLCV d'une période pour toutes les entreprises
+# et les charge dans une table de séries temporelles (stock_history) :
+# - requêtes groupées (lots de symboles) et concurrentes, découpées en fenêtres de dates,
+# - chaque morceau (un lot x une fenêtre) passe par transform puis est chargé (upsert,
+#   COPY) avant d'être libéré ; la file d'attente bornée limite la mémoire,
+# - reprise à partir de la dernière date chargée pour chaque entreprise,
+# - chaque morceau est aussi conservé en Parquet (partitionné par entreprise et par année) :
+#   --from-staging recharge l'historique en base sans rien retélécharger.
+#
+# Usage : python backfill.py --start 2005-01-01 [--end 2025-01-01] [--from-staging]
+
+import argparse
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from db import get_engine
+from extract import get_companies
+from load import _quote, load_to_postgresql
+from metrics import configure_metrics, get_metrics
+from provider_client import ProviderClient
+from quotes import YFinanceProvider, ticker_symbol
+from schema import STOCK_HISTORY_SCHEMA
+from staging import HISTORY_STAGING_DIR, iter_batches, write_dataset
+from transform import transform
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION (surchargeable par variables d'environnement) ---
+HISTORY_TABLE = os.getenv("HISTORY_TABLE", "stock_history")
+# Profondeur par défaut de l'historique (années)
+BACKFILL_YEARS = int(os.getenv("BACKFILL_YEARS", "20"))
+# Nombre de symboles par requête
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "10"))
+# Taille d'une fenêtre de dates (jours) : un morceau = un lot x une fenêtre
+BACKFILL_WINDOW_DAYS = int(os.getenv("BACKFILL_WINDOW_DAYS", str(5 * 365)))
+# Nombre maximal de requêtes simultanées (et de morceaux en attente de chargement)
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "4"))
+BACKFILL_TIMEOUT = float(os.getenv("BACKFILL_TIMEOUT", "120"))
+
+
+def last_loaded_dates(table_name=HISTORY_TABLE, engine=None):
+    """Dernière date chargée pour chaque entreprise ({nom: Timestamp}, vide si la table n'existe pas)."""
+    engine = engine or get_engine()
+    with engine.connect() as connection:
+        if not inspect(connection).has_table(table_name):
+            return {}
+        rows = connection.execute(text(
+            f"SELECT {_quote('name')}, MAX({_quote('date')}) FROM {_quote(table_name)} GROUP BY {_quote('name')}"
+        ))
+        return {name: pd.Timestamp(last) for name, last in rows if last is not None}
+
+
+def date_windows(start, end, window_days):
+    """Découpe [start, end[ en fenêtres successives d'au plus ``window_days`` jours."""
+    windows = []
+    step = pd.Timedelta(days=window_days)
+    while start < end:
+        windows.append((start, min(start + step, end)))
+        start += step
+    return windows
+
+
+def plan_batches(companies, start, end, last_dates, batch_size):
+    """
+    Groupe les entreprises à compléter en lots de ``batch_size`` symboles.
+
+    Chaque entreprise reprend au lendemain de sa dernière date chargée (``start`` si
+    elle n'a pas d'historique) ; celles déjà à jour sont écartées. Les entreprises
+    sont triées par date de reprise pour que les lots couvrent des périodes proches.
+
+    Returns:
+        list: [(date de début du lot, [(entreprise, date de reprise), ...]), ...]
+    """
+    todo = []
+    for company in companies:
+        last = last_dates.get(company.get("name"))
+        resume = max(start, last.normalize() + pd.Timedelta(days=1)) if last is not None else start
+        if resume < end:
+            todo.append((company, resume))
+    todo.sort(key=lambda item: item[1])
+    batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+    return [(batch[0][1], batch) for batch in batches]
+
+
+def history_frame(bars, batch):
+    """Assemble les barres d'un lot en un DataFrame long (une ligne par entreprise et par jour).
+
+    Les barres antérieures à la date de reprise d'une entreprise (déjà chargées) sont écartées.
+    """
+    frames = []
+    for company, resume in batch:
+        frame = bars.get(ticker_symbol(company))
+        if frame is None or frame.empty:
+            continue
+        frame = frame[frame.index >= resume].rename_axis("date").reset_index()
+        frame.insert(0, "name", company.get("name"))
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=list(STOCK_HISTORY_SCHEMA))
+    return pd.concat(frames, ignore_index=True).reindex(columns=list(STOCK_HISTORY_SCHEMA))
+
+
+def load_chunk(frame, table_name=HISTORY_TABLE, staging_dir=None):
+    """Transforme un morceau d'historique, le conserve en Parquet (si ``staging_dir``)
+    puis le charge en base (upsert sur (name, date))."""
+    data = transform(frame, schema=STOCK_HISTORY_SCHEMA)
+    if staging_dir and not data.empty:
+        # Un même morceau retéléchargé remplace ses fichiers précédents
+        basename = f"{data['name'].iloc[0]}-{data['date'].min():%Y%m%d}-{data['date'].max():%Y%m%d}"
+        write_dataset(staging_dir, data, partition_by=("name", "year"), basename=basename)
+    load_to_postgresql(data, table_name, mode="upsert", schema=STOCK_HISTORY_SCHEMA)
+    return len(data)
+
+
+def reload_from_staging(start=None, end=None, names=None, table_name=HISTORY_TABLE,
+                        staging_dir=None, batch_rows=200_000):
+    """
+    Recharge en base l'historique conservé en Parquet, sans appeler le fournisseur.
+
+    Seules les partitions utiles sont lues (entreprises ``names``, années de la période)
+    et les fichiers sont parcourus par morceaux de ``batch_rows`` lignes.
+
+    Returns:
+        int: nombre de lignes rechargées
+    """
+    filters = []
+    if start is not None:
+        start = pd.Timestamp(start)
+        filters += [("year", ">=", start.year), ("date", ">=", start)]
+    if end is not None:
+        end = pd.Timestamp(end)
+        filters += [("year", "<=", end.year), ("date", "<", end)]
+    if names:
+        filters.append(("name", "in", list(names)))
+
+    rows = 0
+    for frame in iter_batches(staging_dir or HISTORY_STAGING_DIR, list(STOCK_HISTORY_SCHEMA), filters, batch_rows):
+        rows += load_chunk(frame, table_name)
+    logger.info(f"{rows} lignes rechargées depuis le staging Parquet")
+    return rows
+
+
+async def backfill(
+    companies,
+    start=None,
+    end=None,
+    provider=None,
+    table_name=HISTORY_TABLE,
+    batch_size=None,
+    window_days=None,
+    concurrency=None,
+    timeout=None,
+    staging_dir=None,
+    client=None,
+):
+    """
+    Charge l'historique journalier des entreprises entre ``start`` (inclus) et ``end`` (exclu).
+
+    Les lots de symboles sont téléchargés en parallèle ; les fenêtres d'un même lot
+    le sont dans l'ordre chronologique, et un lot s'arrête à sa première fenêtre en
+    échec. La dernière date chargée reste ainsi un point de reprise fiable : le
+    prochain run repart du lendemain, sans trou.
+
+    Un seul chargeur consomme les morceaux via une file bornée à ``concurrency``
+    éléments : au plus ``2 x concurrency`` morceaux sont en mémoire à la fois.
+
+    Args:
+        companies (list): Entreprises (clés "name" et "symbol").
+        start, end: Période demandée (défaut : ``BACKFILL_YEARS`` ans jusqu'à aujourd'hui inclus).
+        provider (QuoteProvider): Fournisseur de barres (yfinance par défaut).
+        staging_dir (str): Dossier Parquet où conserver les morceaux
+            (``HISTORY_STAGING_DIR`` par défaut, "" pour ne rien conserver).
+        client (ProviderClient): Limiteur, relances et disjoncteur partagés par tous les lots.
+
+    Returns:
+        dict: {"rows": lignes chargées, "chunks": morceaux chargés, "failed": noms en échec}
+    """
+    provider = provider or YFinanceProvider()
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+    start = pd.Timestamp(start) if start is not None else end - pd.DateOffset(years=BACKFILL_YEARS)
+    batch_size = batch_size or BACKFILL_BATCH_SIZE
+    window_days = window_days or BACKFILL_WINDOW_DAYS
+    concurrency = max(1, concurrency or BACKFILL_CONCURRENCY)
+    timeout = timeout or BACKFILL_TIMEOUT
+    staging_dir = HISTORY_STAGING_DIR if staging_dir is None else staging_dir
+    client = client or ProviderClient()
+
+    batches = plan_batches(companies, start, end, last_loaded_dates(table_name), batch_size)
+    summary = {"rows": 0, "chunks": 0, "failed": []}
+    if not batches:
+        logger.info(f"Historique déjà à jour jusqu'au {end.date()} pour {len(companies)} entreprises")
+        return summary
+    logger.info(
+        f"Backfill de {sum(len(b) for _, b in batches)} entreprises en {len(batches)} lots "
+        f"(du {batches[0][0].date()} au {end.date()})"
+    )
+
+    metrics = get_metrics()
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="backfill")
+    queue = asyncio.Queue(maxsize=concurrency)
+
+    def fetch(symbols, window_start, window_end):
+        return asyncio.wait_for(
+            loop.run_in_executor(executor, provider.fetch_history, symbols, window_start, window_end),
+            timeout,
+        )
+
+    async def produce(batch_start, batch):
+        symbols = [ticker_symbol(company) for company, _ in batch]
+        for window_start, window_end in date_windows(batch_start, end, window_days):
+            try:
+                with metrics.span("backfill_window", size=len(symbols)) as span:
+                    bars = await client.call(
+                        lambda: fetch(symbols, window_start, window_end),
+                        f"lot {symbols[0]}... ({window_start.date()})",
+                        slots=semaphore,
+                    )
+                    span.set(rows=sum(len(frame) for frame in bars.values()))
+            except Exception as e:
+                # Les fenêtres suivantes ne sont pas demandées : le prochain run reprendra ici
+                names = [company.get("name") for company, _ in batch]
+                logger.error(f"Échec du lot {symbols} du {window_start.date()} au {window_end.date()} ({e!r})")
+                summary["failed"].extend(names)
+                return
+            frame = history_frame(bars, batch)
+            if not frame.empty:
+                await queue.put(frame)
+
+    async def consume():
+        while True:
+            frame = await queue.get()
+            if frame is None:
+                return
+            summary["rows"] += await asyncio.to_thread(load_chunk, frame, table_name, staging_dir)
+            summary["chunks"] += 1
+
+    producers = asyncio.ensure_future(asyncio.gather(*(produce(s, b) for s, b in batches)))
+    consumer = asyncio.ensure_future(consume())
+    try:
+        await asyncio.wait({producers, consumer}, return_when=asyncio.FIRST_COMPLETED)
+        if consumer.done():
+            # Le chargeur s'est arrêté sur une erreur : inutile de continuer à télécharger
+            consumer.result()
+        await producers
+        await queue.put(None)
+        await consumer
+    finally:
+        producers.cancel()
+        consumer.cancel()
+        executor.shutdown(wait=False)
+
+    logger.info(f"Backfill terminé : {summary['rows']} lignes en {summary['chunks']} morceaux")
+    if summary["failed"]:
+        logger.warning(f"{len(summary['failed'])} entreprises incomplètes (reprise au prochain run)")
+    return summary
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Charge l'historique journalier OHLCV des entreprises du CAC 40.")
+    parser.add_argument("--start", help="Date de début (incluse), par défaut il y a BACKFILL_YEARS ans")
+    parser.add_argument("--end", help="Date de fin (exclue), par défaut demain")
+    parser.add_argument("--table", default=HISTORY_TABLE, help="Table de destination")
+    parser.add_argument("--from-staging", action="store_true",
+                        help="Recharge l'historique conservé en Parquet, sans appeler le fournisseur")
+    args = parser.parse_args(argv)
+
+    if args.from_staging:
+        reload_from_staging(args.start, args.end, table_name=args.table)
+        return
+
+    companies = await get_companies()
+    if not companies:
+        logger.error("Aucune entreprise à compléter. Arrêt du programme.")
+        return
+    summary = await backfill(companies, start=args.start, end=args.end, table_name=args.table)
+    if summary["failed"]:
+        # Code de sortie non nul pour qu'Airflow relance la tâche (qui reprendra où elle s'est arrêtée)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    metrics = configure_metrics(job="backfill")
+    try:
+        asyncio.run(main())
+    finally:
+        metrics.flush()
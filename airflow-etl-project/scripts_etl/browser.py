@@ -0,0 +1,147 @@
+# --- NAVIGATEUR PLAYWRIGHT ALLÉGÉ ---
+# Le scraping Playwright d'origine lance un Chromium par run, charge toute la page
+# (images, CSS, polices) jusqu'à l'événement "load" puis sérialise tout le DOM.
+# Le mode allégé (PLAYWRIGHT_LEAN, par défaut) :
+# - garde un seul navigateur et un seul contexte par processus, réutilisés d'un scraping
+#   à l'autre (une page par scraping),
+# - intercepte les requêtes et abandonne images, médias, polices et feuilles de style,
+# - n'attend que le DOM ("domcontentloaded"), pas le chargement complet,
+# - ne renvoie que le HTML du tableau dont les en-têtes correspondent, extrait dans la page.
+
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION (variables d'environnement) ---
+PLAYWRIGHT_LEAN = os.getenv("PLAYWRIGHT_LEAN", "1").lower() in ("1", "true", "yes")
+# Types de ressources (request.resource_type) jamais téléchargés en mode allégé
+PLAYWRIGHT_BLOCKED = frozenset(
+    os.getenv("PLAYWRIGHT_BLOCKED", "image,media,font,stylesheet").replace(" ", "").split(",")
+) - {""}
+# Chromium à utiliser à la place de celui installé par "playwright install"
+PLAYWRIGHT_EXECUTABLE = os.getenv("PLAYWRIGHT_EXECUTABLE") or None
+PLAYWRIGHT_WAIT_UNTIL = os.getenv("PLAYWRIGHT_WAIT_UNTIL", "domcontentloaded")
+
+# Exécuté dans la page : HTML du premier <table> de premier niveau dont la première
+# ligne contient un libellé de chaque groupe (même normalisation que html_tables.normalize)
+_TABLE_SCRIPT = """
+(groups) => {
+    const normalize = (text) => (text || "").normalize("NFKD").replace(/[\\u0300-\\u036f]/g, "")
+        .toLowerCase().split(/\\s+/).filter(Boolean).join(" ");
+    for (const table of document.querySelectorAll("table")) {
+        if (table.parentElement && table.parentElement.closest("table")) continue;
+        const head = normalize(table.rows.length ? table.rows[0].textContent : "");
+        if (groups.every((labels) => labels.some((label) => head.includes(label)))) {
+            return table.outerHTML;
+        }
+    }
+    return null;
+}
+"""
+
+
+def should_block(resource_type, blocked=None):
+    """True si une requête de ce type est abandonnée en mode allégé."""
+    return resource_type in (PLAYWRIGHT_BLOCKED if blocked is None else blocked)
+
+
+class LeanBrowser:
+    """
+    Navigateur Chromium partagé : lancé au premier scraping, réutilisé ensuite.
+
+    Le navigateur appartient à la boucle asyncio qui l'a lancé ; appelé depuis une
+    autre boucle (nouvel ``asyncio.run``), il est relancé. ``blocked_types`` compte
+    les requêtes abandonnées par type, pour vérifier ce qui n'est plus téléchargé.
+    """
+
+    def __init__(self, blocked=None, executable_path=None, wait_until=None):
+        self.blocked = PLAYWRIGHT_BLOCKED if blocked is None else frozenset(blocked)
+        self.executable_path = executable_path or PLAYWRIGHT_EXECUTABLE
+        self.wait_until = wait_until or PLAYWRIGHT_WAIT_UNTIL
+        self.blocked_types = {}
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._loop = None
+        self._lock = asyncio.Lock()
+
+    async def _route(self, route):
+        resource_type = route.request.resource_type
+        if should_block(resource_type, self.blocked):
+            self.blocked_types[resource_type] = self.blocked_types.get(resource_type, 0) + 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def context(self):
+        """Contexte partagé (lancé au premier appel dans la boucle courante)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Navigateur d'une boucle terminée : inutilisable, on en relance un
+            self._playwright = self._browser = self._context = None
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        async with self._lock:
+            if self._context is None:
+                # Importé au premier lancement : coûteux, inutile si Playwright ne sert pas
+                from playwright.async_api import async_playwright
+
+                self._playwright = await async_playwright().start()
+                try:
+                    self._browser = await self._playwright.chromium.launch(
+                        headless=True, executable_path=self.executable_path,
+                    )
+                    context = await self._browser.new_context()
+                    if self.blocked:
+                        await context.route("**/*", self._route)
+                except BaseException:
+                    # Lancement impossible (Chromium absent...) : rien ne reste ouvert
+                    await self.close()
+                    raise
+                self._context = context
+                logger.info(f"Navigateur Playwright lancé (ressources bloquées : {sorted(self.blocked)})")
+        return self._context
+
+    async def table_html(self, url, required):
+        """
+        HTML du tableau de ``url`` dont les en-têtes correspondent à ``required``
+        (groupes de libellés normalisés, cf. html_tables), None si aucun ne correspond.
+        """
+        context = await self.context()
+        page = await context.new_page()
+        try:
+            await page.goto(url, wait_until=self.wait_until)
+            return await page.evaluate(_TABLE_SCRIPT, [list(labels) for labels in required])
+        finally:
+            await page.close()
+
+    async def close(self):
+        """Ferme le navigateur (sans effet s'il n'a pas été lancé dans cette boucle)."""
+        if self._loop is not asyncio.get_running_loop() or self._playwright is None:
+            return
+        try:
+            if self._browser is not None:
+                await self._browser.close()
+        finally:
+            playwright, self._playwright, self._browser, self._context = self._playwright, None, None, None
+            await playwright.stop()
+
+
+_browser = None
+
+
+def get_browser():
+    """Navigateur partagé du processus."""
+    global _browser
+    if _browser is None:
+        _browser = LeanBrowser()
+    return _browser
+
+
+async def close_browser():
+    """Ferme le navigateur partagé, s'il a été lancé (fin du scraping du processus)."""
+    if _browser is not None:
+        await _browser.close()
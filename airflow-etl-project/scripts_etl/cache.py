@@ -0,0 +1,97 @@
+# --- CACHE DE LA LISTE DES ENTREPRISES ---
+# La composition du CAC 40 ne change que quelques fois par an : la liste parsée est
+# gardée sur disque avec les en-têtes de validation HTTP (ETag / Last-Modified).
+# Tant que le TTL est valide, ou que le serveur répond 304 Not Modified,
+# l'étape de scraping ne télécharge ni ne parse la page (et ne lance aucun navigateur).
+
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION (variables d'environnement) ---
+CACHE_DIR = os.getenv("ETL_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+CACHE_PATH = os.getenv("CONSTITUENTS_CACHE_PATH", os.path.join(CACHE_DIR, "constituents.json"))
+CACHE_TTL = float(os.getenv("CONSTITUENTS_CACHE_TTL", str(24 * 3600)))
+FORCE_REFRESH = os.getenv("CONSTITUENTS_FORCE_REFRESH", "0").lower() in ("1", "true", "yes")
+
+# En dessous de ce nombre d'entreprises, une liste est jugée incomplète (page mal parsée)
+MIN_COMPANIES = int(os.getenv("CONSTITUENTS_MIN_COUNT", "10"))
+
+
+class ConstituentCache:
+    """
+    Cache disque (JSON) d'une liste d'entreprises scrapée depuis une URL.
+
+    Une entrée contient : url, companies, etag, last_modified, fetched_at.
+    Une entrée illisible, d'une autre URL ou trop courte est ignorée.
+    """
+
+    def __init__(self, path=None, ttl=None, min_companies=None):
+        self.path = path or CACHE_PATH
+        self.ttl = CACHE_TTL if ttl is None else ttl
+        self.min_companies = MIN_COMPANIES if min_companies is None else min_companies
+
+    def is_valid(self, companies):
+        """Vérifie qu'une liste d'entreprises est plausible avant de la servir ou de la stocker."""
+        return (
+            isinstance(companies, list)
+            and len(companies) >= self.min_companies
+            and all(isinstance(c, dict) and c.get("name") for c in companies)
+        )
+
+    def load(self, url):
+        """Renvoie l'entrée du cache pour cette URL, ou None si absente ou invalide."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache illisible ({self.path}) : {e}")
+            return None
+
+        if entry.get("url") != url or not self.is_valid(entry.get("companies")):
+            logger.warning(f"Cache ignoré ({self.path}) : entrée invalide ou d'une autre URL")
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        """True si l'entrée a été validée il y a moins de ``ttl`` secondes."""
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    @staticmethod
+    def validators(entry):
+        """En-têtes de requête conditionnelle (If-None-Match / If-Modified-Since)."""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def save(self, url, companies, etag=None, last_modified=None):
+        """Écrit l'entrée sur disque (écriture atomique : fichier temporaire puis rename)."""
+        if not self.is_valid(companies):
+            logger.warning(f"Liste de {len(companies or [])} entreprises non mise en cache (jugée incomplète)")
+            return None
+        entry = {
+            "url": url,
+            "companies": companies,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        return entry
+
+    def touch(self, entry):
+        """Marque l'entrée comme revalidée (réponse 304) : le TTL repart de zéro."""
+        return self.save(entry["url"], entry["companies"], entry.get("etag"), entry.get("last_modified"))
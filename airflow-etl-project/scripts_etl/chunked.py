@@ -0,0 +1,150 @@
+# --- PIPELINE PAR MORCEAUX (MÉMOIRE BORNÉE) ---
+# Variante du pipeline d'extract.py où rien n'est matérialisé en entier :
+# - les entreprises sont consommées ETL_CHUNK_SIZE par ETL_CHUNK_SIZE (n'importe quel
+#   itérable, y compris un générateur),
+# - les cours d'un morceau sont récupérés (en concurrence), transformés puis déposés
+#   dans une file bornée à ETL_MAX_PENDING_CHUNKS morceaux,
+# - le chargeur consomme la file pendant que les morceaux suivants sont téléchargés :
+#   les écritures commencent avant la fin du fetch (réseau et base se recouvrent).
+#
+# Au plus ETL_MAX_PENDING_CHUNKS + 2 morceaux sont en mémoire (un en téléchargement,
+# ceux de la file, un en chargement). Au-delà de ETL_MEMORY_LIMIT_MB de mémoire
+# résidente, le téléchargement attend que la file soit vidée. Le pic mémoire est
+# journalisé en fin de run et renvoyé dans le résumé.
+#
+# Les tables de service du dashboard (serving.py) sont rafraîchies une seule fois, en
+# fin de run, et non après chaque morceau.
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from load import LOAD_MODE, load_to_postgresql, refresh_serving_tables
+from metrics import get_metrics, memory_mb
+from provider_client import ProviderClient
+from quotes import DEFAULT_CONCURRENCY, YFinanceProvider, fetch_quotes
+from transform import transform
+
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION (surchargeable par variables d'environnement) ---
+# Entreprises par morceau (0 = pipeline d'un seul bloc dans extract.py)
+CHUNK_SIZE = int(os.getenv("ETL_CHUNK_SIZE", "0"))
+# Morceaux transformés en attente de chargement
+MAX_PENDING_CHUNKS = int(os.getenv("ETL_MAX_PENDING_CHUNKS", "2"))
+# Mémoire résidente (Mo) au-delà de laquelle le téléchargement attend le chargeur (0 = sans limite)
+MEMORY_LIMIT_MB = float(os.getenv("ETL_MEMORY_LIMIT_MB", "0"))
+
+
+def chunked(iterable, size):
+    """Découpe ``iterable`` en listes de ``size`` éléments, sans le lire en entier."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def chunk_modes(mode):
+    """Mode du premier morceau et des suivants : "replace" ne vide la table qu'une fois."""
+    return (mode, "append") if mode == "replace" else (mode, mode)
+
+
+async def run_chunked(
+    companies,
+    table_name="stock_prices",
+    provider=None,
+    chunk_size=None,
+    max_pending=None,
+    memory_limit_mb=None,
+    mode=None,
+    client=None,
+):
+    """
+    Récupère, transforme et charge les cours morceau par morceau.
+
+    Args:
+        companies (iterable): Entreprises (clés "name" et "symbol").
+        provider (QuoteProvider): Fournisseur de cours (yfinance par défaut).
+        chunk_size (int): Entreprises par morceau (``CHUNK_SIZE``, 20 si non configuré).
+        max_pending (int): Morceaux en attente de chargement (``MAX_PENDING_CHUNKS``).
+        memory_limit_mb (float): Mémoire résidente au-delà de laquelle le téléchargement
+            attend le chargeur (``MEMORY_LIMIT_MB``, 0 = sans limite).
+        mode (str): Mode de chargement (``load.LOAD_MODE`` par défaut).
+        client (ProviderClient): Limiteur, relances et disjoncteur partagés par tous les morceaux.
+
+    Returns:
+        dict: {"chunks", "rows", "max_rows" (lignes au plus en mémoire), "peak_mb"}
+    """
+    provider = provider or YFinanceProvider()
+    chunk_size = max(1, chunk_size or CHUNK_SIZE or 20)
+    max_pending = max(1, max_pending or MAX_PENDING_CHUNKS)
+    memory_limit_mb = MEMORY_LIMIT_MB if memory_limit_mb is None else memory_limit_mb
+    first_mode, next_mode = chunk_modes(mode or LOAD_MODE)
+    client = client or ProviderClient()
+
+    summary = {"chunks": 0, "rows": 0, "max_rows": (max_pending + 2) * chunk_size, "peak_mb": 0.0}
+    logger.info(
+        f"Pipeline par morceaux de {chunk_size} entreprises, {max_pending} en attente au plus "
+        f"(≤ {summary['max_rows']} lignes en mémoire)"
+    )
+
+    metrics = get_metrics()
+    queue = asyncio.Queue(maxsize=max_pending)
+    # Un seul pool de threads pour tous les morceaux
+    executor = ThreadPoolExecutor(max_workers=max(1, DEFAULT_CONCURRENCY), thread_name_prefix="chunks")
+
+    async def produce():
+        for batch in chunked(companies, chunk_size):
+            if memory_limit_mb and memory_mb()[0] > memory_limit_mb and not queue.empty():
+                logger.warning(f"Mémoire au-delà de {memory_limit_mb:.0f} Mo : attente du chargeur")
+                await queue.join()
+            with metrics.span("chunk_fetch") as span:
+                records = await fetch_quotes(batch, provider=provider, client=client, executor=executor)
+                frame = transform(records)
+                span.set(rows=len(frame))
+            await queue.put(frame)
+
+    async def consume():
+        while True:
+            frame = await queue.get()
+            try:
+                if frame is None:
+                    return
+                load_mode = first_mode if summary["chunks"] == 0 else next_mode
+                await asyncio.to_thread(load_to_postgresql, frame, table_name, load_mode, refresh=False)
+                summary["chunks"] += 1
+                summary["rows"] += len(frame)
+            finally:
+                queue.task_done()
+
+    with metrics.span("chunked_pipeline", table=table_name) as span:
+        producer = asyncio.ensure_future(produce())
+        consumer = asyncio.ensure_future(consume())
+        try:
+            await asyncio.wait({producer, consumer}, return_when=asyncio.FIRST_COMPLETED)
+            if consumer.done():
+                # Le chargeur s'est arrêté sur une erreur : inutile de continuer à télécharger
+                consumer.result()
+            await producer
+            await queue.put(None)
+            await consumer
+        finally:
+            producer.cancel()
+            consumer.cancel()
+            executor.shutdown(wait=False)
+            # Aussi après un échec : les morceaux déjà chargés sont validés en base
+            if summary["chunks"]:
+                await asyncio.to_thread(refresh_serving_tables, table_name)
+        summary["peak_mb"] = memory_mb()[1]
+        span.set(rows=summary["rows"], chunks=summary["chunks"])
+
+    logger.info(
+        f"{summary['rows']} lignes chargées en {summary['chunks']} morceaux, "
+        f"pic mémoire {summary['peak_mb']:.0f} Mo"
+    )
+    return summary
@@ -0,0 +1,274 @@
+# --- GESTION DES CONNEXIONS À LA BASE DE DONNÉES ---
+# Module partagé par l'ETL (load.py) et le dashboard (affichage/app.py) :
+# un engine SQLAlchemy unique par processus et par URL, avec un pool de connexions
+# réglable, une sonde de disponibilité qui réutilise ce pool, le filigrane
+# ("dernier chargement") écrit par le loader et lu par le dashboard, et la
+# notification (LISTEN/NOTIFY) envoyée à chaque chargement sous PostgreSQL.
+
+import json
+import logging
+import os
+import select
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, bindparam, create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION (variables d'environnement) ---
+DB_HOST = os.getenv("DB_HOST", "postgres")
+DB_PORT = os.getenv("DB_PORT", "5432")
+DB_NAME = os.getenv("DB_NAME", "airflow")
+DB_USER = os.getenv("DB_USER", "airflow")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "airflow")
+
+DEFAULT_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Réglages du pool : connexions gardées ouvertes, connexions supplémentaires
+# autorisées en pic, durée de vie maximale d'une connexion (secondes)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Table des filigranes de chargement (une ligne par table chargée)
+WATERMARK_TABLE = "etl_watermarks"
+# Canal PostgreSQL (NOTIFY) signalant chaque chargement au dashboard
+LOAD_CHANNEL = os.getenv("ETL_NOTIFY_CHANNEL", "etl_loads")
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_database_url() -> str:
+    """URL de connexion (lue à chaque appel pour suivre l'environnement courant)."""
+    return os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+
+def safe_url(url: str) -> str:
+    """URL affichable dans les logs (mot de passe masqué)."""
+    return make_url(url).render_as_string(hide_password=True)
+
+
+def get_engine(url: str = None):
+    """Renvoie l'engine partagé du processus pour cette URL (créé au premier appel).
+
+    Tous les appels (runs ETL, reruns Streamlit, sessions concurrentes) réutilisent
+    le même pool au lieu d'ouvrir de nouvelles connexions TCP à chaque fois.
+    """
+    url = url or get_database_url()
+    engine = _engines.get(url)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(url)
+            if engine is None:
+                options = {"pool_pre_ping": True, "pool_recycle": DB_POOL_RECYCLE}
+                # SQLite (tests, benchmarks) n'utilise pas de QueuePool
+                if make_url(url).get_backend_name() != "sqlite":
+                    options.update(
+                        pool_size=DB_POOL_SIZE,
+                        max_overflow=DB_MAX_OVERFLOW,
+                        pool_timeout=DB_POOL_TIMEOUT,
+                    )
+                engine = create_engine(url, **options)
+                _engines[url] = engine
+                logger.info(f"Engine créé pour {safe_url(url)}")
+    return engine
+
+
+def dispose_engines() -> None:
+    """Ferme tous les pools (fin de processus, tests)."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+def database_ready(engine=None, timeout: float = 60.0, interval: float = 0.5, max_interval: float = 5.0) -> bool:
+    """Sonde de disponibilité : exécute SELECT 1 sur une connexion du pool partagé.
+
+    Quand la base est prête, la sonde coûte un aller-retour sur une connexion déjà
+    ouverte. Sinon, elle réessaie avec un délai croissant jusqu'à ``timeout`` secondes.
+    """
+    engine = engine or get_engine()
+    deadline = time.monotonic() + timeout
+    delay = interval
+    attempt = 0
+
+    while True:
+        attempt += 1
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            if attempt > 1:
+                logger.info("Base de données connectée avec succès!")
+            return True
+        except Exception as e:
+            if time.monotonic() + delay > deadline:
+                logger.error(f"Base de données indisponible après {attempt} tentatives : {e}")
+                return False
+            logger.warning(
+                f"Tentative {attempt}: la base de données n'est pas encore prête ({e}). "
+                f"Nouvelle tentative dans {delay:.1f} secondes..."
+            )
+            time.sleep(delay)
+            delay = min(delay * 2, max_interval)
+
+
+# --- FILIGRANE DE CHARGEMENT ---
+# À chaque chargement, le loader incrémente la version de la table chargée, dans la
+# même transaction que les données. Le dashboard utilise cette version comme clé de
+# cache : ses résultats restent valides exactement jusqu'au chargement suivant.
+
+def write_watermark(connection, table_name: str, rows: int) -> None:
+    """Incrémente le filigrane de ``table_name`` (à appeler dans la transaction du chargement)."""
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} ("
+        "table_name VARCHAR(255) PRIMARY KEY, "
+        "version BIGINT NOT NULL, "
+        "rows_loaded BIGINT, "
+        "loaded_at TIMESTAMP NOT NULL)"
+    ))
+    connection.execute(
+        text(
+            f"INSERT INTO {WATERMARK_TABLE} (table_name, version, rows_loaded, loaded_at) "
+            "VALUES (:table_name, 1, :rows, :loaded_at) "
+            "ON CONFLICT (table_name) DO UPDATE SET "
+            f"version = {WATERMARK_TABLE}.version + 1, "
+            "rows_loaded = EXCLUDED.rows_loaded, "
+            "loaded_at = EXCLUDED.loaded_at"
+        ).bindparams(bindparam("loaded_at", type_=DateTime())),
+        {"table_name": table_name, "rows": rows, "loaded_at": datetime.now(timezone.utc).replace(tzinfo=None)},
+    )
+    if connection.dialect.name == "postgresql":
+        # Délivré par PostgreSQL au COMMIT seulement (jamais si le chargement est annulé)
+        connection.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": LOAD_CHANNEL, "payload": json.dumps({"table": table_name, "rows": rows})},
+        )
+
+
+def read_watermark(table_name: str, engine=None):
+    """Filigrane de ``table_name`` : {"version", "rows_loaded", "loaded_at"}, ou None
+    si la table n'a jamais été chargée (ou a été chargée avant l'ajout des filigranes)."""
+    engine = engine or get_engine()
+    try:
+        with engine.connect() as connection:
+            row = connection.execute(
+                text(
+                    f"SELECT version, rows_loaded, loaded_at FROM {WATERMARK_TABLE} WHERE table_name = :table_name"
+                ).columns(loaded_at=DateTime()),
+                {"table_name": table_name},
+            ).mappings().first()
+    except DBAPIError:
+        # Table des filigranes pas encore créée (aucun chargement)
+        return None
+    return dict(row) if row else None
+
+
+# --- ÉCOUTE DES CHARGEMENTS (LISTEN) ---
+# Le dashboard garde une connexion dédiée en LISTEN sur LOAD_CHANNEL : il apprend
+# qu'une table a été chargée sans interroger la base à intervalle régulier.
+
+class LoadListener:
+    """
+    Écoute les notifications de chargement dans un thread (connexion psycopg2 dédiée,
+    hors du pool) et tient une version par table, incrémentée à chaque notification.
+
+    Sans effet (``start`` renvoie False) si la base n'est pas PostgreSQL. En cas de
+    coupure, la connexion est rouverte avec un délai croissant.
+    """
+
+    def __init__(self, url: str = None, channel: str = None, timeout: float = 5.0, max_backoff: float = 30.0):
+        self.url = url or get_database_url()
+        self.channel = channel or LOAD_CHANNEL
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.versions = {}
+        self.listening = threading.Event()
+        self._changed = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def supported(self) -> bool:
+        return make_url(self.url).get_backend_name() == "postgresql"
+
+    def start(self) -> bool:
+        """Lance le thread d'écoute (une seule fois). False si la base ne le permet pas."""
+        if not self.supported:
+            return False
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="load-listener", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.timeout + 1)
+
+    def version(self, table_name: str) -> int:
+        """Nombre de chargements de ``table_name`` notifiés depuis le démarrage."""
+        return self.versions.get(table_name, 0)
+
+    def wait(self, table_name: str, since: int, timeout: float) -> bool:
+        """Attend (au plus ``timeout`` s) que la version de ``table_name`` dépasse ``since``."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.version(table_name) > since, timeout)
+
+    def _connect(self):
+        import psycopg2  # Seulement côté dashboard PostgreSQL
+
+        # URL SQLAlchemy -> URI libpq (sans le nom du driver)
+        dsn = make_url(self.url).set(drivername="postgresql").render_as_string(hide_password=False)
+        connection = psycopg2.connect(dsn)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    def _dispatch(self, connection) -> None:
+        connection.poll()
+        with self._changed:
+            while connection.notifies:
+                notify = connection.notifies.pop(0)
+                try:
+                    table_name = json.loads(notify.payload)["table"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+                self.versions[table_name] = self.version(table_name) + 1
+            self._changed.notify_all()
+
+    def _run(self) -> None:
+        delay = 1.0
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = self._connect()
+                if delay > 1.0:
+                    # Notifications perdues pendant la coupure : tables connues considérées comme rechargées
+                    with self._changed:
+                        for table_name in list(self.versions):
+                            self.versions[table_name] += 1
+                        self._changed.notify_all()
+                self.listening.set()
+                logger.info(f"Écoute des chargements sur le canal '{self.channel}'")
+                delay = 1.0
+                while not self._stop.is_set():
+                    # Attente bornée : l'arrêt est pris en compte au plus après ``timeout`` s
+                    if select.select([connection], [], [], self.timeout) != ([], [], []):
+                        self._dispatch(connection)
+            except Exception as e:
+                self.listening.clear()
+                logger.warning(f"Écoute des chargements interrompue ({e}), reconnexion dans {delay:.0f}s")
+                self._stop.wait(delay)
+                delay = min(delay * 2, self.max_backoff)
+            finally:
+                if connection is not None:
+                    connection.close()
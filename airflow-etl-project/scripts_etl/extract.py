@@ -1,26 +1,23 @@
 # --- IMPORTATIONS DES BIBLIOTHÈQUES ---
-# Playwright: Pour le scraping web asynchrone (moderne, gère le JavaScript)
-from playwright.async_api import async_playwright
-# BeautifulSoup: Pour parser (analyser) le code HTML
-from bs4 import BeautifulSoup
-# Httpx: Un client HTTP asynchrone moderne (pour le scraping de repli)
-import httpx
+# Les bibliothèques lourdes (Playwright, httpx, requests, yfinance, pandas,
+# SQLAlchemy, BeautifulSoup) ne sont importées que dans les fonctions qui s'en
+# servent : un conteneur qui sert la liste depuis le cache ne les charge jamais.
 
 # Asyncio: Nécessaire pour gérer les fonctions asynchrones (async/await)
 import asyncio
-
-# Requests: Un client HTTP synchrone simple (pour le scraping de repli)
-import requests
-
-# Yfinance: Bibliothèque de Yahoo Finance pour récupérer les données boursières
-import yfinance as yf
-
-# Pandas: Pour la manipulation des données (DataFrames)
-import pandas as pd
+import os
 
 # Importations de vos propres modules (scripts dans le même dossier)
-from load import load_to_postgresql  # Votre script pour charger les données
-from transform import transform      # Votre script pour transformer les données
+from cache import FORCE_REFRESH, ConstituentCache  # Cache disque de la liste des entreprises
+from strategies import STRATEGY_REGISTRY, StrategyRunner, build_strategies  # Registre et exécution des stratégies de scraping
+from tickers import TickerIndex, is_isin           # Index de résolution nom -> ticker
+from metrics import configure_metrics, get_metrics # Spans et compteurs (durées, lignes, octets)
+# Extraction ciblée du tableau des entreprises (lxml par défaut, BeautifulSoup en option)
+from html_tables import CONSTITUENT_HEADERS, Table, bs4_table, find_table, header_index
+# Navigateur Playwright partagé, sans images/CSS/polices (mode allégé)
+from browser import PLAYWRIGHT_LEAN, close_browser, get_browser
+# Univers de plusieurs indices, scrapés en même temps sur un client HTTP partagé
+from universe import scrape_universe, selected_indices
 
 # Logging: Pour afficher des informations pendant l'exécution
 import logging
@@ -33,6 +30,10 @@ logger = logging.getLogger(__name__)
 # --- CONSTANTES ---
 URL = "https://fr.wikipedia.org/wiki/CAC_40"
 HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+# Run avec points de reprise (pipeline.run_all) : une relance reprend à la première étape incomplète.
+# ETL_CHECKPOINT=0 garde volontairement le pipeline en mémoire d'un seul bloc (spans
+# scrape/transform/load) : sans volume de staging partagé, ou pour comparer les deux.
+CHECKPOINT = os.getenv("ETL_CHECKPOINT", "1").lower() in ("1", "true", "yes")
 
 
 # --- CLASSE DE SCRAPING ---
@@ -40,33 +41,69 @@ HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/
 class CompanyScraper:
     """
     Une classe qui regroupe toutes les méthodes de scraping
-    pour récupérer la liste des entreprises du CAC 40 depuis Wikipedia.
+    pour récupérer la liste des entreprises d'un indice (CAC 40 par défaut) depuis Wikipedia.
     """
-    def __init__(self):
-        """Constructeur de la classe."""
-        self.url = URL
+    def __init__(self, url=None, cache=None, parser=None, required=None, symbol_headers=None, client=None):
+        """Constructeur de la classe.
+
+        ``parser`` : backend HTML ("lxml" ou "bs4") ; ``required`` : en-têtes du tableau
+        des entreprises (nom, secteur) ; ``symbol_headers`` : libellés de la colonne des
+        tickers, si la page en a une ; ``client`` : httpx.AsyncClient partagé par
+        plusieurs scrapers (sinon un client par requête).
+        """
+        self.url = url or URL
         self.headers = HEADERS
+        self.cache = cache or ConstituentCache()
+        self.parser = parser
+        self.required = required or CONSTITUENT_HEADERS
+        self.symbol_headers = symbol_headers
+        self.client = client
+
+    def _extract_company_info(self, columns, name_index=1, sector_index=2, ticker_index=None):
+        """Méthode privée pour extraire les infos d'une ligne <tr> du tableau.
 
-    def _extract_company_info(self, columns):
-        """Méthode privée pour extraire les infos d'une ligne <tr> du tableau."""
-        return {
-            "name": columns[1].text.strip(),
-            "sector": columns[2].text.strip() if len(columns) > 2 else "N/A"
+        Les colonnes sont des cellules BeautifulSoup ou directement leur texte.
+        """
+        texts = [column if isinstance(column, str) else column.text.strip() for column in columns]
+        company = {
+            "name": texts[name_index],
+            "sector": texts[sector_index] if len(texts) > sector_index else "N/A"
         }
+        # Ticker affiché par la page (ex: "ADS" sur la page du DAX)
+        if ticker_index is not None and len(texts) > ticker_index and texts[ticker_index]:
+            company["ticker"] = texts[ticker_index]
+        # Code ISIN, si le tableau en contient un (utilisé pour résoudre le ticker)
+        for text in texts:
+            if is_isin(text):
+                company["isin"] = text
+                break
+        return company
 
     def _parse_table(self, table):
-        """Méthode privée pour analyser l'objet table BeautifulSoup."""
+        """Méthode privée pour analyser le tableau des entreprises.
+
+        ``table`` est un html_tables.Table ou un élément <table> BeautifulSoup ; les
+        colonnes du nom et du secteur sont repérées par leur en-tête (2e et 3e à défaut).
+        """
         companies = []
         if table is None:
             return companies
-        
-        # Itère sur toutes les lignes <tr> du tableau, en sautant la première (l'en-tête)
-        for row in table.find_all("tr")[1:]:
-            columns = row.find_all("td")  # Récupère toutes les colonnes <td>
-            if columns:
-                companies.append(self._extract_company_info(columns))
+        if not isinstance(table, Table):
+            table = bs4_table(table)
+
+        name_index, sector_index = (header_index(table.headers, labels) for labels in self.required[:2])
+        name_index = 1 if name_index is None else name_index
+        sector_index = 2 if sector_index is None else sector_index
+        ticker_index = header_index(table.headers, self.symbol_headers) if self.symbol_headers else None
+        for columns in table.rows:
+            if len(columns) > name_index:
+                companies.append(self._extract_company_info(columns, name_index, sector_index, ticker_index))
         return companies
 
+    def _parse_html(self, html_content):
+        """Méthode privée : trouve le tableau des entreprises (par ses en-têtes) et l'analyse."""
+        return self._parse_table(find_table(html_content, required=self.required, backend=self.parser))
+
     def display_results(self, companies):
         """Méthode utilitaire pour afficher les résultats (non utilisée dans main)."""
         logger.info(f"{len(companies)} entreprises trouvées:")
@@ -75,12 +112,68 @@ class CompanyScraper:
 
     # --- MÉTHODES DE SCRAPING (AVEC FALLBACKS) ---
 
+    def scrape_cached(self, force_refresh=False):
+        """
+        STRATÉGIE 0 (Cache): Sert la liste depuis le cache disque.
+        - TTL encore valide : aucune requête réseau.
+        - TTL expiré : requête conditionnelle (ETag / Last-Modified) ;
+          une réponse 304 revalide le cache sans re-parser la page.
+        - Page modifiée (200) : parse la page et met le cache à jour.
+        ``force_refresh`` ignore le cache et retélécharge la page.
+        """
+        entry = None if force_refresh else self.cache.load(self.url)
+        if entry and self.cache.is_fresh(entry):
+            logger.info(f"Liste des entreprises servie depuis le cache ({len(entry['companies'])} entreprises)")
+            return entry["companies"]
+
+        # Requests: client HTTP synchrone (requête conditionnelle)
+        import requests
+
+        headers = dict(self.headers)
+        if entry:
+            headers.update(self.cache.validators(entry))
+        try:
+            response = requests.get(self.url, headers=headers, timeout=30)
+            get_metrics().incr("scrape_bytes_total", len(response.content), strategy="cache")
+            if response.status_code == 304 and entry:
+                logger.info("Page inchangée (304 Not Modified), cache revalidé")
+                self.cache.touch(entry)
+                return entry["companies"]
+            response.raise_for_status()
+            companies = self._parse_html(response.text)
+            self.cache.save(
+                self.url,
+                companies,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+            return companies
+        except requests.RequestException as e:
+            logger.error(f"Erreur lors de la revalidation du cache: {e}")
+            if entry:
+                # Une liste expirée vaut mieux qu'un run vide : elle change rarement
+                logger.warning("Utilisation de la liste en cache expirée")
+                return entry["companies"]
+            return []
+
     async def scrape_playwright(self):
         """
         STRATÉGIE 1 (Principale): Utilise Playwright.
         Lance un vrai navigateur (headless) pour charger la page.
         Garantit que le JavaScript est exécuté s'il y en a.
+
+        En mode allégé (PLAYWRIGHT_LEAN, par défaut), le navigateur est partagé entre
+        les scrapings du processus, images/CSS/polices ne sont pas chargées et seul le
+        HTML du tableau des entreprises est extrait de la page.
         """
+        if PLAYWRIGHT_LEAN:
+            html_content = await get_browser().table_html(self.url, self.required) or ""
+            get_metrics().incr("scrape_bytes_total", len(html_content.encode("utf-8")), strategy="playwright")
+            return self._parse_html(html_content)
+
+        # Playwright: Pour le scraping web asynchrone (moderne, gère le JavaScript)
+        from playwright.async_api import async_playwright
+
         async with async_playwright() as playwright:
             browser = await playwright.chromium.launch(headless=True)
             page = await browser.new_page()
@@ -88,10 +181,8 @@ class CompanyScraper:
                 await page.goto(self.url)
                 # Récupère le contenu HTML *après* exécution du JavaScript
                 html_content = await page.content()
-                soup = BeautifulSoup(html_content, "html.parser")
-                table = soup.find("table", {"class": "wikitable"})
-                companies = self._parse_table(table)
-                return companies
+                get_metrics().incr("scrape_bytes_total", len(html_content.encode("utf-8")), strategy="playwright")
+                return self._parse_html(html_content)
             finally:
                 # Assure que le navigateur est fermé même en cas d'erreur
                 await browser.close()
@@ -102,12 +193,17 @@ class CompanyScraper:
         Beaucoup plus rapide, mais ne gère pas le JavaScript.
         Pour Wikipedia, c'est suffisant.
         """
+        # Requests: Un client HTTP synchrone simple (pour le scraping de repli)
+        import requests
+
+        # Délai de la stratégie : wait_for abandonne l'attente sans pouvoir arrêter
+        # le thread, seul le timeout de la requête le libère
+        _, deadline = STRATEGY_REGISTRY["requests"]
         try:
-            response = requests.get(self.url, headers=self.headers)
+            response = requests.get(self.url, headers=self.headers, timeout=deadline or 30)
+            get_metrics().incr("scrape_bytes_total", len(response.content), strategy="requests")
             response.raise_for_status()  # Lève une erreur si le statut HTTP est 4xx ou 5xx
-            soup = BeautifulSoup(response.text, "html.parser")
-            table = soup.find("table", {"class": "wikitable"})
-            return self._parse_table(table)
+            return self._parse_html(response.text)
         except requests.RequestException as e:
             logger.error(f"Erreur lors de la requête avec requests: {e}")
             return []
@@ -115,14 +211,22 @@ class CompanyScraper:
     async def scrape_httpx(self):
         """
         STRATÉGIE 3 (Repli): Utilise HTTPX (version asynchrone de Requests).
+        Avec un client partagé (``client``), la connexion keep-alive est réutilisée
+        et plusieurs pages peuvent être téléchargées en même temps (universe.py).
         """
+        # Httpx: Un client HTTP asynchrone moderne (pour le scraping de repli)
+        import httpx
+
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.url, headers=self.headers)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, "html.parser")
-                table = soup.find("table", {"class": "wikitable"})
-                return self._parse_table(table)
+            if self.client is not None:
+                response = await self.client.get(self.url, headers=self.headers)
+            else:
+                async with httpx.AsyncClient() as client:
+                    response = await client.get(self.url, headers=self.headers)
+            get_metrics().incr("scrape_bytes_total", len(response.content), strategy="httpx")
+            response.raise_for_status()
+            # Analyse dans un thread : les autres pages continuent de se télécharger
+            return await asyncio.to_thread(self._parse_html, response.text)
         except httpx.RequestError as e:
             logger.error(f"Erreur lors de la requête avec httpx: {e}")
             return []
@@ -130,49 +234,62 @@ class CompanyScraper:
 
 # --- PARTIE TÉLÉCHARGEMENT DES DONNÉES BOURSIÈRES ---
 
-async def get_stock_prices(companies):
+async def get_stock_prices(companies, provider=None, concurrency=None, timeout=None, client=None, executor=None):
     """
-    Prend la liste des noms d'entreprises et utilise yfinance
-    pour récupérer leurs cours de bourse actuels.
+    Prend la liste des noms d'entreprises et récupère leurs cours de bourse actuels
+    (yfinance par défaut) via le moteur concurrent de quotes.py.
+    Renvoie une liste de dictionnaires (name, price, change, open, date).
     """
-    stock_data = []
-    for company in companies:
-        name = company.get("name")
-        try:
-            # yfinance a besoin du "ticker". Pour les actions du CAC 40 (Euronext Paris),
-            # le ticker est souvent suivi de ".PA".
-            ticker = yf.Ticker(f"{name}.PA")
-            info = ticker.info  # Fait l'appel API
-
-            # Utilise .get() pour éviter les erreurs si une clé n'existe pas
-            price = info.get("regularMarketPrice")
-            change = info.get("regularMarketChangePercent")
-            open_ = info.get("regularMarketOpen")
-            market_time = info.get("regularMarketTime")
-
-            # yfinance peut retourner un timestamp (int) ou une date (str)
-            if isinstance(market_time, (int, float)):
-                date = pd.to_datetime(market_time, unit="s", origin="unix")
-            else:
-                date = market_time
-
-            stock_data.append(
-                {
-                    "name": name,
-                    "price": price if price is not None else "N/A",
-                    "change": change if change is not None else "N/A",
-                    "open": open_ if open_ is not None else "N/A",
-                    "date": date if date is not None else "N/A",
-                }
-            )
-        except Exception as e:
-            # Si le ticker n'est pas trouvé (ex: yfinance ne trouve pas "Total.PA"),
-            # on log l'erreur mais on continue la boucle.
-            logger.error(f"Erreur pour {name}: {e}")
-            stock_data.append(
-                {"name": name, "price": "N/A", "change": "N/A", "open": "N/A", "date": "N/A"}
-            )
-    return stock_data
+    from quotes import fetch_quotes  # Moteur concurrent (yfinance, pandas)
+
+    return await fetch_quotes(
+        companies, provider=provider, concurrency=concurrency, timeout=timeout, client=client, executor=executor,
+    )
+
+
+# --- LISTE DES ENTREPRISES SUIVIES ---
+
+async def get_companies(scraper=None, universe=None):
+    """
+    Renvoie les entreprises suivies avec leur symbole vérifié : celles du CAC 40
+    (cache disque, puis stratégies de scraping), ou celles de plusieurs indices
+    (``universe`` / ETL_UNIVERSE, cf. universe.py), puis l'index des tickers.
+    Liste vide si aucune méthode de scraping n'a abouti.
+    """
+    indices = selected_indices(universe)
+    if scraper is None and [page.name for page in indices] != ["CAC40"]:
+        logger.info(f"\n=== Scraping des indices {', '.join(page.name for page in indices)} ===")
+        companies = await scrape_universe(indices)
+    else:
+        companies = await _get_cac40(scraper or CompanyScraper())
+    if not companies:
+        return []
+
+    # Résolution des tickers : seules les entreprises inconnues de l'index sont
+    # recherchées, celles sans symbole vérifié ne sont pas interrogées
+    ticker_index = TickerIndex.load()
+    ticker_index.refresh(companies)
+    return ticker_index.resolve(companies)
+
+
+async def _get_cac40(scraper):
+    """Entreprises de la page du scraper : cache disque, puis stratégies de scraping."""
+    logger.info("\n=== Scraping des entreprises du CAC 40 ===")
+
+    # Cache disque, puis les 3 stratégies
+    companies = scraper.scrape_cached(force_refresh=FORCE_REFRESH)
+
+    if not companies:
+        # Les stratégies de SCRAPE_STRATEGIES (les moins chères d'abord) ; selon
+        # SCRAPE_MODE elles sont lancées l'une après l'autre, en décalé ("hedged")
+        # ou toutes en même temps
+        runner = StrategyRunner(build_strategies(scraper))
+        companies = await runner.run()
+
+    if companies and not scraper.cache.load(scraper.url):
+        # Liste obtenue par un repli : on la garde pour les prochains runs
+        scraper.cache.save(scraper.url, companies)
+    return companies
 
 
 # --- FONCTION PRINCIPALE (PIPELINE ETL) ---
@@ -184,31 +301,46 @@ async def main():
     2. Extract (API yfinance)
     3. Transform
     4. Load
+
+    Par défaut (ETL_CHECKPOINT), les étapes passent par la zone de staging avec des
+    points de reprise : une relance du conteneur reprend le run incomplet à la première
+    étape non terminée, et ne récupère que les shards de tickers manquants.
+    ETL_CHECKPOINT=0 (sans zone de staging) et ETL_CHUNK_SIZE > 0 (mémoire bornée)
+    gardent le pipeline en mémoire, sans reprise : une relance repart du scraping.
     """
-    scraper = CompanyScraper()
-    logger.info("\n=== Scraping des entreprises du CAC 40 ===")
-    companies = []
-    
-    # Etape 1: EXTRACT (Scraping) - avec 3 niveaux de repli
-    try:
-        companies = await scraper.scrape_playwright()
-    except Exception as e:
-        logger.warning(f"Playwright failed: {e}")
+    # Transformation et chargement (pandas, SQLAlchemy) : importés seulement ici
+    from chunked import CHUNK_SIZE, run_chunked  # Pipeline par morceaux (mémoire bornée)
 
-    if not companies:
-        logger.info("Échec du scraping avec Playwright, tentative avec Requests...")
-        companies = scraper.scrape_requests()
+    if CHECKPOINT and CHUNK_SIZE <= 0:
+        from pipeline import run_all  # Étapes et points de reprise (pyarrow)
 
-    if not companies:
-        logger.info("Échec du scraping avec Requests, tentative avec HTTPX...")
-        companies = await scraper.scrape_httpx()
+        summary = await run_all()
+        logger.info(f"\nPipeline ETL terminé avec succès (run {summary['run_id']}, {summary['rows']} lignes).")
+        return
 
+    # Etape 1: EXTRACT (Scraping)
+    with get_metrics().span("scrape") as span:
+        try:
+            companies = await get_companies()
+        finally:
+            # Le navigateur partagé (s'il a servi) n'est plus utile
+            await close_browser()
+        span.set(rows=len(companies))
     if not companies:
         logger.error("Échec de toutes les méthodes de scraping. Arrêt du programme.")
         return
 
     logger.info(f"\nSuivi des cours pour {len(companies)} entreprises")
 
+    from load import load_to_postgresql  # Votre script pour charger les données
+    from transform import transform      # Votre script pour transformer les données
+
+    if CHUNK_SIZE > 0:
+        # ETL_CHUNK_SIZE : fetch, transform et load morceau par morceau, en parallèle
+        await run_chunked(companies, "stock_prices")
+        logger.info("\nPipeline ETL terminé avec succès.")
+        return
+
     try:
         # Etape 2: EXTRACT (API)
         stock_prices = await get_stock_prices(companies) # C'est une liste de dictionnaires
@@ -234,5 +366,10 @@ async def main():
 # --- POINT D'ENTRÉE ---
 
 if __name__ == "__main__":
-    # Lance la fonction principale asynchrone
-    asyncio.run(main())
\ No newline at end of file
+    # Métriques vers les sinks configurés (logs JSON, fichier Prometheus, StatsD)
+    metrics = configure_metrics(job="extract")
+    try:
+        # Lance la fonction principale asynchrone
+        asyncio.run(main())
+    finally:
+        metrics.flush()
\ No newline at end of file
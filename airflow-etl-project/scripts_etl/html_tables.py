@@ -0,0 +1,163 @@
+# --- EXTRACTION CIBLÉE DES TABLEAUX HTML ---
+# Trouve, dans une page, le tableau dont les en-têtes correspondent à ceux attendus
+# (ex: "Entreprise" et "Secteur"), au lieu du premier "wikitable" venu, et renvoie ses
+# en-têtes et le texte de ses cellules.
+#
+# Deux backends interchangeables (SCRAPE_PARSER) :
+# - "lxml" (défaut) : la page n'est pas analysée en entier ; chaque <table> est
+#   délimité par une simple recherche de balises, sa première ligne est filtrée sur
+#   les en-têtes attendus, et seul le tableau retenu est analysé par lxml,
+# - "bs4" : BeautifulSoup (html.parser) sur toute la page, l'implémentation d'origine.
+
+import logging
+import os
+import re
+import unicodedata
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION (variables d'environnement) ---
+SCRAPE_PARSER = os.getenv("SCRAPE_PARSER", "lxml")
+
+# En-têtes du tableau des entreprises : une colonne par groupe, un des libellés suffit
+CONSTITUENT_HEADERS = (
+    ("entreprise", "societe", "company", "nom", "name"),
+    ("secteur", "sector"),
+)
+
+# En-têtes et lignes (texte des cellules <td>) d'un tableau
+Table = namedtuple("Table", ["headers", "rows"])
+
+_TABLE_TAG = re.compile(r"<(/?)table\b", re.IGNORECASE)
+_ROW_END = re.compile(r"</tr\s*>", re.IGNORECASE)
+_TAG = re.compile(r"<[^>]*>")
+
+
+def normalize(text):
+    """Texte comparable : minuscules, sans accents ni espaces superflus ("Société " -> "societe")."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.lower().split())
+
+
+def header_index(headers, labels):
+    """Position de la première colonne dont l'en-tête contient un des ``labels`` (None sinon)."""
+    for position, header in enumerate(headers):
+        normalized = normalize(header)
+        if any(label in normalized for label in labels):
+            return position
+    return None
+
+
+def matches(headers, required):
+    """True si chaque groupe de ``required`` correspond à une colonne de ``headers``."""
+    return all(header_index(headers, labels) is not None for labels in required)
+
+
+# --- BACKEND LXML ---
+
+def _table_spans(html):
+    """Positions (début, fin) de chaque <table> de premier niveau, sans analyser la page."""
+    depth, start = 0, None
+    for match in _TABLE_TAG.finditer(html):
+        if not match.group(1):
+            if depth == 0:
+                start = match.start()
+            depth += 1
+        elif depth:
+            depth -= 1
+            if depth == 0:
+                close = html.find(">", match.end())
+                yield start, close + 1 if close != -1 else len(html)
+
+
+def _maybe_matches(html, start, end, required):
+    """Filtre rapide sur le texte de la première ligne, avant toute analyse."""
+    first_row = _ROW_END.search(html, start, end)
+    head = normalize(_TAG.sub(" ", html[start:first_row.end() if first_row else end]))
+    return all(any(label in head for label in labels) for labels in required)
+
+
+def _lxml_table(element):
+    headers, rows = [], []
+    for row in element.iter("tr"):
+        if next(row.iterancestors("table")) is not element:
+            continue  # ligne d'un tableau imbriqué dans une cellule
+        cells = [cell for cell in row if cell.tag in ("td", "th")]
+        if not headers and cells and all(cell.tag == "th" for cell in cells):
+            headers = [cell.text_content().strip() for cell in cells]
+            continue
+        values = [cell.text_content().strip() for cell in cells if cell.tag == "td"]
+        if values:
+            rows.append(values)
+    return Table(headers, rows)
+
+
+def find_table_lxml(html, required=CONSTITUENT_HEADERS):
+    # Importé au premier parsing : une liste servie depuis le cache n'en a pas besoin
+    from lxml import html as lxml_html
+
+    for start, end in _table_spans(html):
+        if not _maybe_matches(html, start, end, required):
+            continue
+        table = _lxml_table(lxml_html.fragment_fromstring(html[start:end]))
+        if matches(table.headers, required):
+            return table
+    return None
+
+
+# --- BACKEND BEAUTIFULSOUP ---
+
+def bs4_table(element):
+    """Table d'un élément <table> BeautifulSoup (en-têtes de la première ligne de <th>)."""
+    headers, rows = [], []
+    for row in element.find_all("tr"):
+        if row.find_parent("table") is not element:
+            continue  # ligne d'un tableau imbriqué dans une cellule
+        cells = row.find_all(("td", "th"), recursive=False)
+        if not headers and cells and all(cell.name == "th" for cell in cells):
+            headers = [cell.text.strip() for cell in cells]
+            continue
+        values = [cell.text.strip() for cell in cells if cell.name == "td"]
+        if values:
+            rows.append(values)
+    return Table(headers, rows)
+
+
+def find_table_bs4(html, required=CONSTITUENT_HEADERS):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup.find_all("table"):
+        table = bs4_table(element)
+        if matches(table.headers, required):
+            return table
+    return None
+
+
+BACKENDS = {
+    "lxml": find_table_lxml,
+    "bs4": find_table_bs4,
+}
+
+
+def find_table(html, required=CONSTITUENT_HEADERS, backend=None):
+    """
+    Premier tableau de la page dont les en-têtes correspondent à ``required``.
+
+    Args:
+        required (tuple): Groupes de libellés ; chaque groupe doit correspondre à une colonne.
+        backend (str): "lxml" ou "bs4" (``SCRAPE_PARSER`` par défaut).
+
+    Returns:
+        Table | None: en-têtes et lignes (texte des cellules <td>), None si aucun tableau ne correspond.
+    """
+    backend = backend or SCRAPE_PARSER
+    if backend not in BACKENDS:
+        raise ValueError(f"Parseur HTML inconnu : {backend!r} (attendu : {tuple(BACKENDS)})")
+    table = BACKENDS[backend](html, required)
+    if table is None:
+        logger.warning(f"Aucun tableau avec les colonnes {[labels[0] for labels in required]} dans la page")
+    return table
@@ -0,0 +1,306 @@
+# --- INDICATEURS TECHNIQUES (CALCUL INCRÉMENTAL) ---
+# Dérive de l'historique journalier (stock_history) une table d'indicateurs
+# (stock_indicators) : rendement du jour, moyennes mobiles, volatilité glissante
+# annualisée et drawdown depuis le plus haut. Les consommateurs (dashboard,
+# analyses) les lisent au lieu de les recalculer chacun de leur côté.
+#
+# - Calcul vectorisé (NumPy) : sommes cumulées pour les moyennes mobiles, fenêtres
+#   glissantes (sliding_window_view) pour la volatilité, maximum cumulé pour le drawdown.
+# - Incrémental : l'état des fenêtres de chaque entreprise (dernières clôtures, plus
+#   haut historique, date de la dernière barre) est conservé sur disque ; un run
+#   quotidien ne lit et ne calcule que les nouvelles barres, pas 20 ans d'historique.
+# - Recalcul complet (--full, entreprise sans état, fenêtres modifiées) : les
+#   entreprises sont réparties sur un pool de processus, la base n'est lue et écrite
+#   que par le processus principal.
+#
+# L'état n'est enregistré qu'après le chargement des indicateurs : un run interrompu
+# recalcule au plus les barres de son dernier lot (upsert sur (name, date)).
+#
+# Usage : python indicators.py [--full]
+
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, inspect, text
+
+from backfill import HISTORY_TABLE
+from cache import CACHE_DIR
+from db import get_engine
+from load import _quote, load_to_postgresql
+from metrics import configure_metrics, get_metrics
+from schema import indicators_schema
+from transform import transform
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION (surchargeable par variables d'environnement) ---
+INDICATOR_TABLE = os.getenv("INDICATOR_TABLE", "stock_indicators")
+INDICATOR_STATE_PATH = os.getenv("INDICATOR_STATE_PATH", os.path.join(CACHE_DIR, "indicators.json"))
+# Fenêtres des moyennes mobiles et de la volatilité (jours de cotation)
+MA_WINDOWS = tuple(int(window) for window in os.getenv("INDICATOR_MA_WINDOWS", "20,50,200").split(","))
+VOLATILITY_WINDOW = int(os.getenv("INDICATOR_VOLATILITY_WINDOW", "20"))
+# Processus du recalcul complet (0 = un par cœur)
+INDICATOR_WORKERS = int(os.getenv("INDICATOR_WORKERS", "0"))
+# Entreprises lues, calculées et chargées ensemble
+INDICATOR_BATCH_SIZE = int(os.getenv("INDICATOR_BATCH_SIZE", "50"))
+
+TRADING_DAYS = 252
+
+
+# --- CALCUL (NUMPY) ---
+
+def rolling_mean(values, window):
+    """Moyenne glissante sur ``window`` valeurs (NaN tant que la fenêtre est incomplète)."""
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(values)
+        sums[window:] = sums[window:] - sums[:-window]
+        result[window - 1:] = sums[window - 1:] / window
+    return result
+
+
+def rolling_volatility(log_returns, window):
+    """Écart-type glissant des rendements logarithmiques, annualisé."""
+    result = np.full(len(log_returns), np.nan)
+    if len(log_returns) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(log_returns, window)
+        result[window - 1:] = windows.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS)
+    return result
+
+
+def new_state(ma_windows=MA_WINDOWS, volatility_window=VOLATILITY_WINDOW):
+    """État d'une entreprise sans historique calculé."""
+    return {"date": None, "closes": [], "peak": None, "windows": [*ma_windows, volatility_window]}
+
+
+def compute_indicators(closes, state=None, ma_windows=MA_WINDOWS, volatility_window=VOLATILITY_WINDOW):
+    """
+    Indicateurs des nouvelles clôtures ``closes``, à la suite de l'état ``state``.
+
+    Les fenêtres sont complétées par les dernières clôtures de l'état : le résultat est
+    celui d'un recalcul sur tout l'historique.
+
+    Returns:
+        tuple: ({colonne: tableau numpy}, nouvel état sans "date")
+    """
+    state = state or new_state(ma_windows, volatility_window)
+    closes = np.asarray(closes, dtype=np.float64)
+    history = np.asarray(state["closes"], dtype=np.float64)
+    series = np.concatenate([history, closes])
+    start = len(history)
+
+    returns = np.full(len(series), np.nan)
+    returns[1:] = series[1:] / series[:-1] - 1
+    log_returns = np.log1p(returns)
+    columns = {"close": closes, "return_1d": returns[start:]}
+    for window in ma_windows:
+        columns[f"ma_{window}"] = rolling_mean(series, window)[start:]
+    columns[f"volatility_{volatility_window}"] = rolling_volatility(log_returns, volatility_window)[start:]
+
+    peak = -np.inf if state["peak"] is None else state["peak"]
+    peaks = np.maximum.accumulate(np.concatenate([[peak], closes]))[1:]
+    columns["drawdown"] = closes / peaks - 1
+
+    # Assez de clôtures pour la plus longue fenêtre (volatilité : une de plus pour le rendement)
+    keep = max(*ma_windows, volatility_window + 1)
+    state = {
+        "closes": series[-keep:].tolist(),
+        "peak": float(peaks[-1]) if len(peaks) else state["peak"],
+        "windows": [*ma_windows, volatility_window],
+    }
+    return columns, state
+
+
+def indicator_frame(name, bars, state=None, ma_windows=MA_WINDOWS, volatility_window=VOLATILITY_WINDOW):
+    """
+    Indicateurs d'une entreprise à partir de ses barres (colonnes "date", "close").
+
+    Les barres sans clôture sont ignorées. Fonction de niveau module : elle est aussi
+    exécutée dans les processus du recalcul complet.
+
+    Returns:
+        tuple: (DataFrame des indicateurs, nouvel état)
+    """
+    bars = bars[bars["close"].notna()].sort_values("date")
+    columns, new = compute_indicators(bars["close"].to_numpy(), state, ma_windows, volatility_window)
+    frame = pd.DataFrame({"name": name, "date": bars["date"].to_numpy(), **columns})
+    new["date"] = bars["date"].iloc[-1].isoformat() if len(bars) else (state or {}).get("date")
+    return frame, new
+
+
+def _full_recompute(args):
+    """Tâche du pool de processus : tout l'historique d'une entreprise."""
+    name, bars, ma_windows, volatility_window = args
+    return indicator_frame(name, bars, None, ma_windows, volatility_window)
+
+
+# --- ÉTAT PERSISTANT ---
+
+def load_state(path=None):
+    """État des fenêtres par entreprise ({nom: état}, vide si absent ou illisible)."""
+    path = path or INDICATOR_STATE_PATH
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"État des indicateurs illisible ({path}) : {e}, recalcul complet")
+        return {}
+
+
+def save_state(states, path=None):
+    """Écrit l'état sur disque (écriture atomique)."""
+    path = path or INDICATOR_STATE_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(states, f)
+    os.replace(tmp_path, path)
+
+
+# --- LECTURE DE L'HISTORIQUE ---
+
+def history_names(history_table=HISTORY_TABLE, engine=None):
+    """Entreprises présentes dans l'historique (vide si la table n'existe pas)."""
+    engine = engine or get_engine()
+    with engine.connect() as connection:
+        if not inspect(connection).has_table(history_table):
+            return []
+        rows = connection.execute(text(f"SELECT DISTINCT {_quote('name')} FROM {_quote(history_table)}"))
+        return sorted(name for (name,) in rows)
+
+
+def read_bars(names, since=None, history_table=HISTORY_TABLE, engine=None):
+    """Barres (name, date, close) des entreprises ``names``, postérieures à ``since`` si donnée."""
+    engine = engine or get_engine()
+    query = (
+        f"SELECT {_quote('name')}, {_quote('date')}, {_quote('close')} FROM {_quote(history_table)} "
+        f"WHERE {_quote('name')} IN :names"
+    )
+    params = {"names": list(names)}
+    if since is not None:
+        query += f" AND {_quote('date')} > :since"
+        params["since"] = pd.Timestamp(since).to_pydatetime()
+    statement = text(query).bindparams(bindparam("names", expanding=True))
+    with engine.connect() as connection:
+        bars = pd.read_sql(statement, connection, params=params)
+    bars["date"] = pd.to_datetime(bars["date"])
+    bars["close"] = bars["close"].astype("float64")
+    return bars
+
+
+# --- ORCHESTRATION ---
+
+def update_indicators(
+    names=None,
+    full=False,
+    table_name=INDICATOR_TABLE,
+    history_table=HISTORY_TABLE,
+    state_path=None,
+    workers=None,
+    batch_size=None,
+    ma_windows=MA_WINDOWS,
+    volatility_window=VOLATILITY_WINDOW,
+):
+    """
+    Met à jour la table des indicateurs à partir de l'historique.
+
+    Les entreprises dont l'état est à jour ne lisent que les barres postérieures à leur
+    dernière date ; les autres (ou toutes avec ``full``) sont recalculées sur tout leur
+    historique, réparties sur ``workers`` processus.
+
+    Args:
+        names (list): Entreprises à traiter (toutes celles de l'historique par défaut).
+        full (bool): Ignore l'état et recalcule tout l'historique.
+        workers (int): Processus du recalcul complet (``INDICATOR_WORKERS``, 0 = un par cœur, 1 = sans pool).
+        batch_size (int): Entreprises lues, calculées et chargées ensemble.
+
+    Returns:
+        dict: {"incremental": entreprises, "full": entreprises, "rows": lignes chargées}
+    """
+    state_path = state_path or INDICATOR_STATE_PATH
+    workers = INDICATOR_WORKERS if workers is None else workers
+    batch_size = max(1, batch_size or INDICATOR_BATCH_SIZE)
+    schema = indicators_schema(ma_windows, volatility_window)
+    windows = [*ma_windows, volatility_window]
+
+    names = list(names) if names is not None else history_names(history_table)
+    states = load_state(state_path)
+    # Un état calculé avec d'autres fenêtres n'est plus utilisable
+    incremental = [] if full else [
+        n for n in names if n in states and states[n].get("windows") == windows and states[n].get("date")
+    ]
+    recompute = [n for n in names if n not in incremental]
+    summary = {"incremental": len(incremental), "full": len(recompute), "rows": 0}
+    logger.info(f"Indicateurs : {len(incremental)} entreprises en incrémental, {len(recompute)} à recalculer")
+
+    def load(frames):
+        frames = [frame for frame in frames if not frame.empty]
+        if frames:
+            data = transform(pd.concat(frames, ignore_index=True), schema=schema)
+            load_to_postgresql(data, table_name, mode="upsert", schema=schema)
+            summary["rows"] += len(data)
+        # Après le chargement seulement : un run interrompu refait ce lot
+        save_state(states, state_path)
+
+    with get_metrics().span("indicators", table=table_name) as span:
+        for start in range(0, len(incremental), batch_size):
+            batch = incremental[start:start + batch_size]
+            since = min(pd.Timestamp(states[name]["date"]) for name in batch)
+            bars = read_bars(batch, since, history_table)
+            frames = []
+            for name, group in bars.groupby("name", sort=False):
+                group = group[group["date"] > pd.Timestamp(states[name]["date"])]
+                if not group.empty:
+                    frame, states[name] = indicator_frame(name, group, states[name], ma_windows, volatility_window)
+                    frames.append(frame)
+            load(frames)
+
+        if recompute:
+            workers = workers or os.cpu_count() or 1
+            executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+            try:
+                for start in range(0, len(recompute), batch_size):
+                    bars = read_bars(recompute[start:start + batch_size], None, history_table)
+                    tasks = [
+                        (name, group, ma_windows, volatility_window)
+                        for name, group in bars.groupby("name", sort=False)
+                    ]
+                    results = executor.map(_full_recompute, tasks) if executor else map(_full_recompute, tasks)
+                    frames = []
+                    for (name, *_), (frame, state) in zip(tasks, results):
+                        states[name] = state
+                        frames.append(frame)
+                    load(frames)
+            finally:
+                if executor:
+                    executor.shutdown()
+        span.set(rows=summary["rows"], tickers=len(names))
+
+    logger.info(f"Indicateurs : {summary['rows']} lignes chargées dans {table_name}")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Met à jour les indicateurs techniques depuis l'historique.")
+    parser.add_argument("--full", action="store_true", help="Recalcule tout l'historique (ignore l'état)")
+    parser.add_argument("--workers", type=int, default=INDICATOR_WORKERS, help="Processus du recalcul complet")
+    parser.add_argument("--table", default=INDICATOR_TABLE, help="Table de destination")
+    args = parser.parse_args(argv)
+    update_indicators(full=args.full, workers=args.workers, table_name=args.table)
+
+
+if __name__ == "__main__":
+    metrics = configure_metrics(job="indicators")
+    try:
+        main()
+    finally:
+        metrics.flush()
@@ -1,82 +1,438 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import DateTime, bindparam, inspect, text
 import pandas as pd
+import io
 import os
 import logging
+import threading
+import uuid
+
+from db import get_database_url, get_engine, safe_url, write_watermark
+from metrics import get_metrics
+from schema import STOCK_PRICES_SCHEMA, conform, sql_dtypes
+from serving import SERVED_TABLES, drop_serving, refresh_serving
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Construction de l'URL de connexion depuis les variables d'environnement
-DB_HOST = os.getenv("DB_HOST", "postgres")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME", "airflow")
-DB_USER = os.getenv("DB_USER", "airflow")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "airflow")
+# Mode de chargement par défaut ("upsert", "append" ou "replace")
+LOAD_MODE = os.getenv("LOAD_MODE", "upsert")
+LOAD_MODES = ("replace", "append", "upsert")
 
-DATABASE_URL = os.getenv(
-    "DATABASE_URL",
-    f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}",
-)
+# Méthode d'écriture : "copy" (COPY ... FROM STDIN, PostgreSQL/psycopg2)
+# ou "multi" (INSERT multi-lignes de pandas, compatible avec tous les moteurs)
+LOAD_METHOD = os.getenv("LOAD_METHOD", "copy")
+LOAD_METHODS = ("multi", "copy")
 
+# Nombre de lignes sérialisées par buffer COPY (borne la mémoire du buffer)
+COPY_CHUNKSIZE = int(os.getenv("COPY_CHUNKSIZE", "100000"))
 
-def load_to_postgresql(dataframe: pd.DataFrame, table_name: str) -> bool:
-    """Charge un DataFrame pandas dans une table PostgreSQL en utilisant SQLAlchemy.
+# Clé naturelle d'une ligne de cours : une entreprise à une date donnée
+KEY_COLUMNS = ("name", "date")
 
-    - Nettoie les valeurs 'N/A'
-    - Convertit les dates si présentes
-    - Utilise to_sql avec un engine SQLAlchemy (nécessite pandas < 2.2.0)
+# Index des empreintes (mode upsert) : une ligne (clé, empreinte 64 bits) par ligne
+# de la table cible ; une ligne dont l'empreinte n'a pas changé n'est pas réécrite
+HASH_TABLE_SUFFIX = "_row_hashes"
+HASH_COLUMN = "row_hash"
+
+# Chargements dont le rafraîchissement des tables de service est différé (refresh=False) :
+# lignes écrites par table depuis le dernier rafraîchissement (cf. refresh_serving_tables)
+_pending_serving = {}
+_pending_lock = threading.Lock()
+
+
+def _quote(identifier: str) -> str:
+    """Entoure un identifiant SQL de guillemets (ex: 'date', 'open')."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _ensure_target_table(connection, dataframe: pd.DataFrame, table_name: str, key_columns, dtype=None) -> bool:
+    """Crée la table cible (clé primaire + index) si elle n'existe pas encore.
+
+    La table n'est créée qu'une seule fois puis conservée d'un run à l'autre.
+    Une table héritée du mode "replace" (sans clé primaire) reçoit un index
+    unique sur la clé, ce qui suffit à ON CONFLICT.
+
+    Returns:
+        bool: True si la table vient d'être créée
     """
-    try:
-        # Ne pas logguer le mot de passe en clair
-        safe_url = DATABASE_URL.replace(f"://{DB_USER}:{DB_PASSWORD}@", f"://{DB_USER}:****@")
-        logger.info(f"Tentative de connexion à : {safe_url}")
-        logger.info(f"DataFrame à charger (extrait) : \n{dataframe.head()}")
+    inspector = inspect(connection)
+    created = not inspector.has_table(table_name)
+    if created:
+        ddl = pd.io.sql.get_schema(dataframe, table_name, keys=list(key_columns), con=connection, dtype=dtype)
+        connection.execute(text(ddl))
+        logger.info(f"Table '{table_name}' créée avec la clé primaire {tuple(key_columns)}")
+    else:
+        primary_key = inspector.get_pk_constraint(table_name).get("constrained_columns") or []
+        if sorted(primary_key) != sorted(key_columns):
+            logger.warning(f"Table '{table_name}' sans clé primaire {tuple(key_columns)}, ajout d'un index unique")
+            connection.execute(text(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote(f'ux_{table_name}_key')} "
+                f"ON {_quote(table_name)} ({', '.join(_quote(c) for c in key_columns)})"
+            ))
 
-        # Remplacer les strings N/A par des vrais NA et inférer les types
-        dataframe = dataframe.replace({"N/A": pd.NA}).infer_objects(copy=False)
+    # Index secondaire pour les lectures par date (dashboard, derniers cours)
+    if "date" in dataframe.columns:
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {_quote(f'ix_{table_name}_date')} "
+            f"ON {_quote(table_name)} ({_quote('date')})"
+        ))
+    return created
 
-        # Si une colonne 'date' existe, forcer en datetime
-        if "date" in dataframe.columns:
-            dataframe["date"] = pd.to_datetime(dataframe["date"], errors="coerce", unit=None)
 
-        # Créer un engine SQLAlchemy (pool_pre_ping évite les erreurs de connexion stale)
-        engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+def _supports_copy(connection) -> bool:
+    """COPY ... FROM STDIN n'est disponible qu'avec PostgreSQL via psycopg2."""
+    return connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2"
 
-        # Filtrer les lignes vides (ex: nom absent)
-        dataframe = dataframe.dropna(subset=[c for c in ["name"] if c in dataframe.columns], how="any")
 
-        # --- CORRECTION ---
-        # Revenir à la méthode standard (con=engine) qui fonctionne
-        # parfaitement avec pandas 2.1.4 et les versions antérieures.
-        
-        logger.info("Tentative d'écriture dans la base de données avec l'engine SQLAlchemy...")
-        
+def _copy_buffer(chunk: pd.DataFrame) -> io.StringIO:
+    """Sérialise un morceau de DataFrame en CSV dans un buffer mémoire (pas de fichier temporaire).
+
+    NaN, NaT, None et pd.NA deviennent tous le marqueur NULL '\\N' ; les dates sont
+    écrites au format ISO, les catégories par leur valeur.
+    """
+    buffer = io.StringIO()
+    chunk.to_csv(buffer, index=False, header=False, na_rep="\\N", date_format="%Y-%m-%d %H:%M:%S.%f")
+    buffer.seek(0)
+    return buffer
+
+
+def _copy_from_dataframe(connection, dataframe: pd.DataFrame, table_name: str) -> None:
+    """Envoie le DataFrame dans une table existante avec COPY ... FROM STDIN.
+
+    Le DataFrame est découpé en morceaux de ``COPY_CHUNKSIZE`` lignes : un seul
+    buffer CSV est en mémoire à la fois.
+    """
+    columns = ", ".join(_quote(c) for c in dataframe.columns)
+    statement = f"COPY {_quote(table_name)} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    # Connexion DBAPI (psycopg2) sous-jacente, dans la même transaction que SQLAlchemy
+    with connection.connection.cursor() as cursor:
+        for start in range(0, len(dataframe), COPY_CHUNKSIZE):
+            chunk = dataframe.iloc[start:start + COPY_CHUNKSIZE]
+            cursor.copy_expert(statement, _copy_buffer(chunk))
+
+
+def _write_frame(connection, dataframe: pd.DataFrame, table_name: str, if_exists: str, method: str, dtype=None) -> None:
+    """Écrit le DataFrame avec la méthode choisie ("copy" ou "multi")."""
+    if method == "copy" and not _supports_copy(connection):
+        logger.warning(f"COPY indisponible avec {connection.dialect.name}, repli sur INSERT multi-lignes")
+        method = "multi"
+
+    if method == "copy":
+        # pandas crée (ou vide) la table à partir de 0 ligne, COPY envoie les données
+        dataframe.head(0).to_sql(name=table_name, con=connection, if_exists=if_exists, index=False, dtype=dtype)
+        _copy_from_dataframe(connection, dataframe, table_name)
+    else:
         # Ecrire dans la base en chunks
         dataframe.to_sql(
             name=table_name,
-            con=engine,  # <-- C'est la méthode correcte avec pandas < 2.2.0
-            if_exists="replace",
+            con=connection,
+            if_exists=if_exists,
             index=False,
             method="multi",
             chunksize=1000,
+            dtype=dtype,
+        )
+
+
+def hash_table_name(table_name: str) -> str:
+    """Nom de la table d'index des empreintes de ``table_name``."""
+    return f"{table_name}{HASH_TABLE_SUFFIX}"
+
+
+def row_hashes(dataframe: pd.DataFrame, key_columns) -> pd.Series:
+    """Empreinte 64 bits (signée, pour BIGINT) du contenu de chaque ligne, hors colonnes de clé.
+
+    L'empreinte dépend des valeurs et de leur type : les deux côtés de la comparaison
+    sont typés par le même schéma (conform).
+    """
+    values = dataframe[[c for c in dataframe.columns if c not in key_columns]]
+    hashes = pd.util.hash_pandas_object(values, index=False).to_numpy().view("int64")
+    return pd.Series(hashes, index=dataframe.index, name=HASH_COLUMN)
+
+
+def _key_index(dataframe: pd.DataFrame, key_columns) -> pd.MultiIndex:
+    """Clés comparables entre le lot et l'index (noms en texte, dates en datetime64)."""
+    return pd.MultiIndex.from_arrays(
+        [
+            pd.to_datetime(dataframe[c]).to_numpy() if c == "date" else dataframe[c].astype(str).to_numpy()
+            for c in key_columns
+        ],
+        names=list(key_columns),
+    )
+
+
+def _ensure_hash_index(connection, dataframe: pd.DataFrame, table_name: str, key_columns, dtype=None, schema=None) -> None:
+    """Crée l'index des empreintes s'il n'existe pas, rempli à partir de la table cible.
+
+    L'index est ainsi reconstruit après un chargement "replace" ou "append" (qui le
+    suppriment) ou pour une table chargée avant son introduction.
+    """
+    hashes = hash_table_name(table_name)
+    if inspect(connection).has_table(hashes):
+        return
+    key_dtype = {c: t for c, t in (dtype or {}).items() if c in key_columns}
+    template = dataframe[list(key_columns)].head(0).assign(**{HASH_COLUMN: pd.Series(dtype="int64")})
+    connection.execute(text(pd.io.sql.get_schema(template, hashes, keys=list(key_columns), con=connection, dtype=key_dtype)))
+
+    columns = ", ".join(_quote(c) for c in dataframe.columns)
+    indexed = 0
+    for chunk in pd.read_sql(text(f"SELECT {columns} FROM {_quote(table_name)}"), connection, chunksize=COPY_CHUNKSIZE):
+        chunk = conform(chunk, schema or {})
+        chunk = chunk[list(key_columns)].assign(**{HASH_COLUMN: row_hashes(chunk, key_columns)})
+        chunk.to_sql(name=hashes, con=connection, if_exists="append", index=False, method="multi", chunksize=1000, dtype=key_dtype)
+        indexed += len(chunk)
+    logger.info(f"Index des empreintes '{hashes}' créé ({indexed} lignes existantes indexées)")
+
+
+def _stored_hashes(connection, dataframe: pd.DataFrame, table_name: str, key_columns, schema=None) -> pd.Series:
+    """Empreintes en base des clés du lot (lues sur l'intervalle de dates du lot)."""
+    hashes = hash_table_name(table_name)
+    keys = ", ".join(_quote(c) for c in key_columns)
+    query = f"SELECT {keys}, {HASH_COLUMN} FROM {_quote(hashes)}"
+    params = {}
+    if "date" in key_columns:
+        dates = pd.to_datetime(dataframe["date"])
+        query += f" WHERE {_quote('date')} BETWEEN :first AND :last"
+        params = {"first": dates.min().to_pydatetime(), "last": dates.max().to_pydatetime()}
+    statement = text(query).bindparams(
+        *(bindparam(name, type_=DateTime()) for name in params)
+    )
+    stored = pd.read_sql(statement, connection, params=params)
+    stored = conform(stored, {c: t for c, t in (schema or {}).items() if c in key_columns})
+    return pd.Series(stored[HASH_COLUMN].to_numpy(), index=_key_index(stored, key_columns))
+
+
+def _publish(connection, table_name: str, rows: int, refresh: bool = True) -> None:
+    """Rafraîchit les tables de service puis le filigrane (dans la transaction du chargement).
+
+    Avec ``refresh=False``, seul le recalcul des tables de service est différé jusqu'à
+    refresh_serving_tables : le filigrane (et sa notification) part avec chaque
+    chargement, même si le processus s'arrête avant le rafraîchissement.
+    """
+    if table_name in SERVED_TABLES:
+        with _pending_lock:
+            if refresh:
+                # Le recalcul couvre aussi les chargements différés
+                _pending_serving.pop(table_name, None)
+            else:
+                _pending_serving[table_name] = _pending_serving.get(table_name, 0) + rows
+    if refresh:
+        refresh_serving(connection, table_name)
+    write_watermark(connection, table_name, rows)
+
+
+def refresh_serving_tables(table_name: str) -> bool:
+    """
+    Rafraîchit les tables de service différées de ``table_name`` puis son filigrane.
+
+    À appeler une fois en fin de run (run_chunked) ou périodiquement (stream) après des
+    chargements avec ``refresh=False`` : un seul recalcul au lieu d'un par chargement.
+    Le filigrane est de nouveau incrémenté (lignes publiées par ce rafraîchissement) :
+    le dashboard oublie les résultats lus dans les anciennes tables de service.
+
+    Returns:
+        bool: True si un rafraîchissement était en attente
+    """
+    with _pending_lock:
+        rows = _pending_serving.pop(table_name, None)
+    if rows is None:
+        return False
+    try:
+        with get_metrics().span("serving_refresh", table=table_name):
+            with get_engine().begin() as connection:
+                refresh_serving(connection, table_name)
+                write_watermark(connection, table_name, rows)
+    except Exception:
+        # Toujours en attente : le prochain appel réessaie
+        with _pending_lock:
+            _pending_serving[table_name] = _pending_serving.get(table_name, 0) + rows
+        raise
+    return True
+
+
+def _upsert(
+    engine, dataframe: pd.DataFrame, table_name: str, key_columns, method: str, dtype=None, schema=None, refresh=True,
+) -> dict:
+    """Fusionne le DataFrame dans la table cible en une seule transaction.
+
+    Seules les lignes nouvelles ou modifiées sont écrites : l'empreinte de chaque
+    ligne est comparée à celle de l'index des empreintes (``<table>_row_hashes``).
+    Elles sont d'abord écrites dans une table de staging, puis fusionnées avec
+    INSERT ... ON CONFLICT DO UPDATE. La staging est supprimée avant le commit :
+    les lecteurs ne voient jamais ni la staging ni une table cible à moitié chargée.
+    Sans ligne à écrire, rien n'est écrit et le filigrane ne change pas.
+
+    Returns:
+        dict: {"inserted", "updated", "skipped"} nombre de lignes
+    """
+    missing = [c for c in key_columns if c not in dataframe.columns]
+    if missing:
+        raise ValueError(f"Colonnes de clé absentes du DataFrame : {missing}")
+
+    # Une clé nulle ne peut pas être fusionnée, et ON CONFLICT refuse
+    # de mettre à jour deux fois la même ligne dans une même commande.
+    before = len(dataframe)
+    dataframe = dataframe.dropna(subset=list(key_columns))
+    dataframe = dataframe.drop_duplicates(subset=list(key_columns), keep="last")
+    if len(dataframe) < before:
+        logger.warning(f"{before - len(dataframe)} lignes ignorées (clé nulle ou dupliquée)")
+
+    staging_table = f"{table_name}_staging_{uuid.uuid4().hex[:8]}"
+    columns = ", ".join(_quote(c) for c in dataframe.columns)
+    conflict = ", ".join(_quote(c) for c in key_columns)
+    updates = ", ".join(
+        f"{_quote(c)} = EXCLUDED.{_quote(c)}" for c in dataframe.columns if c not in key_columns
+    )
+    on_conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+
+    keys = ", ".join(_quote(c) for c in key_columns)
+    hashes = hash_table_name(table_name)
+
+    with engine.begin() as connection:
+        # Requêtes propres à chaque staging (nom unique) : hors du cache de compilation
+        # de SQLAlchemy, qu'elles rempliraient à chaque chargement (mode continu)
+        connection.execution_options(compiled_cache=None)
+        if _ensure_target_table(connection, dataframe, table_name, key_columns, dtype):
+            # Table (re)créée : les empreintes d'une table supprimée ne valent plus rien
+            connection.execute(text(f"DROP TABLE IF EXISTS {_quote(hashes)}"))
+        _ensure_hash_index(connection, dataframe, table_name, key_columns, dtype, schema)
+
+        # Comparaison des empreintes : nouvelle clé -> insert, empreinte différente -> update
+        current = row_hashes(dataframe, key_columns)
+        stored = _stored_hashes(connection, dataframe, table_name, key_columns, schema)
+        previous = stored.reindex(_key_index(dataframe, key_columns)).to_numpy()
+        is_new = pd.isna(previous)
+        changed = is_new | (previous != current.to_numpy())
+        counts = {
+            "inserted": int(is_new.sum()),
+            "updated": int((changed & ~is_new).sum()),
+            "skipped": int((~changed).sum()),
+        }
+        if not changed.any():
+            logger.info(f"Aucune ligne nouvelle ou modifiée pour '{table_name}' ({counts['skipped']} inchangées)")
+            return counts
+
+        dataframe = dataframe[changed].assign(**{HASH_COLUMN: current[changed]})
+        # La staging reprend les types de la table cible (pas ceux inférés par pandas)
+        connection.execute(text(
+            f"CREATE TABLE {_quote(staging_table)} AS "
+            f"SELECT {columns} FROM {_quote(table_name)} WHERE 1 = 0"
+        ))
+        connection.execute(text(f"ALTER TABLE {_quote(staging_table)} ADD COLUMN {HASH_COLUMN} BIGINT"))
+        _write_frame(connection, dataframe, staging_table, "append", method, dtype)
+        # "WHERE true" lève l'ambiguïté SELECT ... ON CONFLICT (nécessaire pour SQLite)
+        connection.execute(text(
+            f"INSERT INTO {_quote(table_name)} ({columns}) "
+            f"SELECT {columns} FROM {_quote(staging_table)} WHERE true "
+            f"ON CONFLICT ({conflict}) {on_conflict}"
+        ))
+        connection.execute(text(
+            f"INSERT INTO {_quote(hashes)} ({keys}, {HASH_COLUMN}) "
+            f"SELECT {keys}, {HASH_COLUMN} FROM {_quote(staging_table)} WHERE true "
+            f"ON CONFLICT ({conflict}) DO UPDATE SET {HASH_COLUMN} = EXCLUDED.{HASH_COLUMN}"
+        ))
+        connection.execute(text(f"DROP TABLE {_quote(staging_table)}"))
+        _publish(connection, table_name, len(dataframe), refresh)
+        logger.info(
+            f"'{table_name}' : {counts['inserted']} lignes insérées, {counts['updated']} mises à jour, "
+            f"{counts['skipped']} inchangées (non réécrites)"
         )
+    return counts
+
+
+def load_to_postgresql(
+    dataframe: pd.DataFrame,
+    table_name: str,
+    mode: str = None,
+    key_columns=KEY_COLUMNS,
+    method: str = None,
+    schema: dict = None,
+    refresh: bool = True,
+) -> bool:
+    """Charge un DataFrame pandas dans une table PostgreSQL en utilisant SQLAlchemy.
+
+    - Fait confiance au DataFrame typé par transform ; seules les colonnes
+      non conformes au schéma (``STOCK_PRICES_SCHEMA`` par défaut) sont converties
+    - Utilise to_sql avec un engine SQLAlchemy (nécessite pandas < 2.2.0)
+
+    Modes de chargement (``LOAD_MODE`` par défaut) :
+    - "replace" : supprime et recrée la table à chaque run
+    - "append"  : ajoute les lignes à la table existante
+    - "upsert"  : fusionne les lignes sur ``key_columns`` (name, date) via une table
+      de staging et INSERT ... ON CONFLICT DO UPDATE ; l'historique est conservé.
+      Les lignes identiques à celles en base (même empreinte) ne sont pas réécrites ;
+      le span "load" compte les lignes insérées, mises à jour et ignorées
+
+    Chaque chargement rafraîchit, dans la même transaction, les tables de service du
+    dashboard (serving.py : dernier cours, agrégats journaliers) puis incrémente le
+    filigrane de la table (db.write_watermark) : le dashboard invalide son cache sur
+    ce filigrane. Avec ``refresh=False`` (chargements successifs d'un même run), seul
+    le rafraîchissement des tables de service est différé (refresh_serving_tables).
+
+    Méthodes d'écriture (``LOAD_METHOD`` par défaut) :
+    - "copy"  : COPY ... FROM STDIN via un buffer CSV en mémoire (PostgreSQL/psycopg2,
+      repli automatique sur "multi" pour les autres moteurs)
+    - "multi" : INSERT multi-lignes de pandas (to_sql, method="multi")
+    """
+    mode = mode or LOAD_MODE
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Mode de chargement inconnu : {mode!r} (attendu : {LOAD_MODES})")
+    method = method or LOAD_METHOD
+    if method not in LOAD_METHODS:
+        raise ValueError(f"Méthode d'écriture inconnue : {method!r} (attendu : {LOAD_METHODS})")
+
+    # Span "load" : durée, lignes chargées et échecs par table
+    with get_metrics().span("load", table=table_name, mode=mode) as span:
+        try:
+            # Ne pas logguer le mot de passe en clair
+            logger.info(f"Tentative de connexion à : {safe_url(get_database_url())}")
+            logger.info(f"DataFrame à charger (extrait) : \n{dataframe.head()}")
+
+            # Typage selon le schéma déclaré (aucune copie si le DataFrame est déjà conforme)
+            schema = schema or STOCK_PRICES_SCHEMA
+            dataframe = conform(dataframe, schema)
+            dtype = sql_dtypes(dataframe, schema)
+
+            # Engine partagé du processus (pool de connexions, pool_pre_ping évite les connexions stale)
+            engine = get_engine()
+
+            # Filtrer les lignes vides (ex: nom absent)
+            dataframe = dataframe.dropna(subset=[c for c in ["name"] if c in dataframe.columns], how="any")
+            span.set(rows=len(dataframe))
+
+            # --- CORRECTION ---
+            # Revenir à la méthode standard (con=engine) qui fonctionne
+            # parfaitement avec pandas 2.1.4 et les versions antérieures.
         
-        logger.info("Données chargées, vérification du nombre de lignes...")
+            logger.info(f"Tentative d'écriture dans la base de données (mode {mode}, méthode {method})...")
+
+            if mode == "upsert":
+                span.set(**_upsert(engine, dataframe, table_name, key_columns, method, dtype, schema, refresh))
+            else:
+                with engine.begin() as connection:  # <-- to_sql accepte aussi une connexion avec pandas < 2.2.0
+                    if mode == "replace":
+                        # Les vues matérialisées empêcheraient de supprimer la table
+                        drop_serving(connection, table_name)
+                    _write_frame(connection, dataframe, table_name, mode, method, dtype)
+                    # Empreintes périmées : l'index sera reconstruit au prochain upsert
+                    connection.execute(text(f"DROP TABLE IF EXISTS {_quote(hash_table_name(table_name))}"))
+                    _publish(connection, table_name, len(dataframe), refresh)
         
-        # Vérification rapide du nombre de lignes
-        with engine.connect() as connection_check:
-            result = connection_check.execute(text(f"SELECT COUNT(*) FROM {table_name}"))
-            count = result.scalar()
-            logger.info(f"Nombre de lignes dans la table (après insert): {count}")
-            
-        logger.info("Opération terminée avec succès.")
-        # --- FIN DE LA CORRECTION ---
-
-        return True
-
-    except Exception as e:
-        logger.error(f"Erreur lors du chargement des données : {e}")
-        logger.error(f"Type d'erreur : {type(e).__name__}")
-        raise
+            # Diagnostic en niveau DEBUG seulement : un COUNT(*) parcourt toute la table,
+            # à chaque morceau (chunked.py) et à chaque micro-lot (stream.py)
+            if logger.isEnabledFor(logging.DEBUG):
+                with engine.connect() as connection_check:
+                    count = connection_check.execute(text(f"SELECT COUNT(*) FROM {_quote(table_name)}")).scalar()
+                logger.debug(f"Nombre de lignes dans la table (après insert): {count}")
+
+            logger.info("Opération terminée avec succès.")
+            # --- FIN DE LA CORRECTION ---
+
+            return True
+
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement des données : {e}")
+            logger.error(f"Type d'erreur : {type(e).__name__}")
+            raise
 
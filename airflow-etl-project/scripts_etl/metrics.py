@@ -0,0 +1,356 @@
+# --- MÉTRIQUES ET TRACES DU PIPELINE ---
+# Instrumentation intégrée de l'ETL, sans print ni ligne de log à parser :
+# - spans : durée d'une opération (stratégie de scraping, cours d'un ticker, transform,
+#   load...), avec ses labels et ses compteurs (lignes, octets), et son issue,
+# - compteurs : lignes, octets transférés, échecs, relances.
+#
+# Les mesures sont agrégées en mémoire et envoyées à des "sinks" :
+# - JsonLogSink        : une ligne JSON par span (logger "etl.metrics"),
+# - PrometheusTextfileSink : fichier <job>.prom pour le textfile collector de node_exporter,
+#   réécrit au plus toutes les ETL_METRICS_TEXTFILE_INTERVAL secondes en cours de run
+#   (tâches longues, arrêt brutal) et à chaque flush,
+# - StatsdSink         : datagrammes UDP StatsD (tags au format DogStatsD),
+# - NullSink           : aucune sortie (tests) ; les agrégats restent consultables.
+#
+# Configuration (variables d'environnement) : ETL_METRICS_JSON (1 par défaut),
+# ETL_METRICS_TEXTFILE_DIR, ETL_METRICS_TEXTFILE_INTERVAL (15 s), STATSD_HOST / STATSD_PORT / STATSD_PREFIX.
+
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION (variables d'environnement) ---
+METRICS_JSON = os.getenv("ETL_METRICS_JSON", "1").lower() in ("1", "true", "yes")
+METRICS_TEXTFILE_DIR = os.getenv("ETL_METRICS_TEXTFILE_DIR")
+METRICS_TEXTFILE_INTERVAL = float(os.getenv("ETL_METRICS_TEXTFILE_INTERVAL", "15"))
+STATSD_HOST = os.getenv("STATSD_HOST")
+STATSD_PORT = int(os.getenv("STATSD_PORT", "8125"))
+STATSD_PREFIX = os.getenv("STATSD_PREFIX", "etl")
+
+# Préfixe des noms de métriques Prometheus
+METRIC_PREFIX = "etl"
+
+
+def _labels_key(labels):
+    """Labels sous forme hashable et ordonnée (clé des agrégats)."""
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+# --- SINKS ---
+
+class NullSink:
+    """Sink sans sortie : interface commune de tous les sinks (utilisé tel quel dans les tests)."""
+
+    def span(self, event):
+        """Un span terminé (dictionnaire : name, duration_ms, status, labels, champs)."""
+
+    def counter(self, name, value, labels):
+        """Un incrément de compteur."""
+
+    def timing(self, name, seconds, labels):
+        """Une durée mesurée."""
+
+    def tick(self, metrics):
+        """Après chaque span (registre verrouillé) : écriture périodique des agrégats."""
+
+    def flush(self, metrics):
+        """Fin de run : écrit les agrégats si le sink en a besoin."""
+
+
+class JsonLogSink(NullSink):
+    """Une ligne JSON par span, sur un logger dédié (sans préfixe de format)."""
+
+    def __init__(self, stream=None):
+        self.logger = logging.getLogger("etl.metrics")
+        if not self.logger.handlers:
+            handler = logging.StreamHandler(stream or sys.stderr)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+
+    def span(self, event):
+        self.logger.info(json.dumps(event, ensure_ascii=False, default=str))
+
+    def flush(self, metrics):
+        counters = {
+            name + "".join(f"[{k}={v}]" for k, v in labels): value
+            for (name, labels), value in sorted(metrics.counters.items())
+        }
+        self.logger.info(json.dumps(
+            {"ts": _now(), "event": "summary", "job": metrics.job, "counters": counters}, ensure_ascii=False,
+        ))
+
+
+class PrometheusTextfileSink(NullSink):
+    """Écrit les agrégats au format texte Prometheus dans ``<directory>/<job>.prom``.
+
+    Les compteurs deviennent des counters, les durées des summaries (_count, _sum)
+    accompagnées d'une gauge _max (le ticker le plus lent reste visible).
+    Le fichier est aussi réécrit après un span dès que ``interval`` secondes se sont
+    écoulées depuis la dernière écriture : une tâche longue (séance continue, backfill)
+    est visible pendant son exécution, et ses mesures survivent à un arrêt brutal.
+    """
+
+    def __init__(self, directory, interval=METRICS_TEXTFILE_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self._written_at = None
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ""
+        escaped = (
+            key + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+            for key, value in labels
+        )
+        return "{" + ",".join(escaped) + "}"
+
+    def render(self, metrics):
+        lines = []
+        for name in sorted({name for name, _ in metrics.counters}):
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} counter")
+            for (counter, labels), value in sorted(metrics.counters.items()):
+                if counter == name:
+                    lines.append(f"{metric}{self._format_labels(labels)} {value:g}")
+        for name in sorted({name for name, _ in metrics.timings}):
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} summary")
+            maxima = []
+            for (timing, labels), (count, total, maximum) in sorted(metrics.timings.items()):
+                if timing == name:
+                    lines.append(f"{metric}_count{self._format_labels(labels)} {count}")
+                    lines.append(f"{metric}_sum{self._format_labels(labels)} {total:.6f}")
+                    maxima.append(f"{metric}_max{self._format_labels(labels)} {maximum:.6f}")
+            lines.append(f"# TYPE {metric}_max gauge")
+            lines.extend(maxima)
+        return "\n".join(lines) + "\n"
+
+    def tick(self, metrics):
+        if self._written_at is None or time.monotonic() - self._written_at >= self.interval:
+            self.flush(metrics)
+
+    def flush(self, metrics):
+        self._written_at = time.monotonic()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{metrics.job}.prom")
+        # Fichier temporaire puis os.replace : le collector ne lit jamais un fichier partiel
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render(metrics))
+        os.replace(tmp_path, path)
+
+
+class StatsdSink(NullSink):
+    """Envoie compteurs et durées en UDP (``name:valeur|c`` / ``name:ms|ms``, tags DogStatsD)."""
+
+    def __init__(self, host, port=8125, prefix=STATSD_PREFIX):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+    def _send(self, name, value, kind, labels):
+        tags = ",".join(f"{key}:{value}" for key, value in labels)
+        payload = f"{self.prefix}.{name}:{value}|{kind}" + (f"|#{tags}" if tags else "")
+        try:
+            self.socket.sendto(payload.encode("utf-8"), self.address)
+        except OSError as e:
+            # Les métriques ne doivent jamais faire échouer le pipeline
+            logger.debug(f"Envoi StatsD impossible : {e}")
+
+    def counter(self, name, value, labels):
+        self._send(name, f"{value:g}", "c", labels)
+
+    def timing(self, name, seconds, labels):
+        self._send(name, f"{seconds * 1000:.3f}", "ms", labels)
+
+
+# --- SPANS ET REGISTRE ---
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def memory_mb():
+    """Mémoire du processus (Mo) : (résidente actuelle, pic depuis le démarrage)."""
+    import resource  # Unix seulement (conteneurs Linux)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Ko sous Linux
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError):
+        current = peak
+    return current, peak
+
+
+class Span:
+    """
+    Mesure d'une opération (à utiliser avec ``with``, y compris dans du code async).
+
+    ``set`` attache des champs au span ; les champs numériques (rows, bytes...) sont
+    aussi cumulés dans les compteurs ``<span>_<champ>_total``. À la sortie, la durée
+    est enregistrée dans ``<span>_seconds`` ; une exception (qui se propage) ou un
+    appel à ``fail`` incrémente ``<span>_failures_total``.
+    """
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.fields = {}
+        self.status = "ok"
+        self.duration = None
+        self._start = None
+
+    def set(self, **fields):
+        self.fields.update(fields)
+        return self
+
+    def fail(self, status="error"):
+        """Marque le span en échec sans exception (ex: erreur gérée, liste rejetée)."""
+        self.status = status
+        return self
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._start
+        if exc_type is not None:
+            self.status = "cancelled" if exc_type.__name__ == "CancelledError" else "error"
+            self.fields.setdefault("error", f"{exc_type.__name__}: {exc}")
+        self.metrics._finish(self)
+        return False
+
+
+class Metrics:
+    """
+    Registre des métriques d'un processus : agrégats en mémoire et envoi aux sinks.
+
+    Attributes:
+        job (str): Nom du job (fichier Prometheus, résumé JSON), ex: "fetch-shard-001".
+        counters (dict): {(nom, labels): valeur}
+        timings (dict): {(nom, labels): [nombre, somme (s), maximum (s)]}
+    """
+
+    def __init__(self, sinks=None, job="etl"):
+        self.sinks = list(sinks) if sinks is not None else [NullSink()]
+        self.job = job
+        self.counters = {}
+        self.timings = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, value=1, **labels):
+        """Ajoute ``value`` au compteur ``name`` (ex: incr("quote_retries_total", symbol="AI.PA"))."""
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        for sink in self.sinks:
+            sink.counter(name, value, key[1])
+
+    def observe(self, name, seconds, **labels):
+        """Enregistre une durée (secondes) dans ``name``."""
+        key = (name, _labels_key(labels))
+        with self._lock:
+            stats = self.timings.setdefault(key, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+        for sink in self.sinks:
+            sink.timing(name, seconds, key[1])
+
+    def span(self, name, **labels):
+        """Ouvre un span : ``with metrics.span("load", table="stock_prices") as span: ...``"""
+        return Span(self, name, labels)
+
+    def _finish(self, span):
+        self.observe(f"{span.name}_seconds", span.duration, **span.labels)
+        for field, value in span.fields.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.incr(f"{span.name}_{field}_total", value, **span.labels)
+        if span.status not in ("ok", "cancelled"):
+            # Une opération annulée (stratégie battue par une autre) n'est pas un échec
+            self.incr(f"{span.name}_failures_total", **span.labels)
+        event = {
+            "ts": _now(),
+            "event": "span",
+            "job": self.job,
+            "name": span.name,
+            "duration_ms": round(span.duration * 1000, 3),
+            "status": span.status,
+            **{key: value for key, value in span.labels.items() if value is not None},
+            **span.fields,
+        }
+        for sink in self.sinks:
+            sink.span(event)
+        for sink in self.sinks:
+            try:
+                # Verrou : les agrégats ne changent pas pendant l'écriture
+                with self._lock:
+                    sink.tick(self)
+            except OSError as e:
+                logger.warning(f"Écriture des métriques impossible ({type(sink).__name__}) : {e}")
+
+    def total(self, name, **labels):
+        """Valeur d'un compteur (somme sur les labels non précisés)."""
+        wanted = set(_labels_key(labels))
+        return sum(
+            value for (counter, key), value in self.counters.items()
+            if counter == name and wanted <= set(key)
+        )
+
+    def flush(self):
+        """Fin de run : les sinks écrivent leurs agrégats (fichier Prometheus, résumé JSON)."""
+        for sink in self.sinks:
+            try:
+                sink.flush(self)
+            except OSError as e:
+                logger.warning(f"Écriture des métriques impossible ({type(sink).__name__}) : {e}")
+
+
+def sinks_from_env():
+    """Sinks activés par l'environnement (logs JSON par défaut)."""
+    sinks = []
+    if METRICS_JSON:
+        sinks.append(JsonLogSink())
+    if METRICS_TEXTFILE_DIR:
+        sinks.append(PrometheusTextfileSink(METRICS_TEXTFILE_DIR))
+    if STATSD_HOST:
+        sinks.append(StatsdSink(STATSD_HOST, STATSD_PORT))
+    return sinks or [NullSink()]
+
+
+# Registre du processus : sans configuration, les mesures sont agrégées sans sortie
+_metrics = Metrics()
+
+
+def get_metrics():
+    """Registre courant du processus."""
+    return _metrics
+
+
+def set_metrics(metrics):
+    """Remplace le registre courant (tests, benchmarks). Renvoie le précédent."""
+    global _metrics
+    previous, _metrics = _metrics, metrics
+    return previous
+
+
+def configure_metrics(job="etl"):
+    """Installe un registre alimentant les sinks de l'environnement (points d'entrée CLI)."""
+    metrics = Metrics(sinks_from_env(), job=job)
+    set_metrics(metrics)
+    return metrics
@@ -0,0 +1,366 @@
+# --- PIPELINE PAR ÉTAPES (TÂCHES DU DAG) ---
+# Le pipeline d'extract.py découpé en étapes indépendantes, une tâche Airflow chacune :
+#   scrape    : liste des entreprises, découpée en shards de ETL_SHARD_SIZE tickers
+#   fetch     : cours d'un shard (une tâche mappée par shard, relancée seule en cas d'échec)
+#   transform : assemble les shards et construit le DataFrame typé
+#   load      : charge le DataFrame en base
+# Les étapes se passent leurs résultats par la zone de staging (staging.py) : les cours
+# sont écrits en Parquet partitionné par jour, ce qui permet de relancer transform ou
+# load sans interroger à nouveau le fournisseur.
+#
+# Points de reprise : chaque run tient dans son dossier (run_dir) un checkpoint.json
+# des étapes terminées ; chaque shard terminé a son marqueur. Une étape déjà terminée
+# n'est pas refaite (sauf --restart), et un shard rechargé invalide les étapes qui
+# en dépendent. run_all enchaîne les étapes dans un seul processus (extract.py) : une
+# relance reprend à la première étape incomplète, et ne récupère que les shards manquants.
+#
+# Usage : python pipeline.py scrape|fetch|transform|load|all --run-id <id> [--shard N] [--restart]
+# L'étape scrape écrit son plan en JSON sur la dernière ligne (XCom du DockerOperator).
+#
+# pandas, pyarrow, SQLAlchemy et yfinance (load, quotes, schema, staging, transform)
+# sont importés par les étapes qui s'en servent : "import pipeline" reste rapide.
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from browser import close_browser
+from extract import get_companies, get_stock_prices
+from metrics import configure_metrics, get_metrics
+from provider_client import ProviderClient
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Nombre de tickers par shard (une tâche fetch par shard)
+SHARD_SIZE = int(os.getenv("ETL_SHARD_SIZE", "10"))
+# Âge maximal (secondes) d'un run incomplet repris par run_all : au-delà, ses cours sont périmés
+RESUME_MAX_AGE = float(os.getenv("ETL_RESUME_MAX_AGE", str(6 * 3600)))
+
+# Étapes dans l'ordre : une étape refaite invalide les suivantes
+STAGES = ("scrape", "fetch", "transform", "load")
+
+
+def _plan_path(base):
+    return os.path.join(base, "plan.json")
+
+
+def _companies_path(base, shard):
+    return os.path.join(base, "companies", f"shard-{shard:03d}.json")
+
+
+def _quotes_dir(base):
+    return os.path.join(base, "quotes")
+
+
+def _shard_marker(base, shard):
+    # Préfixe "_" : ignoré par la lecture du dataset Parquet
+    return os.path.join(_quotes_dir(base), f"_shard-{shard:03d}.json")
+
+
+def _stock_prices_dir(base):
+    return os.path.join(base, "stock_prices")
+
+
+def _checkpoint_path(base):
+    return os.path.join(base, "checkpoint.json")
+
+
+# --- POINTS DE REPRISE ---
+
+def read_checkpoint(run_id, root=None):
+    """Étapes terminées du run ({"run_id", "started_at", "stages": {étape: infos}}).
+
+    Sans checkpoint (aucune étape terminée), le run a commencé à la dernière
+    modification de son dossier : un run dont le scrape n'a jamais abouti vieillit
+    comme les autres et n'est plus repris au-delà de ``RESUME_MAX_AGE``.
+    """
+    from staging import read_json, run_dir
+
+    base = run_dir(run_id, root)
+    path = _checkpoint_path(base)
+    if not os.path.exists(path):
+        started_at = os.path.getmtime(base) if os.path.isdir(base) else time.time()
+        return {"run_id": run_id, "started_at": started_at, "stages": {}}
+    return read_json(path)
+
+
+def stage_done(run_id, stage, root=None):
+    """Infos de l'étape si elle est terminée, None sinon."""
+    return read_checkpoint(run_id, root)["stages"].get(stage)
+
+
+def complete_stage(run_id, stage, root=None, **info):
+    """Enregistre la fin d'une étape ; les étapes suivantes, calculées sur l'ancien
+    résultat, sont à refaire."""
+    from staging import run_dir, write_json
+
+    checkpoint = read_checkpoint(run_id, root)
+    stages = checkpoint["stages"]
+    for later in STAGES[STAGES.index(stage) + 1:]:
+        stages.pop(later, None)
+    stages[stage] = {"finished_at": time.time(), **info}
+    write_json(_checkpoint_path(run_dir(run_id, root)), checkpoint)
+
+
+def invalidate_stages(run_id, stage, root=None):
+    """Marque ``stage`` et les étapes suivantes comme à refaire."""
+    from staging import run_dir, write_json
+
+    checkpoint = read_checkpoint(run_id, root)
+    stages = checkpoint["stages"]
+    if any(later in stages for later in STAGES[STAGES.index(stage):]):
+        for later in STAGES[STAGES.index(stage):]:
+            stages.pop(later, None)
+        write_json(_checkpoint_path(run_dir(run_id, root)), checkpoint)
+
+
+def resumable_run(prefix, root=None, max_age=None, now=None):
+    """Dernier run ``prefix-...`` incomplet et assez récent pour être repris, None sinon."""
+    from staging import STAGING_DIR
+
+    runs = os.path.join(root or STAGING_DIR, "runs")
+    max_age = RESUME_MAX_AGE if max_age is None else max_age
+    now = now or time.time()
+    if not os.path.isdir(runs):
+        return None
+    names = [entry.name for entry in os.scandir(runs) if entry.name.startswith(f"{prefix}-")]
+    if not names:
+        return None
+    # Seul le plus récent compte : un run plus ancien a été remplacé par un nouveau
+    checkpoint = read_checkpoint(max(names), root)
+    if "load" not in checkpoint["stages"] and now - checkpoint["started_at"] <= max_age:
+        return max(names)
+    return None
+
+
+def new_run_id(prefix, now=None):
+    """Identifiant d'un nouveau run, triable par date ("extract-20240102T173500")."""
+    return f"{prefix}-{time.strftime('%Y%m%dT%H%M%S', time.localtime(now))}"
+
+
+async def run_scrape(run_id, companies=None, shard_size=None, root=None, restart=False):
+    """
+    Étape scrape : récupère les entreprises (avec leur ticker) et les répartit en shards.
+    Si l'étape est déjà terminée pour ce run, son plan est relu (sauf avec ``restart``).
+
+    Returns:
+        dict: plan du run {"run_id", "shards": [numéros de shard], "companies": nombre}
+    """
+    from staging import purge_runs, read_json, run_dir, write_json
+
+    purge_runs(root)
+    base = run_dir(run_id, root)
+    if not restart and stage_done(run_id, "scrape", root) and os.path.exists(_plan_path(base)):
+        logger.info(f"Reprise du run {run_id} : liste des entreprises déjà répartie en shards")
+        return read_json(_plan_path(base))
+
+    shard_size = shard_size or SHARD_SIZE
+    if companies is None:
+        try:
+            companies = await get_companies()
+        finally:
+            await close_browser()
+    if not companies:
+        raise RuntimeError("Échec de toutes les méthodes de scraping")
+
+    # Une liste rescrapée remplace les shards (et leurs cours) d'une tentative précédente
+    shutil.rmtree(os.path.join(base, "companies"), ignore_errors=True)
+    shutil.rmtree(_quotes_dir(base), ignore_errors=True)
+    shards = [companies[i:i + shard_size] for i in range(0, len(companies), shard_size)]
+    for shard, shard_companies in enumerate(shards):
+        write_json(_companies_path(base, shard), shard_companies)
+    plan = {"run_id": run_id, "shards": list(range(len(shards))), "companies": len(companies)}
+    write_json(_plan_path(base), plan)
+    complete_stage(run_id, "scrape", root, companies=len(companies), shards=len(shards))
+    logger.info(f"{len(companies)} entreprises réparties en {len(shards)} shards de {shard_size} tickers")
+    return plan
+
+
+async def run_fetch(run_id, shard, provider=None, root=None, restart=False, client=None, executor=None):
+    """
+    Étape fetch : récupère les cours d'un shard et les écrit dans la zone de staging.
+
+    Échoue si aucun cours du shard n'a pu être récupéré : Airflow relance alors
+    uniquement ce shard. Un shard déjà récupéré (marqueur présent) n'est pas refait,
+    sauf avec ``restart``.
+
+    Args:
+        client, executor: Limiteur et pool de threads partagés par les shards d'un même processus.
+    """
+    from staging import read_json, run_dir, write_dataset, write_json
+    from transform import transform
+
+    base = run_dir(run_id, root)
+    marker = _shard_marker(base, shard)
+    if not restart and os.path.exists(marker):
+        logger.info(f"Shard {shard} déjà récupéré")
+        return read_json(marker)["rows"]
+
+    companies = read_json(_companies_path(base, shard))
+    records = await get_stock_prices(companies, provider=provider, client=client, executor=executor)
+
+    available = sum(1 for record in records if record.get("price") != "N/A")
+    if companies and not available:
+        raise RuntimeError(f"Shard {shard} : aucun cours récupéré sur {len(companies)} tickers")
+    # Les fichiers du shard remplacent ceux d'une tentative précédente ; le marqueur,
+    # écrit en dernier, signale à transform que le shard est complet
+    write_dataset(_quotes_dir(base), transform(records), partition_by=("day",), basename=f"shard-{shard:03d}")
+    # Les étapes suivantes ont été calculées sans ces cours
+    invalidate_stages(run_id, "fetch", root)
+    write_json(marker, {"rows": len(records), "available": available})
+    logger.info(f"Shard {shard} : {available}/{len(records)} cours récupérés")
+    return len(records)
+
+
+def run_transform(run_id, root=None, restart=False):
+    """Étape transform : assemble les cours de tous les shards et écrit le jeu de données final.
+
+    Les lignes sans nom sont écartées et une seule ligne est gardée par (nom, date).
+    """
+    from load import KEY_COLUMNS
+    from schema import STOCK_PRICES_SCHEMA, conform
+    from staging import read_dataset, read_json, run_dir, write_dataset
+
+    done = None if restart else stage_done(run_id, "transform", root)
+    if done:
+        logger.info(f"Étape transform déjà terminée pour le run {run_id}")
+        return done["rows"]
+
+    base = run_dir(run_id, root)
+    plan = read_json(_plan_path(base))
+    for shard in plan["shards"]:
+        if not os.path.exists(_shard_marker(base, shard)):
+            raise FileNotFoundError(f"Cours du shard {shard} absents : l'étape fetch n'a pas abouti")
+
+    dataframe = read_dataset(_quotes_dir(base), columns=list(STOCK_PRICES_SCHEMA))
+    dataframe = conform(dataframe, STOCK_PRICES_SCHEMA)
+    dataframe = dataframe.dropna(subset=["name"]).drop_duplicates(subset=list(KEY_COLUMNS), keep="last")
+
+    output = _stock_prices_dir(base)
+    shutil.rmtree(output, ignore_errors=True)
+    write_dataset(output, dataframe, partition_by=("day",))
+    complete_stage(run_id, "transform", root, rows=len(dataframe))
+    logger.info(f"{len(dataframe)} lignes transformées")
+    return len(dataframe)
+
+
+def run_load(run_id, table_name="stock_prices", root=None, restart=False):
+    """Étape load : charge en base le jeu de données final du run (colonnes du schéma uniquement)."""
+    from load import load_to_postgresql
+    from schema import STOCK_PRICES_SCHEMA
+    from staging import read_dataset, run_dir
+
+    done = None if restart else stage_done(run_id, "load", root)
+    if done:
+        logger.info(f"Étape load déjà terminée pour le run {run_id}")
+        return done["rows"]
+
+    dataframe = read_dataset(_stock_prices_dir(run_dir(run_id, root)), columns=list(STOCK_PRICES_SCHEMA))
+    load_to_postgresql(dataframe, table_name)
+    complete_stage(run_id, "load", root, rows=len(dataframe))
+    return len(dataframe)
+
+
+async def run_all(run_id=None, companies=None, provider=None, root=None, table_name="stock_prices",
+                  shard_size=None, restart=False, client=None):
+    """
+    Toutes les étapes dans un seul processus, à partir de la première incomplète.
+
+    Sans ``run_id``, le dernier run "extract-..." incomplet et récent (``RESUME_MAX_AGE``)
+    est repris ; s'il n'y en a pas, un nouveau run commence. Les shards manquants sont
+    récupérés en même temps, avec un limiteur et un pool de threads communs ; si certains
+    échouent, les autres sont conservés et le run s'arrête en erreur : la relance ne
+    récupère que ceux-là.
+
+    Returns:
+        dict: {"run_id", "fetched": shards récupérés par cet appel, "rows": lignes chargées}
+    """
+    from quotes import DEFAULT_CONCURRENCY
+    from staging import run_dir
+
+    run_id = run_id or (None if restart else resumable_run("extract", root)) or new_run_id("extract")
+    if restart:
+        shutil.rmtree(run_dir(run_id, root), ignore_errors=True)
+    completed = [stage for stage in STAGES if stage_done(run_id, stage, root)]
+    logger.info(f"Run {run_id}" + (f" repris (étapes terminées : {', '.join(completed)})" if completed else ""))
+    metrics = get_metrics()
+
+    with metrics.span("stage", stage="scrape"):
+        plan = await run_scrape(run_id, companies, shard_size, root)
+
+    base = run_dir(run_id, root)
+    pending = [shard for shard in plan["shards"] if not os.path.exists(_shard_marker(base, shard))]
+    if pending:
+        client = client or ProviderClient()
+        executor = ThreadPoolExecutor(max_workers=max(1, DEFAULT_CONCURRENCY), thread_name_prefix="shards")
+        try:
+            with metrics.span("stage", stage="fetch") as span:
+                results = await asyncio.gather(
+                    *(run_fetch(run_id, shard, provider, root, client=client, executor=executor) for shard in pending),
+                    return_exceptions=True,
+                )
+                failed = [shard for shard, result in zip(pending, results) if isinstance(result, BaseException)]
+                span.set(shards=len(pending) - len(failed))
+        finally:
+            executor.shutdown(wait=False)
+        for shard, result in zip(pending, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Shard {shard} en échec : {result}")
+        if failed:
+            raise RuntimeError(f"{len(failed)} shards en échec sur {len(plan['shards'])} : relancer pour les reprendre")
+    if not stage_done(run_id, "fetch", root):
+        complete_stage(run_id, "fetch", root, shards=len(plan["shards"]))
+
+    with metrics.span("stage", stage="transform"):
+        run_transform(run_id, root)
+    with metrics.span("stage", stage="load"):
+        rows = run_load(run_id, table_name, root)
+    return {"run_id": run_id, "fetched": len(pending), "rows": rows}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exécute une étape du pipeline ETL.")
+    parser.add_argument("stage", choices=(*STAGES, "all"))
+    parser.add_argument("--run-id", help="Identifiant du run (run_id Airflow ; étape all : run à reprendre)")
+    parser.add_argument("--shard", type=int, help="Numéro du shard (étape fetch)")
+    parser.add_argument("--restart", action="store_true", help="Refait l'étape même si elle est déjà terminée")
+    args = parser.parse_args(argv)
+    if args.stage != "all" and not args.run_id:
+        parser.error("--run-id est obligatoire pour une étape seule")
+    if args.stage == "fetch" and args.shard is None:
+        parser.error("--shard est obligatoire pour l'étape fetch")
+
+    # Un fichier de métriques par tâche (et par shard) : les conteneurs ne s'écrasent pas
+    job = f"pipeline-{args.stage}" + (f"-{args.shard:03d}" if args.stage == "fetch" else "")
+    metrics = configure_metrics(job=job)
+    try:
+        with metrics.span("stage", stage=args.stage, shard=args.shard):
+            if args.stage == "scrape":
+                plan = asyncio.run(run_scrape(args.run_id, restart=args.restart))
+            elif args.stage == "fetch":
+                asyncio.run(run_fetch(args.run_id, args.shard, restart=args.restart))
+            elif args.stage == "transform":
+                run_transform(args.run_id, restart=args.restart)
+            elif args.stage == "load":
+                run_load(args.run_id, restart=args.restart)
+            else:
+                asyncio.run(run_all(args.run_id, restart=args.restart))
+    finally:
+        metrics.flush()
+
+    if args.stage == "scrape":
+        # Dernière ligne de la sortie : le plan, récupéré en XCom par le DockerOperator
+        sys.stdout.flush()
+        print(json.dumps(plan), flush=True)
+
+
+if __name__ == "__main__":
+    main()
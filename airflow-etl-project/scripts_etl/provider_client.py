@@ -0,0 +1,279 @@
+# --- CLIENT DU FOURNISSEUR DE COURS : DÉBIT, RELANCES, DISJONCTEUR ---
+# Couche commune à tous les appels au fournisseur (cours, historique) :
+# - TokenBucket    : limiteur de débit asynchrone partagé par tous les appels concurrents ;
+#   une réponse 429 (Retry-After) suspend tout le seau, pas seulement l'appel refusé,
+# - relances       : backoff exponentiel avec "full jitter" sur les erreurs transitoires
+#   (429, 5xx, timeout, erreur réseau, y compris celles de requests/curl_cffi utilisés
+#   par yfinance) ; les autres erreurs (ticker inconnu...) ne sont pas relancées,
+# - CircuitBreaker : au-delà d'un taux d'erreurs sur les derniers appels (toutes sauf
+#   les erreurs permanentes d'un ticker, qui ne disent rien de l'état du fournisseur),
+#   les appels échouent immédiatement (CircuitOpenError) pendant un délai de refroidissement,
+#   puis un seul appel d'essai décide de la reprise.
+
+import asyncio
+import contextlib
+import logging
+import os
+import random
+import time
+from collections import deque
+
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION (surchargeable par variables d'environnement) ---
+# Débit maximal (requêtes/s, 0 = illimité) et rafale autorisée
+PROVIDER_RATE = float(os.getenv("PROVIDER_RATE", "10"))
+PROVIDER_BURST = int(os.getenv("PROVIDER_BURST", "10"))
+# Relances sur erreur transitoire et bornes du backoff (secondes)
+PROVIDER_RETRIES = int(os.getenv("PROVIDER_RETRIES", "3"))
+PROVIDER_BACKOFF_BASE = float(os.getenv("PROVIDER_BACKOFF_BASE", "0.5"))
+PROVIDER_BACKOFF_CAP = float(os.getenv("PROVIDER_BACKOFF_CAP", "10"))
+# Disjoncteur : taux d'erreurs sur les BREAKER_WINDOW derniers appels (au moins
+# BREAKER_MIN_CALLS) au-delà duquel il s'ouvre, et durée d'ouverture (secondes)
+BREAKER_THRESHOLD = float(os.getenv("BREAKER_THRESHOLD", "0.5"))
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+
+
+class RateLimitError(Exception):
+    """Le fournisseur refuse la requête (HTTP 429) ; ``retry_after`` en secondes si connu."""
+
+    def __init__(self, message="429 Too Many Requests", retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """Disjoncteur ouvert : l'appel n'est pas tenté."""
+
+
+def _status_code(error):
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_rate_limited(error):
+    """Refus pour excès de requêtes (RateLimitError, YFRateLimitError de yfinance, HTTP 429)."""
+    return (
+        isinstance(error, RateLimitError)
+        or "RateLimit" in type(error).__name__
+        or _status_code(error) == 429
+    )
+
+
+def is_transient(error):
+    """Erreur susceptible de disparaître en relançant (débit, réseau, timeout, 5xx).
+
+    Les erreurs réseau des clients HTTP (requests, curl_cffi) héritent d'OSError ;
+    une erreur HTTP avec un statut n'est transitoire que pour un 5xx.
+    """
+    if is_rate_limited(error):
+        return True
+    status = _status_code(error)
+    if status is not None:
+        return status >= 500
+    return isinstance(error, (asyncio.TimeoutError, TimeoutError, OSError))
+
+
+def is_permanent(error):
+    """Erreur propre au ticker demandé (4xx, symbole inconnu, données absentes ou
+    illisibles) : le fournisseur a répondu, elle ne compte pas pour le disjoncteur."""
+    status = _status_code(error)
+    if status is not None:
+        return 400 <= status < 500 and not is_rate_limited(error)
+    if is_transient(error):
+        return False
+    return isinstance(error, (LookupError, ValueError, TypeError)) or any(
+        marker in type(error).__name__ for marker in ("Missing", "NotFound")
+    )
+
+
+def retry_after(error):
+    """Délai imposé par le fournisseur (attribut retry_after ou en-tête Retry-After), sinon None."""
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        value = headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=None, cap=None, rng=random):
+    """Délai avant la relance n° ``attempt`` (0, 1, ...) : uniforme dans [0, min(cap, base x 2^attempt)]."""
+    base = PROVIDER_BACKOFF_BASE if base is None else base
+    cap = PROVIDER_BACKOFF_CAP if cap is None else cap
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """
+    Limiteur de débit asynchrone : ``rate`` jetons par seconde, au plus ``burst`` en réserve.
+
+    Les appels en attente sont servis dans l'ordre d'arrivée. ``pause`` suspend la
+    distribution des jetons (Retry-After d'un 429) pour tous les appelants.
+    """
+
+    def __init__(self, rate=None, burst=None, clock=time.monotonic):
+        self.rate = PROVIDER_RATE if rate is None else rate
+        self.capacity = max(1, PROVIDER_BURST if burst is None else burst)
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.updated = clock()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = self.clock()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                if not self.rate:
+                    return
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur sur le taux d'erreurs transitoires des ``window`` derniers appels.
+
+    États : "closed" (appels normaux), "open" (échec immédiat pendant ``cooldown``
+    secondes), "half_open" (un seul appel d'essai : succès -> closed, échec -> open).
+    """
+
+    def __init__(self, threshold=None, window=None, min_calls=None, cooldown=None, clock=time.monotonic):
+        self.threshold = BREAKER_THRESHOLD if threshold is None else threshold
+        self.min_calls = BREAKER_MIN_CALLS if min_calls is None else min_calls
+        self.cooldown = BREAKER_COOLDOWN if cooldown is None else cooldown
+        self.outcomes = deque(maxlen=window or BREAKER_WINDOW)
+        self.clock = clock
+        self.state = "closed"
+        self.opened_at = None
+        self._probe = False
+
+    def before_call(self):
+        """Lève CircuitOpenError si l'appel ne doit pas être tenté."""
+        if self.state == "open":
+            if self.clock() - self.opened_at < self.cooldown:
+                raise CircuitOpenError(f"disjoncteur ouvert (fournisseur en échec, reprise dans {self.cooldown:.0f}s max)")
+            self.state = "half_open"
+            self._probe = False
+        if self.state == "half_open":
+            if self._probe:
+                raise CircuitOpenError("disjoncteur en test (appel d'essai en cours)")
+            self._probe = True
+
+    def release(self):
+        """Appel annulé, ou sans issue significative (erreur permanente) : un autre appel
+        pourra servir d'essai."""
+        if self.state == "half_open":
+            self._probe = False
+
+    def record(self, success):
+        if self.state == "half_open":
+            if success:
+                logger.info("Disjoncteur refermé : le fournisseur répond de nouveau")
+                self.state = "closed"
+                self.outcomes.clear()
+            else:
+                self._open()
+            return
+        self.outcomes.append(success)
+        failures = self.outcomes.count(False)
+        if (
+            self.state == "closed"
+            and len(self.outcomes) >= self.min_calls
+            and failures / len(self.outcomes) >= self.threshold
+        ):
+            self._open()
+
+    def _open(self):
+        logger.warning(f"Disjoncteur ouvert pour {self.cooldown:.0f}s : trop d'erreurs du fournisseur")
+        get_metrics().incr("provider_circuit_open_total")
+        self.state = "open"
+        self.opened_at = self.clock()
+        self._probe = False
+
+
+class ProviderClient:
+    """
+    Exécute les appels au fournisseur derrière le limiteur, les relances et le disjoncteur.
+
+    Une instance est partagée par tous les appels concurrents d'un run (fetch_quotes,
+    backfill) : débit et disjoncteur valent pour l'ensemble des tickers.
+    """
+
+    def __init__(self, limiter=None, breaker=None, retries=None, backoff_base=None, backoff_cap=None):
+        self.limiter = limiter or TokenBucket()
+        self.breaker = breaker or CircuitBreaker()
+        self.retries = PROVIDER_RETRIES if retries is None else retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    async def call(self, attempt, label=None, slots=None):
+        """
+        Exécute ``attempt`` (fonction sans argument renvoyant une coroutine, ex: l'appel
+        dans le pool de threads avec son timeout), relancée sur erreur transitoire.
+
+        ``slots`` (asyncio.Semaphore) borne les appels simultanés : le disjoncteur est
+        consulté une fois la place obtenue, juste avant l'appel, et les attentes de
+        backoff se font hors de ces places.
+
+        Raises:
+            CircuitOpenError: disjoncteur ouvert, l'appel n'a pas été tenté.
+            Exception: la dernière erreur si les relances sont épuisées ou l'erreur
+                n'est pas transitoire.
+        """
+        metrics = get_metrics()
+        for retry in range(self.retries + 1):
+            async with slots or contextlib.nullcontext():
+                try:
+                    self.breaker.before_call()
+                except CircuitOpenError:
+                    metrics.incr("provider_rejected_total")
+                    raise
+                try:
+                    await self.limiter.acquire()
+                    result = await attempt()
+                except asyncio.CancelledError:
+                    self.breaker.release()
+                    raise
+                except Exception as e:
+                    error = e
+                    if is_permanent(e):
+                        # Ticker inconnu... : ni succès ni échec du fournisseur
+                        self.breaker.release()
+                    else:
+                        self.breaker.record(False)
+                else:
+                    self.breaker.record(True)
+                    return result
+
+            if not is_transient(error) or retry == self.retries:
+                raise error
+            delay = backoff_delay(retry, self.backoff_base, self.backoff_cap)
+            if is_rate_limited(error):
+                metrics.incr("provider_throttled_total")
+                imposed = retry_after(error)
+                if imposed is not None:
+                    # Tous les appels attendent : inutile de se faire refuser en parallèle
+                    self.limiter.pause(imposed)
+                    delay = max(delay, imposed)
+            metrics.incr("provider_retries_total", reason=type(error).__name__)
+            logger.info(f"Relance {retry + 1}/{self.retries} de {label or 'l’appel'} dans {delay:.2f}s ({error!r})")
+            await asyncio.sleep(delay)
@@ -0,0 +1,287 @@
+# --- MOTEUR DE RÉCUPÉRATION DES COURS ---
+# Récupère les cours de bourse de façon concurrente :
+# - un pool borné de workers (threads) car les clients des fournisseurs sont synchrones,
+# - des requêtes groupées (plusieurs symboles à la fois) quand le fournisseur le permet,
+# - un timeout par requête pour qu'un ticker lent ne bloque pas tout le run,
+# - un client partagé (provider_client.py) : débit limité, relances avec backoff sur
+#   les erreurs transitoires (429...), disjoncteur quand le fournisseur ne répond plus.
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import yfinance as yf
+
+from metrics import get_metrics
+from provider_client import CircuitOpenError, ProviderClient
+
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION (surchargeable par variables d'environnement) ---
+DEFAULT_CONCURRENCY = int(os.getenv("QUOTES_CONCURRENCY", "8"))
+DEFAULT_TIMEOUT = float(os.getenv("QUOTES_TIMEOUT", "20"))
+DEFAULT_BATCH_SIZE = int(os.getenv("QUOTES_BATCH_SIZE", "20"))
+
+# Suffixe Yahoo Finance des actions cotées sur Euronext Paris
+TICKER_SUFFIX = ".PA"
+
+
+def ticker_symbol(company):
+    """Symbole Yahoo Finance de l'entreprise : celui résolu par l'index des tickers,
+    à défaut le nom suivi du suffixe de la place de cotation (celle de son indice)."""
+    return company.get("symbol") or f"{company.get('name')}{company.get('suffix') or TICKER_SUFFIX}"
+
+
+# Colonnes yfinance -> colonnes de l'historique (schema.STOCK_HISTORY_SCHEMA)
+HISTORY_FIELDS = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Adj Close": "adj_close",
+    "Volume": "volume",
+}
+
+
+def build_record(name, quote):
+    """Construit la ligne de sortie (contrat historique : 'N/A' pour les valeurs manquantes)."""
+    quote = quote or {}
+    record = {"name": name}
+    for field in ("price", "change", "open", "date"):
+        value = quote.get(field)
+        record[field] = value if value is not None else "N/A"
+    return record
+
+
+# --- INTERFACE DES FOURNISSEURS ---
+
+class QuoteProvider:
+    """
+    Interface d'un fournisseur de cours.
+
+    Un fournisseur renvoie, pour chaque symbole, un dictionnaire
+    {"price", "change", "open", "date"} (valeurs à None si absentes).
+    Les méthodes sont synchrones : le moteur les exécute dans un pool de threads.
+    Un faux fournisseur (tests, benchmarks) n'a qu'à implémenter ces méthodes.
+    """
+    # True si le fournisseur sait récupérer plusieurs symboles en une seule requête
+    supports_batch = False
+
+    def fetch_quote(self, symbol):
+        """Récupère le cours d'un seul symbole."""
+        raise NotImplementedError
+
+    def fetch_batch(self, symbols):
+        """Récupère les cours de plusieurs symboles. Renvoie {symbole: cours}."""
+        raise NotImplementedError
+
+    def fetch_history(self, symbols, start, end):
+        """Récupère les barres journalières de plusieurs symboles entre ``start`` (inclus)
+        et ``end`` (exclu). Renvoie {symbole: DataFrame} indexé par date (sans fuseau),
+        avec les colonnes open, high, low, close, adj_close, volume."""
+        raise NotImplementedError
+
+
+class YFinanceProvider(QuoteProvider):
+    """Fournisseur basé sur yfinance (Yahoo Finance)."""
+    supports_batch = True
+
+    def fetch_quote(self, symbol):
+        info = yf.Ticker(symbol).info  # Fait l'appel API
+
+        # yfinance peut retourner un timestamp (int) ou une date (str)
+        market_time = info.get("regularMarketTime")
+        if isinstance(market_time, (int, float)):
+            market_time = pd.to_datetime(market_time, unit="s", origin="unix")
+
+        return {
+            "price": info.get("regularMarketPrice"),
+            "change": info.get("regularMarketChangePercent"),
+            "open": info.get("regularMarketOpen"),
+            "date": market_time,
+        }
+
+    def fetch_batch(self, symbols):
+        # Un seul appel yf.download pour tout le lot : les dernières barres
+        # journalières donnent le cours, l'ouverture et la variation (vs clôture précédente).
+        data = yf.download(
+            list(symbols),
+            period="5d",
+            interval="1d",
+            group_by="ticker",
+            auto_adjust=False,
+            progress=False,
+            threads=False,
+        )
+        quotes = {}
+        if data is None or data.empty:
+            return quotes
+
+        for symbol in symbols:
+            frame = self._symbol_frame(data, symbol)
+            if frame is None:
+                continue
+            frame = frame.dropna(subset=["Close"])
+            if frame.empty:
+                continue
+
+            last = frame.iloc[-1]
+            previous_close = frame["Close"].iloc[-2] if len(frame) > 1 else None
+            change = None
+            if previous_close:
+                change = float((last["Close"] / previous_close - 1) * 100)
+
+            quotes[symbol] = {
+                "price": float(last["Close"]),
+                "change": change,
+                "open": float(last["Open"]) if pd.notna(last["Open"]) else None,
+                "date": frame.index[-1],
+            }
+        return quotes
+
+    def fetch_history(self, symbols, start, end):
+        data = yf.download(
+            list(symbols),
+            start=start,
+            end=end,
+            interval="1d",
+            group_by="ticker",
+            auto_adjust=False,
+            actions=False,
+            progress=False,
+            threads=False,
+        )
+        history = {}
+        if data is None or data.empty:
+            return history
+
+        for symbol in symbols:
+            frame = self._symbol_frame(data, symbol)
+            if frame is None:
+                continue
+            frame = frame.rename(columns=HISTORY_FIELDS).reindex(columns=list(HISTORY_FIELDS.values()))
+            frame = frame.dropna(subset=["close"])
+            if frame.empty:
+                continue
+            if frame.index.tz is not None:
+                frame.index = frame.index.tz_localize(None)
+            history[symbol] = frame
+        return history
+
+    @staticmethod
+    def _symbol_frame(data, symbol):
+        """Colonnes d'un symbole dans le résultat de yf.download (None s'il est absent)."""
+        if isinstance(data.columns, pd.MultiIndex):
+            if symbol not in data.columns.get_level_values(0):
+                return None
+            return data[symbol]
+        return data
+
+
+# --- MOTEUR CONCURRENT ---
+
+async def fetch_quotes(companies, provider=None, concurrency=None, timeout=None, batch_size=None, client=None,
+                       executor=None):
+    """
+    Récupère les cours de toutes les entreprises de façon concurrente.
+
+    Args:
+        companies (list): Liste de dictionnaires contenant au moins la clé "name"
+            (et "symbol" si le ticker a été résolu).
+        provider (QuoteProvider): Fournisseur de cours (yfinance par défaut).
+        concurrency (int): Nombre maximal de requêtes simultanées.
+        timeout (float): Délai maximal (secondes) d'une requête (un ticker ou un lot).
+        batch_size (int): Nombre de symboles par requête groupée (1 = désactivé).
+        client (ProviderClient): Limiteur, relances et disjoncteur partagés par tous
+            les appels (un nouveau client configuré par l'environnement par défaut).
+        executor (ThreadPoolExecutor): Pool de threads à réutiliser d'un appel à l'autre
+            (mode continu) ; par défaut un pool est créé puis libéré à chaque appel.
+
+    Returns:
+        list: Une ligne par entreprise, dans l'ordre d'entrée
+        (clés name, price, change, open, date ; 'N/A' si absent).
+    """
+    provider = provider or YFinanceProvider()
+    concurrency = max(1, concurrency or DEFAULT_CONCURRENCY)
+    timeout = timeout or DEFAULT_TIMEOUT
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    client = client or ProviderClient()
+
+    names = [company.get("name") for company in companies]
+    symbols = {company.get("name"): ticker_symbol(company) for company in companies}
+
+    metrics = get_metrics()
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    # Le pool est borné : un appel qui dépasse son timeout n'est plus attendu,
+    # mais garde son thread jusqu'à ce que le fournisseur rende la main.
+    owned = executor is None
+    if owned:
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="quotes")
+
+    async def call(func, *args, label=None):
+        def attempt():
+            return asyncio.wait_for(loop.run_in_executor(executor, func, *args), timeout)
+        return await client.call(attempt, label, slots=semaphore)
+
+    async def fetch_one(name):
+        # Span par ticker : les tickers lents ou en échec ressortent dans les métriques
+        symbol = symbols[name]
+        with metrics.span("quote_fetch", symbol=symbol) as span:
+            try:
+                return name, await call(provider.fetch_quote, symbol, label=symbol)
+            except asyncio.TimeoutError:
+                span.fail("timeout")
+                logger.error(f"Timeout ({timeout}s) pour {name} ({symbol})")
+            except CircuitOpenError as e:
+                # Fournisseur en échec : pas d'appel voué à l'échec
+                span.fail("rejected")
+                logger.error(f"Cours de {name} non demandé : {e}")
+            except Exception as e:
+                # Si le ticker n'est pas trouvé, on log l'erreur mais on continue.
+                span.fail().set(error=f"{type(e).__name__}: {e}")
+                logger.error(f"Erreur pour {name}: {e}")
+        return name, None
+
+    async def fetch_group(group):
+        wanted = [symbols[name] for name in group]
+        try:
+            with metrics.span("quote_batch", size=len(group)) as span:
+                batch = await call(provider.fetch_batch, wanted, label=f"lot de {len(wanted)} symboles")
+                span.set(rows=len(batch))
+        except Exception as e:
+            # Le lot entier a échoué (timeout, erreur réseau...) : repli ticker par ticker
+            logger.warning(f"Échec du lot de {len(group)} symboles ({e!r}), repli individuel")
+            metrics.incr("quote_retries_total", len(group))
+            return await asyncio.gather(*(fetch_one(name) for name in group))
+        # Symboles absents d'un lot réussi (ex: données manquantes pour un seul ticker) :
+        # redemandés un par un, comme ceux d'un lot en échec
+        missing = [name for name in group if batch.get(symbols[name]) is None]
+        if missing:
+            logger.warning(f"{len(missing)} symboles absents du lot de {len(group)}, repli individuel")
+            metrics.incr("quote_retries_total", len(missing))
+        retried = dict(await asyncio.gather(*(fetch_one(name) for name in missing)))
+        return [(name, retried[name] if name in retried else batch[symbols[name]]) for name in group]
+
+    try:
+        unique_names = list(dict.fromkeys(names))
+        if provider.supports_batch and batch_size > 1:
+            groups = [unique_names[i:i + batch_size] for i in range(0, len(unique_names), batch_size)]
+            results = await asyncio.gather(*(fetch_group(group) for group in groups))
+            quotes = dict(pair for group in results for pair in group)
+        else:
+            quotes = dict(await asyncio.gather(*(fetch_one(name) for name in unique_names)))
+    finally:
+        if owned:
+            executor.shutdown(wait=False)
+
+    missing = sum(1 for name in unique_names if quotes.get(name) is None)
+    metrics.incr("quotes_total", len(unique_names))
+    if missing:
+        metrics.incr("quotes_missing_total", missing)
+        logger.warning(f"{missing}/{len(unique_names)} cours indisponibles")
+
+    return [build_record(name, quotes.get(name)) for name in names]
@@ -0,0 +1,139 @@
+# --- SCHÉMA DES JEUX DE DONNÉES ---
+# Un seul endroit déclare le type de chaque colonne : transform.py construit le
+# DataFrame typé directement à partir des enregistrements, et load.py le charge
+# sans le re-nettoyer (il ne convertit que les colonnes non conformes).
+#
+# Types : float64 pour les mesures (NaN = valeur manquante), comme la double précision
+# des colonnes en base : un cours de 170.53 est stocké tel quel, quelle que soit la
+# méthode d'écriture, et l'empreinte des lignes (upsert) porte sur la valeur exacte.
+# category pour les noms (répétés sur chaque ligne), Int64 nullable pour les entiers.
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.types import BigInteger, DateTime, Float, Text
+
+# Cours instantanés (une ligne par entreprise et par date de cotation)
+STOCK_PRICES_SCHEMA = {
+    "name": "category",
+    "price": "float64",
+    "change": "float64",
+    "open": "float64",
+    "date": "datetime64[ns]",
+}
+
+# Historique journalier OHLCV (une ligne par entreprise et par jour de cotation)
+STOCK_HISTORY_SCHEMA = {
+    "name": "category",
+    "date": "datetime64[ns]",
+    "open": "float64",
+    "high": "float64",
+    "low": "float64",
+    "close": "float64",
+    "adj_close": "float64",
+    "volume": "Int64",
+}
+
+
+def indicators_schema(ma_windows=(20, 50, 200), volatility_window=20):
+    """Indicateurs techniques (indicators.py), une ligne par entreprise et par jour de
+    cotation ; une colonne ma_<n> par moyenne mobile, volatility_<n> pour la volatilité."""
+    return {
+        "name": "category",
+        "date": "datetime64[ns]",
+        "close": "float64",
+        "return_1d": "float64",
+        **{f"ma_{window}": "float64" for window in ma_windows},
+        f"volatility_{volatility_window}": "float64",
+        "drawdown": "float64",
+    }
+
+
+# Type SQL de chaque type pandas du schéma
+SQL_TYPES = {
+    "category": Text(),
+    "float64": Float(precision=53),
+    "Int64": BigInteger(),
+    "datetime64[ns]": DateTime(),
+}
+
+
+def _object_array(values):
+    """Tableau numpy d'objets, sans l'inférence de numpy/pandas (très lente sur des Timestamps)."""
+    if isinstance(values, np.ndarray):
+        return values
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+def typed_column(values, dtype):
+    """Convertit une colonne (liste ou Series) vers le type déclaré, en une passe.
+
+    Les valeurs non convertibles ('N/A', None...) deviennent NaN / NaT / <NA>.
+    Les dates numériques sont des timestamps UNIX (secondes) ; les dates avec
+    fuseau horaire sont ramenées en UTC sans fuseau.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(_object_array(values), dtype=object, copy=False)
+
+    if dtype == "category":
+        return series.astype("category")
+    if dtype == "datetime64[ns]":
+        if pd.api.types.is_numeric_dtype(series) or (
+            series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) in ("integer", "floating")
+        ):
+            return pd.to_datetime(series, unit="s", errors="coerce")
+        return pd.to_datetime(series, errors="coerce", utc=True, format="ISO8601").dt.tz_localize(None)
+    numeric = pd.to_numeric(series, errors="coerce")
+    if dtype == "Int64" and pd.api.types.is_float_dtype(numeric):
+        # Les volumes arrivent souvent en float (NaN) : arrondis avant la conversion
+        numeric = numeric.round()
+    return numeric.astype(dtype)
+
+
+def build_frame(records, schema):
+    """Construit un DataFrame typé à partir d'enregistrements.
+
+    ``records`` est une liste de dictionnaires (sortie de l'extract), un
+    dictionnaire de colonnes ou un DataFrame (barres historiques). Les colonnes
+    du schéma sont typées directement ; les autres colonnes sont conservées
+    telles quelles, dans l'ordre d'origine.
+    """
+    if isinstance(records, pd.DataFrame):
+        return conform(records.reset_index(drop=True), schema)
+    if isinstance(records, dict):
+        columns = records
+    else:
+        # Colonnes dans l'ordre du premier enregistrement, puis celles qui n'apparaissent qu'ensuite
+        names = list(records[0]) if records else []
+        names += [key for key in set().union(*records) if key not in names]
+        columns = {
+            name: _object_array([record.get(name) for record in records])
+            for name in names
+        }
+
+    data = {}
+    for name, values in columns.items():
+        data[name] = typed_column(values, schema[name]) if name in schema else pd.Series(values)
+    return pd.DataFrame(data)
+
+
+def conforms(dataframe, schema):
+    """True si chaque colonne du schéma présente dans le DataFrame a déjà le bon type."""
+    return all(str(dataframe[c].dtype) == dtype for c, dtype in schema.items() if c in dataframe.columns)
+
+
+def conform(dataframe, schema):
+    """Renvoie le DataFrame avec les colonnes du schéma au bon type.
+
+    Un DataFrame déjà conforme (sortie de transform) est renvoyé tel quel, sans copie.
+    """
+    wrong = [c for c, dtype in schema.items() if c in dataframe.columns and str(dataframe[c].dtype) != dtype]
+    if not wrong:
+        return dataframe
+    dataframe = dataframe.copy()
+    for column in wrong:
+        dataframe[column] = typed_column(dataframe[column], schema[column])
+    return dataframe
+
+
+def sql_dtypes(dataframe, schema):
+    """Types SQLAlchemy à utiliser pour les colonnes du schéma (argument dtype de to_sql)."""
+    return {c: SQL_TYPES[dtype] for c, dtype in schema.items() if c in dataframe.columns and dtype in SQL_TYPES}
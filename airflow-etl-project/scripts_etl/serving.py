@@ -0,0 +1,128 @@
+# --- TABLES DE SERVICE DU DASHBOARD ---
+# Module partagé par l'ETL (load.py) et le dashboard (affichage/queries.py) : structures
+# précalculées à partir de la table brute des cours, pour que les lectures fréquentes
+# du dashboard soient des lectures d'index au lieu de parcours de la table brute :
+#   <table>_latest : dernier cours de chaque entreprise (index unique sur le nom)
+#   <table>_daily  : agrégats journaliers par entreprise (index unique sur nom + jour)
+#
+# PostgreSQL : vues matérialisées, rafraîchies avec REFRESH ... CONCURRENTLY (les
+# lecteurs continuent de lire l'ancienne version pendant le rafraîchissement).
+# Autres moteurs (SQLite) : tables reconstruites dans une transaction.
+
+import logging
+
+from sqlalchemy import inspect, text
+
+logger = logging.getLogger(__name__)
+
+
+# Tables brutes qui ont des tables de service (colonnes name, date, price, change, open)
+SERVED_TABLES = ("stock_prices",)
+LATEST_SUFFIX = "_latest"
+DAILY_SUFFIX = "_daily"
+
+
+def _quote(identifier):
+    """Entoure un identifiant SQL de guillemets (ex: 'date', 'open')."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def latest_name(table_name):
+    """Nom de la structure "dernier cours par entreprise" de ``table_name``."""
+    return f"{table_name}{LATEST_SUFFIX}"
+
+
+def daily_name(table_name):
+    """Nom de la structure "agrégats journaliers" de ``table_name``."""
+    return f"{table_name}{DAILY_SUFFIX}"
+
+
+def _is_postgresql(connection):
+    return connection.dialect.name == "postgresql"
+
+
+def _definitions(connection, table_name):
+    """[(nom, SELECT, colonnes de l'index unique, colonnes d'un index secondaire)].
+
+    La table brute n'a pas de clé en mode append (le même cours chargé deux fois) :
+    ROW_NUMBER() ne garde qu'une ligne par entreprise (et par jour), l'index unique
+    des structures de service tient toujours.
+    """
+    source, name, date = _quote(table_name), _quote("name"), _quote("date")
+    day = f"CAST({date} AS DATE)" if _is_postgresql(connection) else f"DATE({date})"
+    columns = ", ".join(_quote(column["name"]) for column in inspect(connection).get_columns(table_name))
+    latest = (
+        f"SELECT {columns} FROM (SELECT s.*, "
+        f"ROW_NUMBER() OVER (PARTITION BY {name} ORDER BY {date} DESC) AS rank_ "
+        f"FROM {source} s WHERE {date} IS NOT NULL) r WHERE rank_ = 1"
+    )
+    # Clôture du jour = dernier cours du jour ; plus bas, plus haut et moyenne des cours
+    per_day = f"PARTITION BY {name}, {day}"
+    daily = (
+        f"SELECT {name}, day, quotes, low, high, avg_price, close, change, last_at "
+        f"FROM (SELECT {name}, {day} AS day, COUNT(*) OVER ({per_day}) AS quotes, "
+        f"MIN({_quote('price')}) OVER ({per_day}) AS low, MAX({_quote('price')}) OVER ({per_day}) AS high, "
+        f"AVG({_quote('price')}) OVER ({per_day}) AS avg_price, {_quote('price')} AS close, "
+        f"{_quote('change')} AS change, {date} AS last_at, "
+        f"ROW_NUMBER() OVER ({per_day} ORDER BY {date} DESC) AS rank_ "
+        f"FROM {source} WHERE {date} IS NOT NULL) d WHERE rank_ = 1"
+    )
+    return [
+        (latest_name(table_name), latest, ("name",), ("date",)),
+        (daily_name(table_name), daily, ("name", "day"), ("day",)),
+    ]
+
+
+def serving_exists(connection, name):
+    """True si la structure de service ``name`` existe (vue matérialisée ou table)."""
+    inspector = inspect(connection)
+    if _is_postgresql(connection) and name in inspector.get_materialized_view_names():
+        return True
+    return inspector.has_table(name)
+
+
+def _create_indexes(connection, name, unique, other):
+    connection.execute(text(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote(f'ux_{name}')} "
+        f"ON {_quote(name)} ({', '.join(_quote(c) for c in unique)})"
+    ))
+    connection.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {_quote(f'ix_{name}')} "
+        f"ON {_quote(name)} ({', '.join(_quote(c) for c in other)})"
+    ))
+
+
+def drop_serving(connection, table_name):
+    """Supprime les structures de service (avant de supprimer ou recréer la table brute)."""
+    kind = "MATERIALIZED VIEW" if _is_postgresql(connection) else "TABLE"
+    for name in (latest_name(table_name), daily_name(table_name)):
+        connection.execute(text(f"DROP {kind} IF EXISTS {_quote(name)}"))
+
+
+def refresh_serving(connection, table_name):
+    """
+    Crée ou rafraîchit les structures de service de ``table_name``.
+
+    À appeler dans la transaction du chargement, avant le filigrane : le dashboard
+    ne voit jamais un nouveau filigrane avec des structures de service périmées.
+
+    Returns:
+        list: noms des structures rafraîchies (vide si la table n'est pas servie)
+    """
+    if table_name not in SERVED_TABLES:
+        return []
+    refreshed = []
+    for name, select, unique, other in _definitions(connection, table_name):
+        if _is_postgresql(connection):
+            if serving_exists(connection, name):
+                # L'index unique permet CONCURRENTLY : les lecteurs ne sont pas bloqués
+                connection.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {_quote(name)}"))
+            else:
+                connection.execute(text(f"CREATE MATERIALIZED VIEW {_quote(name)} AS {select}"))
+        else:
+            connection.execute(text(f"DROP TABLE IF EXISTS {_quote(name)}"))
+            connection.execute(text(f"CREATE TABLE {_quote(name)} AS {select}"))
+        _create_indexes(connection, name, unique, other)
+        refreshed.append(name)
+    logger.info(f"Tables de service rafraîchies : {refreshed}")
+    return refreshed
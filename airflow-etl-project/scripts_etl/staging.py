@@ -0,0 +1,195 @@
+# --- ZONE DE STAGING ENTRE LES ÉTAPES DU PIPELINE ---
+# Chaque tâche Airflow tourne dans son propre conteneur : les étapes (scrape, fetch
+# par shard, transform, load, backfill) se passent leurs résultats par des fichiers,
+# sur un volume partagé.
+#
+# - Métadonnées (plan du run, entreprises d'un shard) : petits fichiers JSON.
+# - Données : Parquet partitionné "à la Hive" (day=2024-01-02/, name=AI.PA/year=2024/...),
+#   lu via Arrow avec projection de colonnes et filtres poussés jusqu'aux fichiers :
+#   les partitions hors filtre ne sont pas ouvertes, les row groups hors bornes pas lus.
+#   Les fichiers sont lus par mmap, et ``iter_batches`` borne la mémoire des gros volumes.
+#
+# Les JSON sont écrits de façon atomique (fichier temporaire puis os.replace) ; les
+# fichiers Parquet d'un même producteur (un shard, un morceau) sont remplacés ensemble.
+
+import glob
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from datetime import date, datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION (variables d'environnement) ---
+STAGING_DIR = os.getenv("ETL_STAGING_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "staging"))
+# Historique brut du backfill, conservé d'un run à l'autre (rechargeable sans re-télécharger)
+HISTORY_STAGING_DIR = os.getenv("ETL_HISTORY_STAGING_DIR", os.path.join(STAGING_DIR, "history"))
+# Durée de conservation des dossiers de run (secondes)
+STAGING_RETENTION = float(os.getenv("ETL_STAGING_RETENTION", str(3 * 24 * 3600)))
+
+# Clés de partition : "day" et "year" sont dérivées de la colonne "date"
+PARTITION_TYPES = {
+    "day": pa.date32(),
+    "year": pa.int16(),
+    "name": pa.string(),
+}
+DERIVED_KEYS = ("day", "year")
+
+
+def run_dir(run_id, root=None):
+    """Dossier du run (l'identifiant Airflow contient ':' et '+', remplacés pour le système de fichiers)."""
+    return os.path.join(root or STAGING_DIR, "runs", re.sub(r"[^A-Za-z0-9._-]", "_", run_id))
+
+
+def _json_default(value):
+    """Sérialise les dates (Timestamp, datetime) au format ISO."""
+    if isinstance(value, (datetime, date, pd.Timestamp)):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable : {type(value).__name__}")
+
+
+def _replace_atomically(path, write):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_json(path, data):
+    """Écrit ``data`` en JSON (dates au format ISO), de façon atomique."""
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=_json_default)
+    _replace_atomically(path, write)
+
+
+def read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# --- PARQUET PARTITIONNÉ ---
+
+def _partition_column(dataframe, key):
+    if key == "day":
+        return dataframe["date"].to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+    if key == "year":
+        return dataframe["date"].dt.year.astype("Int16")
+    return dataframe[key]
+
+
+def remove_files(path, basename):
+    """Supprime les fichiers Parquet d'un producteur (``basename``) dans toutes les partitions."""
+    for file_path in glob.glob(os.path.join(path, "**", f"{basename}-*.parquet"), recursive=True):
+        os.remove(file_path)
+
+
+def write_dataset(path, dataframe, partition_by=("day",), basename="part"):
+    """
+    Écrit le DataFrame en Parquet partitionné sous ``path`` (types du schéma conservés).
+
+    Les fichiers sont nommés ``{basename}-N.parquet`` : une nouvelle écriture du même
+    producteur (shard relancé, morceau retéléchargé) remplace ses fichiers précédents,
+    sans toucher à ceux des autres producteurs.
+    """
+    data = dataframe.assign(**{
+        key: _partition_column(dataframe, key) for key in partition_by if key in DERIVED_KEYS
+    })
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    for key in partition_by:
+        table = table.set_column(
+            table.schema.get_field_index(key), key, table.column(key).cast(PARTITION_TYPES[key])
+        )
+
+    remove_files(path, basename)
+    ds.write_dataset(
+        table,
+        path,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([(k, PARTITION_TYPES[k]) for k in partition_by]), flavor="hive"),
+        basename_template=f"{basename}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+
+def _partition_keys(path):
+    """Clés de partition d'un dataset, lues dans le premier chemin de fichier (day=.../name=...)."""
+    keys, current = [], path
+    while True:
+        subdirs = sorted(entry.name for entry in os.scandir(current) if entry.is_dir() and "=" in entry.name)
+        if not subdirs:
+            return keys
+        keys.append(subdirs[0].split("=", 1)[0])
+        current = os.path.join(current, subdirs[0])
+
+
+def open_dataset(path):
+    """Dataset Arrow (Parquet, fichiers lus par mmap) ; "name" est relu en category."""
+    partition_schema = pa.schema([
+        (key, pa.dictionary(pa.int32(), pa.string()) if key == "name" else PARTITION_TYPES[key])
+        for key in _partition_keys(path)
+    ])
+    return ds.dataset(
+        path,
+        format="parquet",
+        partitioning=ds.HivePartitioning.discover(schema=partition_schema),
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def _scan_options(dataset, columns, filters):
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name not in DERIVED_KEYS]
+    if isinstance(filters, list):
+        filters = pq.filters_to_expression(filters) if filters else None
+    return {"columns": list(columns), "filter": filters}
+
+
+def read_dataset(path, columns=None, filters=None):
+    """
+    Lit un dataset Parquet en DataFrame.
+
+    Args:
+        columns (list): Colonnes à lire (projection) ; par défaut toutes sauf "day"/"year".
+        filters: Liste de conditions [("name", "in", [...]), ("date", ">=", Timestamp)]
+            (toutes vérifiées) ou expression pyarrow.dataset. Les filtres sur les clés
+            de partition évitent d'ouvrir les fichiers hors filtre.
+    """
+    dataset = open_dataset(path)
+    table = dataset.to_table(**_scan_options(dataset, columns, filters))
+    return table.to_pandas(split_blocks=True)
+
+
+def iter_batches(path, columns=None, filters=None, batch_rows=100_000):
+    """Comme ``read_dataset``, mais par morceaux d'au plus ``batch_rows`` lignes (mémoire bornée)."""
+    dataset = open_dataset(path)
+    for batch in dataset.to_batches(batch_size=batch_rows, **_scan_options(dataset, columns, filters)):
+        if batch.num_rows:
+            yield batch.to_pandas(split_blocks=True)
+
+
+def purge_runs(root=None, max_age=None, now=None):
+    """Supprime les dossiers de run plus vieux que ``max_age`` secondes. Renvoie leur nombre."""
+    root = os.path.join(root or STAGING_DIR, "runs")
+    max_age = STAGING_RETENTION if max_age is None else max_age
+    now = now or time.time()
+    if not os.path.isdir(root):
+        return 0
+    removed = 0
+    for entry in os.scandir(root):
+        if entry.is_dir() and now - entry.stat().st_mtime > max_age:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    if removed:
+        logger.info(f"{removed} anciens dossiers de staging supprimés")
+    return removed
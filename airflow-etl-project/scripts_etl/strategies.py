@@ -0,0 +1,164 @@
+# --- EXÉCUTION DES STRATÉGIES DE SCRAPING ---
+# Lance les stratégies de scraping (requests, httpx, Playwright...) selon un mode :
+# - "sequential" : l'une après l'autre, dans l'ordre donné (les moins chères d'abord),
+# - "hedged"     : la suivante démarre si la précédente n'a pas abouti après un délai,
+# - "race"       : toutes en même temps.
+# Le premier résultat valide l'emporte et les stratégies encore en cours sont annulées.
+#
+# Les stratégies disponibles sont inscrites dans un registre (nom -> méthode du
+# scraper, délai maximal) ; SCRAPE_STRATEGIES choisit lesquelles lancer et dans quel
+# ordre. Chaque méthode importe sa bibliothèque (requests, httpx, Playwright) à son
+# premier appel : une stratégie non sélectionnée ne coûte rien au démarrage.
+
+import asyncio
+import inspect
+import logging
+import os
+import time
+
+from cache import MIN_COMPANIES
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION (variables d'environnement) ---
+SCRAPE_MODE = os.getenv("SCRAPE_MODE", "hedged")
+SCRAPE_MODES = ("sequential", "hedged", "race")
+SCRAPE_HEDGE_DELAY = float(os.getenv("SCRAPE_HEDGE_DELAY", "2"))
+SCRAPE_STRATEGIES = os.getenv("SCRAPE_STRATEGIES", "requests,httpx,playwright")
+
+
+class Strategy:
+    """Une stratégie de scraping : un nom, une fonction (sync ou async) et un délai maximal."""
+
+    def __init__(self, name, func, deadline=None):
+        self.name = name
+        self.func = func
+        self.deadline = deadline
+
+    async def __call__(self):
+        if inspect.iscoroutinefunction(self.func):
+            coroutine = self.func()
+        else:
+            # Les stratégies synchrones (requests) tournent dans un thread
+            coroutine = asyncio.to_thread(self.func)
+        return await asyncio.wait_for(coroutine, self.deadline)
+
+
+# Registre des stratégies : nom -> (méthode du scraper, délai maximal en secondes)
+STRATEGY_REGISTRY = {}
+
+
+def register_strategy(name, method, deadline=None):
+    """Inscrit une stratégie : ``method`` est le nom de la méthode du scraper à appeler."""
+    STRATEGY_REGISTRY[name] = (method, deadline)
+
+
+register_strategy("requests", "scrape_requests", deadline=15)
+register_strategy("httpx", "scrape_httpx", deadline=15)
+register_strategy("playwright", "scrape_playwright", deadline=60)
+
+
+def build_strategies(scraper, names=None):
+    """
+    Stratégies sélectionnées, dans l'ordre, liées à ``scraper``.
+
+    Args:
+        names (list | str): Noms du registre (liste ou chaîne "a,b"), SCRAPE_STRATEGIES par défaut.
+
+    Raises:
+        ValueError: si un nom n'est pas inscrit au registre.
+    """
+    names = SCRAPE_STRATEGIES if names is None else names
+    if isinstance(names, str):
+        names = [name.strip() for name in names.split(",") if name.strip()]
+    unknown = [name for name in names if name not in STRATEGY_REGISTRY]
+    if unknown:
+        raise ValueError(f"Stratégies de scraping inconnues : {unknown} (attendu : {tuple(STRATEGY_REGISTRY)})")
+    strategies = []
+    for name in names:
+        method, deadline = STRATEGY_REGISTRY[name]
+        strategies.append(Strategy(name, getattr(scraper, method), deadline=deadline))
+    return strategies
+
+
+class StrategyRunner:
+    """
+    Exécute une liste de stratégies et renvoie le premier résultat valide.
+
+    Un résultat est valide s'il contient au moins ``min_rows`` lignes.
+    Les durées et l'issue de chaque stratégie sont conservées dans ``timings``
+    et résumées dans les logs pour pouvoir ajuster l'ordre et les délais.
+    """
+
+    def __init__(self, strategies, mode=None, min_rows=None, hedge_delay=None):
+        self.strategies = list(strategies)
+        self.mode = mode or SCRAPE_MODE
+        if self.mode not in SCRAPE_MODES:
+            raise ValueError(f"Mode de scraping inconnu : {self.mode!r} (attendu : {SCRAPE_MODES})")
+        self.min_rows = MIN_COMPANIES if min_rows is None else min_rows
+        self.hedge_delay = SCRAPE_HEDGE_DELAY if hedge_delay is None else hedge_delay
+        self.timings = []
+        self.winner = None
+
+    async def _attempt(self, strategy):
+        """Exécute une stratégie et enregistre sa durée et son issue (span "scrape_strategy")."""
+        start = time.perf_counter()
+        companies, status = [], "ok"
+        with get_metrics().span("scrape_strategy", strategy=strategy.name, mode=self.mode) as span:
+            try:
+                companies = await strategy() or []
+                if len(companies) < self.min_rows:
+                    status = f"rejetée ({len(companies)} < {self.min_rows} lignes)"
+                    span.fail("rejected")
+            except asyncio.CancelledError:
+                status = "annulée"
+                raise
+            except asyncio.TimeoutError:
+                status = f"délai dépassé ({strategy.deadline}s)"
+                span.fail("timeout")
+            except Exception as e:
+                status = f"échec ({type(e).__name__}: {e})"
+                span.fail().set(error=f"{type(e).__name__}: {e}")
+            finally:
+                elapsed = time.perf_counter() - start
+                self.timings.append((strategy.name, elapsed, status))
+                span.set(rows=len(companies))
+                logger.info(f"Stratégie {strategy.name}: {len(companies)} lignes en {elapsed:.2f}s [{status}]")
+        return strategy.name, companies if status == "ok" else []
+
+    def _next_delay(self, remaining):
+        """Temps d'attente d'un résultat avant de lancer la stratégie suivante (None = jusqu'au résultat)."""
+        if not remaining or self.mode == "sequential":
+            return None
+        return 0 if self.mode == "race" else self.hedge_delay
+
+    async def run(self):
+        """Renvoie la liste d'entreprises de la première stratégie valide ([] si aucune)."""
+        self.timings, self.winner = [], None
+        remaining = list(self.strategies)
+        pending = set()
+        try:
+            while remaining or pending:
+                if remaining:
+                    pending.add(asyncio.create_task(self._attempt(remaining.pop(0))))
+                delay = self._next_delay(remaining)
+                if delay == 0:
+                    continue
+                done, pending = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name, companies = task.result()
+                    if companies:
+                        self.winner = name
+                        get_metrics().incr("scrape_winner_total", strategy=name)
+                        logger.info(f"Stratégie retenue : {name} ({self.mode})")
+                        return companies
+            return []
+        finally:
+            # Annule les stratégies encore en cours (ex: Playwright quand requests a gagné)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            summary = ", ".join(f"{name}={elapsed:.2f}s {status}" for name, elapsed, status in self.timings)
+            logger.info(f"Durées des stratégies de scraping : {summary}")
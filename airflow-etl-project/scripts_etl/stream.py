@@ -0,0 +1,204 @@
+# --- MODE CONTINU (SÉANCE EN COURS) ---
+# Pendant la séance, interroge le fournisseur toutes les STREAM_INTERVAL secondes et
+# charge chaque relevé comme un micro-lot :
+# - upsert sur (name, date) : seules les lignes nouvelles ou modifiées sont écrites ;
+#   un relevé sans changement n'écrit rien et ne notifie personne,
+# - chaque micro-lot qui écrit incrémente le filigrane et envoie un NOTIFY au COMMIT
+#   (db.write_watermark) : le dashboard ne se relance qu'à l'arrivée de nouvelles données,
+# - les tables de service du dashboard (serving.py), recalculées en entier, ne le sont
+#   qu'au plus toutes les STREAM_SERVING_INTERVAL secondes (dans la transaction du
+#   micro-lot) et en fin de séance,
+# - mémoire stable sur toute la séance : client fournisseur, pool de threads et engine
+#   sont créés une seule fois, rien n'est conservé d'un micro-lot à l'autre,
+# - cadence sans dérive : les relevés sont calés sur une grille fixe ; un relevé en
+#   retard fait sauter les créneaux dépassés au lieu de les rattraper en rafale.
+#
+# Usage : python stream.py [--interval 60] [--until 17:35]
+
+import argparse
+import asyncio
+import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from extract import get_companies
+from load import load_to_postgresql, refresh_serving_tables
+from metrics import configure_metrics, get_metrics, memory_mb
+from provider_client import ProviderClient
+from quotes import DEFAULT_CONCURRENCY, YFinanceProvider, fetch_quotes
+from transform import transform
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION (surchargeable par variables d'environnement) ---
+# Intervalle entre deux relevés (secondes)
+STREAM_INTERVAL = float(os.getenv("STREAM_INTERVAL", "60"))
+# Heure de fin de séance (heure locale de la place de cotation)
+STREAM_UNTIL = os.getenv("STREAM_UNTIL", "17:35")
+STREAM_TIMEZONE = os.getenv("STREAM_TIMEZONE", "Europe/Paris")
+# Un relevé de la mémoire du processus tous les N micro-lots
+STREAM_REPORT_EVERY = int(os.getenv("STREAM_REPORT_EVERY", "30"))
+# Délai minimal entre deux rafraîchissements des tables de service (secondes)
+STREAM_SERVING_INTERVAL = float(os.getenv("STREAM_SERVING_INTERVAL", "300"))
+
+
+def session_end(until=None, tz=None, now=None):
+    """Fin de séance du jour (datetime avec fuseau), ex: "17:35" à Paris."""
+    zone = ZoneInfo(tz or STREAM_TIMEZONE)
+    now = now or datetime.now(zone)
+    hour, minute = (int(part) for part in (until or STREAM_UNTIL).split(":"))
+    return now.astimezone(zone).replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+
+def next_slot(origin, interval, now):
+    """Numéro du prochain créneau de la grille ``origin + k * interval`` après ``now``."""
+    return math.floor((now - origin) / interval) + 1
+
+
+def _refresh_serving(table_name):
+    """Rafraîchit les tables de service ; un échec est journalisé, la séance continue."""
+    try:
+        return refresh_serving_tables(table_name)
+    except Exception as e:
+        logger.error(f"Rafraîchissement des tables de service reporté : {e}")
+        return False
+
+
+def _written(metrics, table_name):
+    return metrics.total("load_inserted_total", table=table_name) + metrics.total(
+        "load_updated_total", table=table_name
+    )
+
+
+async def stream(
+    companies,
+    provider=None,
+    interval=None,
+    until=None,
+    max_batches=None,
+    table_name="stock_prices",
+    client=None,
+    serving_interval=None,
+    clock=time.monotonic,
+    sleep=asyncio.sleep,
+):
+    """
+    Relève et charge les cours des entreprises à intervalle fixe jusqu'à ``until``.
+
+    Un micro-lot en échec (base indisponible...) est journalisé puis abandonné : le
+    relevé suivant reprend normalement, la séance n'est pas interrompue.
+
+    Args:
+        companies (list): Entreprises (clés "name" et "symbol"), résolues une fois.
+        provider (QuoteProvider): Fournisseur de cours (yfinance par défaut).
+        interval (float): Secondes entre deux relevés (``STREAM_INTERVAL`` par défaut).
+        until (datetime): Fin de séance (avec fuseau) ; None = pas de fin (cf. max_batches).
+        max_batches (int): Nombre maximal de micro-lots (tests, benchmarks).
+        client (ProviderClient): Limiteur, relances et disjoncteur partagés par toute la séance.
+        serving_interval (float): Secondes au moins entre deux rafraîchissements des tables
+            de service (``STREAM_SERVING_INTERVAL`` par défaut).
+
+    Returns:
+        dict: {"batches", "rows" (relevées), "written" (insérées ou modifiées),
+        "failed" (micro-lots en échec), "skipped" (créneaux sautés), "peak_mb"}
+    """
+    provider = provider or YFinanceProvider()
+    interval = interval or STREAM_INTERVAL
+    serving_interval = STREAM_SERVING_INTERVAL if serving_interval is None else serving_interval
+    client = client or ProviderClient()
+    metrics = get_metrics()
+    # Un seul pool pour toute la séance (au lieu d'un pool par relevé)
+    executor = ThreadPoolExecutor(max_workers=max(1, DEFAULT_CONCURRENCY), thread_name_prefix="stream")
+    summary = {"batches": 0, "rows": 0, "written": 0, "failed": 0, "skipped": 0, "peak_mb": 0.0}
+
+    def session_over():
+        return until is not None and datetime.now(until.tzinfo) >= until
+
+    origin, slot = clock(), 0
+    # Premier micro-lot rafraîchi ; ensuite au plus toutes les ``serving_interval`` secondes
+    refreshed_at = None
+    try:
+        while not session_over():
+            with metrics.span("stream_batch", table=table_name) as span:
+                before = _written(metrics, table_name)
+                # Heure du créneau (sans relire l'horloge)
+                started = origin + slot * interval
+                refresh = refreshed_at is None or started - refreshed_at >= serving_interval
+                try:
+                    records = await fetch_quotes(companies, provider=provider, client=client, executor=executor)
+                    frame = transform(records)
+                    # Filigrane et NOTIFY à chaque micro-lot qui écrit ; tables de service
+                    # rafraîchies dans la même transaction seulement quand le délai est écoulé
+                    await asyncio.to_thread(load_to_postgresql, frame, table_name, "upsert", refresh=refresh)
+                    written = _written(metrics, table_name) - before
+                    if refresh and written:
+                        refreshed_at = started
+                    span.set(rows=len(frame), written=written)
+                    summary["rows"] += len(frame)
+                    summary["written"] += written
+                except Exception as e:
+                    span.fail()
+                    summary["failed"] += 1
+                    logger.error(f"Micro-lot {summary['batches'] + 1} abandonné : {e}")
+                # Rien n'est gardé d'un relevé à l'autre
+                records = frame = None
+            summary["batches"] += 1
+
+            if summary["batches"] % STREAM_REPORT_EVERY == 0:
+                current, peak = memory_mb()
+                logger.info(f"Micro-lot {summary['batches']} : mémoire {current:.0f} Mo (pic {peak:.0f} Mo)")
+            if max_batches is not None and summary["batches"] >= max_batches:
+                break
+
+            now = clock()
+            following = next_slot(origin, interval, now)
+            if following > slot + 1:
+                summary["skipped"] += following - slot - 1
+                logger.warning(f"Relevé en retard : {following - slot - 1} créneau(x) sauté(s)")
+            slot = following
+            await sleep(max(0.0, origin + slot * interval - clock()))
+    finally:
+        executor.shutdown(wait=False)
+        # Lignes écrites depuis le dernier rafraîchissement
+        await asyncio.to_thread(_refresh_serving, table_name)
+
+    summary["peak_mb"] = memory_mb()[1]
+    logger.info(
+        f"Séance terminée : {summary['batches']} micro-lots, {summary['written']} lignes écrites, "
+        f"{summary['failed']} en échec, pic mémoire {summary['peak_mb']:.0f} Mo"
+    )
+    return summary
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relève et charge les cours en continu pendant la séance.")
+    parser.add_argument("--interval", type=float, default=STREAM_INTERVAL, help="Secondes entre deux relevés")
+    parser.add_argument("--until", default=STREAM_UNTIL, help=f"Fin de séance HH:MM ({STREAM_TIMEZONE})")
+    parser.add_argument("--table", default="stock_prices", help="Table de destination")
+    args = parser.parse_args(argv)
+
+    end = session_end(args.until)
+    if datetime.now(end.tzinfo) >= end:
+        logger.info(f"Séance déjà terminée ({end:%H:%M}), rien à relever.")
+        return
+
+    # Entreprises et tickers résolus une fois pour toute la séance
+    companies = await get_companies()
+    if not companies:
+        logger.error("Aucune entreprise à suivre. Arrêt du programme.")
+        raise SystemExit(1)
+    await stream(companies, interval=args.interval, until=end, table_name=args.table)
+
+
+if __name__ == "__main__":
+    metrics = configure_metrics(job="stream")
+    try:
+        asyncio.run(main())
+    finally:
+        metrics.flush()
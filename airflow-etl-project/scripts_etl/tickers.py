@@ -0,0 +1,206 @@
+# --- INDEX DE RÉSOLUTION NOM -> TICKER ---
+# Le nom affiché sur Wikipedia ("Air Liquide") n'est pas un symbole Yahoo Finance
+# ("AI.PA") : construire f"{name}.PA" produit surtout des symboles inexistants.
+# L'index associe chaque entreprise (par ISIN ou par nom normalisé) à un symbole vérifié.
+# Il est chargé une fois par run (dictionnaires, recherche en O(1)), accepte des
+# corrections manuelles (ticker_overrides.json) et ne re-résout que les entrées inconnues.
+
+import json
+import logging
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION (variables d'environnement) ---
+TICKER_INDEX_PATH = os.getenv("TICKER_INDEX_PATH", os.path.join(CACHE_DIR, "tickers.json"))
+TICKER_OVERRIDES_PATH = os.getenv(
+    "TICKER_OVERRIDES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "ticker_overrides.json"),
+)
+# Délai avant de retenter la résolution d'une entreprise restée sans symbole
+TICKER_RETRY_AFTER = float(os.getenv("TICKER_RETRY_AFTER", str(7 * 24 * 3600)))
+
+# Place de cotation recherchée (Euronext Paris)
+EXCHANGE_SUFFIX = ".PA"
+EXCHANGE_CODE = "PAR"
+
+ISIN_PATTERN = re.compile(r"^[A-Z]{2}[A-Z0-9]{9}[0-9]$")
+
+# Résultat d'une recherche en erreur (réseau, quota...), distinct de None (aucun symbole trouvé)
+_LOOKUP_FAILED = object()
+
+
+def normalize_name(name):
+    """Clé de recherche d'un nom : sans accents, ponctuation ni casse ("L'Oréal" -> "l oreal")."""
+    text = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def is_isin(value):
+    """True si la chaîne a la forme d'un code ISIN (ex: FR0000120073)."""
+    return bool(ISIN_PATTERN.match(value or ""))
+
+
+def yahoo_search_resolver(company):
+    """Résout un symbole via la recherche Yahoo Finance (ISIN puis nom), sur la place de
+    l'entreprise ("exchange" et "suffix" de son indice, Euronext Paris par défaut).
+    Pour un indice multi-places (suffix et exchange à None), la première action trouvée."""
+    import yfinance as yf
+
+    exchange = company.get("exchange", EXCHANGE_CODE)
+    suffix = company.get("suffix", EXCHANGE_SUFFIX)
+    queries = [q for q in (company.get("isin"), company.get("name")) if q]
+    for query in queries:
+        for quote in yf.Search(query, max_results=10, news_count=0).quotes:
+            symbol = quote.get("symbol", "")
+            if quote.get("quoteType") == "EQUITY" and (
+                (exchange is None and suffix is None)
+                or quote.get("exchange") == exchange
+                or (suffix and symbol.endswith(suffix))
+            ):
+                return symbol
+    return None
+
+
+class TickerIndex:
+    """
+    Index persistant {entreprise -> symbole}.
+
+    Les entrées sont indexées par ISIN et par nom normalisé. Une entrée sans symbole
+    (résolution échouée) est conservée avec sa date de vérification, pour ne pas
+    refaire d'appels inutiles avant ``retry_after`` secondes.
+    """
+
+    def __init__(self, path=None, overrides_path=None, resolver=None, retry_after=None):
+        self.path = path or TICKER_INDEX_PATH
+        self.overrides_path = overrides_path or TICKER_OVERRIDES_PATH
+        self.resolver = resolver or yahoo_search_resolver
+        self.retry_after = TICKER_RETRY_AFTER if retry_after is None else retry_after
+        self.overrides = {}
+        self.entries = {}
+        self._by_isin = {}
+
+    @classmethod
+    def load(cls, **kwargs):
+        """Charge l'index et les corrections manuelles depuis le disque."""
+        index = cls(**kwargs)
+        # Une correction peut viser un ISIN ou un nom d'entreprise
+        index.overrides = {
+            key if is_isin(key) else normalize_name(key): symbol
+            for key, symbol in index._read(index.overrides_path).items()
+        }
+        for entry in index._read(index.path).get("entries", []):
+            index._add(entry)
+        logger.info(f"Index des tickers : {len(index.entries)} entrées, {len(index.overrides)} corrections manuelles")
+        return index
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Fichier d'index illisible ({path}) : {e}")
+            return {}
+
+    def _add(self, entry):
+        self.entries[normalize_name(entry["name"])] = entry
+        if entry.get("isin"):
+            self._by_isin[entry["isin"]] = entry
+
+    def _entry(self, company):
+        isin = company.get("isin")
+        if isin and isin in self._by_isin:
+            return self._by_isin[isin]
+        return self.entries.get(normalize_name(company.get("name")))
+
+    def lookup(self, company):
+        """Renvoie le symbole de l'entreprise (correction manuelle en priorité), ou None."""
+        key = normalize_name(company.get("name"))
+        if key in self.overrides:
+            return self.overrides[key]
+        if company.get("isin") in self.overrides:
+            return self.overrides[company["isin"]]
+        entry = self._entry(company)
+        return entry.get("symbol") if entry else None
+
+    def needs_resolution(self, company, now=None):
+        """True si l'entreprise est inconnue, ou sans symbole depuis plus de ``retry_after``
+        (une entreprise dont la page affiche le symbole n'est pas recherchée)."""
+        if self.lookup(company) or company.get("symbol"):
+            return False
+        entry = self._entry(company)
+        if entry is None:
+            return True
+        return (now or time.time()) - entry.get("checked_at", 0) >= self.retry_after
+
+    def refresh(self, companies, max_workers=8):
+        """Résout uniquement les entreprises inconnues (ou à revérifier) puis sauvegarde l'index.
+
+        Seul un résultat effectif est enregistré : une recherche en erreur n'écrit pas
+        d'entrée, l'entreprise sera recherchée de nouveau au prochain run (et non
+        écartée pendant ``retry_after`` comme une entreprise réellement introuvable)."""
+        todo = [c for c in companies if self.needs_resolution(c)]
+        if not todo:
+            return 0
+
+        def resolve(company):
+            try:
+                return self.resolver(company)
+            except Exception as e:
+                logger.warning(f"Résolution impossible pour {company.get('name')}: {e}")
+                return _LOOKUP_FAILED
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            symbols = list(executor.map(resolve, todo))
+
+        now = time.time()
+        for company, symbol in zip(todo, symbols):
+            if symbol is _LOOKUP_FAILED:
+                continue
+            self._add({
+                "name": company.get("name"),
+                "isin": company.get("isin"),
+                "symbol": symbol,
+                "checked_at": now,
+            })
+        failed = sum(1 for s in symbols if s is _LOOKUP_FAILED)
+        if failed < len(todo):
+            self.save()
+        resolved = sum(1 for s in symbols if s and s is not _LOOKUP_FAILED)
+        logger.info(
+            f"Index des tickers : {resolved}/{len(todo)} nouvelles entreprises résolues"
+            + (f", {failed} en erreur (à retenter)" if failed else "")
+        )
+        return resolved
+
+    def resolve(self, companies):
+        """Ajoute la clé "symbol" aux entreprises résolues et écarte les autres (loggées).
+        L'index (et ses corrections manuelles) l'emporte sur le symbole lu sur la page."""
+        resolved, unresolved = [], []
+        for company in companies:
+            symbol = self.lookup(company) or company.get("symbol")
+            if symbol:
+                resolved.append({**company, "symbol": symbol})
+            else:
+                unresolved.append(company.get("name"))
+        if unresolved:
+            logger.warning(f"{len(unresolved)} entreprises sans ticker ignorées : {', '.join(unresolved)}")
+        return resolved
+
+    def save(self):
+        """Écrit l'index sur disque (écriture atomique)."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": list(self.entries.values())}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
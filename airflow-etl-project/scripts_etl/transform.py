@@ -1,32 +1,25 @@
 import pandas as pd
-import numpy as np
 
+from metrics import get_metrics
+from schema import STOCK_PRICES_SCHEMA, build_frame
 
-def transform(dict_bourse: dict) -> pd.DataFrame:
+
+def transform(dict_bourse: dict, schema: dict = None) -> pd.DataFrame:
     """
-    Transforme un dictionnaire en DataFrame Pandas.
+    Transforme les enregistrements de l'extract en DataFrame Pandas typé.
+
+    Le DataFrame est construit en une passe à partir du schéma déclaré
+    (schema.py) : chaque colonne est directement convertie vers son type
+    ('N/A' -> NaN/NaT, float64 pour les mesures, category pour les noms).
 
     Args:
-        dict (dict): Dictionnaire à transformer.
+        dict_bourse (dict | list): Dictionnaire de colonnes ou liste de dictionnaires à transformer.
+        schema (dict): Schéma {colonne: type} (cours instantanés par défaut).
 
     Returns:
-        pd.DataFrame: DataFrame contenant les données du dictionnaire.
+        pd.DataFrame: DataFrame typé contenant les données.
     """
-    # Créer un DataFrame à partir du dictionnaire
-    df = pd.DataFrame(dict_bourse)
-    df["date"] = pd.to_datetime(df["date"], unit="s")
-
-    # Remplace "N/A" par NaN dans tout le DataFrame
-    df = df.replace("N/A", np.nan)
-
-    # Convertit les colonnes numériques au bon type (float)
-    for col in ["price", "change", "open"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-    # Ajoute une colonne pour le prix d'ouverture
-    df
-
-    # Réinitialiser l'index
-    df.reset_index(drop=True, inplace=True)
-
-    return df
+    with get_metrics().span("transform") as span:
+        dataframe = build_frame(dict_bourse, schema or STOCK_PRICES_SCHEMA)
+        span.set(rows=len(dataframe))
+    return dataframe
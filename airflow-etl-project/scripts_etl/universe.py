@@ -0,0 +1,205 @@
+# --- UNIVERS D'INDICES ---
+# La liste des entreprises suivies peut couvrir plusieurs indices (ETL_UNIVERSE,
+# ex: "CAC40,SBF120,DAX,EUROSTOXX50"). Chaque indice est inscrit au registre avec sa
+# page, le repérage de son tableau (en-têtes attendus), la colonne de ses tickers et
+# le suffixe Yahoo Finance de sa place de cotation.
+#
+# Les pages sont téléchargées en même temps sur un seul client httpx (connexions
+# keep-alive mises en commun), analysées dans des threads, puis fusionnées en un
+# ensemble d'entreprises sans doublon (par ISIN, à défaut par nom normalisé) : passer
+# de 40 à plusieurs centaines d'entreprises ne multiplie pas la durée du scraping.
+# Chaque indice a son propre cache disque (même TTL que la liste du CAC 40).
+
+import asyncio
+import logging
+import os
+from collections import namedtuple
+
+from cache import CACHE_DIR, ConstituentCache
+from html_tables import CONSTITUENT_HEADERS
+from metrics import get_metrics
+from tickers import normalize_name
+
+logger = logging.getLogger(__name__)
+
+
+# --- CONFIGURATION (variables d'environnement) ---
+UNIVERSE = os.getenv("ETL_UNIVERSE", "CAC40")
+UNIVERSE_TIMEOUT = float(os.getenv("UNIVERSE_TIMEOUT", "30"))
+# Connexions simultanées du client partagé
+UNIVERSE_MAX_CONNECTIONS = int(os.getenv("UNIVERSE_MAX_CONNECTIONS", "10"))
+
+# Page d'un indice : où la trouver, comment y repérer le tableau et les symboles
+IndexPage = namedtuple("IndexPage", ["name", "url", "required", "symbol_headers", "suffix", "exchange"])
+
+# Registre des indices : nom -> IndexPage
+INDEX_REGISTRY = {}
+
+
+def register_index(name, url, required=CONSTITUENT_HEADERS, symbol_headers=None, suffix=None, exchange=None):
+    """
+    Inscrit un indice.
+
+    Args:
+        required: En-têtes du tableau des entreprises (groupes nom, secteur ; cf. html_tables).
+        symbol_headers: Libellés de la colonne des tickers, si la page en a une.
+        suffix: Suffixe Yahoo Finance de la place (".PA"), None si l'indice est multi-places.
+        exchange: Code Yahoo Finance de la place ("PAR"), pour la recherche des tickers.
+    """
+    INDEX_REGISTRY[name] = IndexPage(name, url, tuple(required), symbol_headers, suffix, exchange)
+
+
+register_index("CAC40", "https://fr.wikipedia.org/wiki/CAC_40", symbol_headers=("mnemo",), suffix=".PA", exchange="PAR")
+register_index("SBF120", "https://fr.wikipedia.org/wiki/SBF_120", symbol_headers=("mnemo",), suffix=".PA", exchange="PAR")
+register_index(
+    "DAX", "https://en.wikipedia.org/wiki/DAX",
+    required=(("company",), ("sector",)), symbol_headers=("ticker", "symbol"), suffix=".DE", exchange="GER",
+)
+register_index(
+    "EUROSTOXX50", "https://en.wikipedia.org/wiki/EURO_STOXX_50",
+    required=(("company", "name"), ("sector", "industry")), symbol_headers=("ticker",),
+)
+
+
+def selected_indices(names=None):
+    """
+    Indices sélectionnés, dans l'ordre (liste ou chaîne "a,b", ``UNIVERSE`` par défaut).
+    Une liste peut aussi contenir des IndexPage hors registre (pages locales des tests).
+
+    Raises:
+        ValueError: si un nom n'est pas inscrit au registre.
+    """
+    names = UNIVERSE if names is None else names
+    if isinstance(names, str):
+        names = [name.strip().upper() for name in names.split(",") if name.strip()]
+    unknown = [name for name in names if not isinstance(name, IndexPage) and name not in INDEX_REGISTRY]
+    if unknown:
+        raise ValueError(f"Indices inconnus : {unknown} (attendu : {tuple(INDEX_REGISTRY)})")
+    pages = {}
+    for name in names:
+        page = name if isinstance(name, IndexPage) else INDEX_REGISTRY[name]
+        pages.setdefault(page.name, page)
+    return list(pages.values())
+
+
+def index_cache(page):
+    """Cache disque de la liste des entreprises d'un indice."""
+    return ConstituentCache(path=os.path.join(CACHE_DIR, f"constituents-{page.name.lower()}.json"))
+
+
+def page_symbol(ticker, suffix):
+    """Symbole Yahoo Finance d'un ticker affiché par la page ("ADS" -> "ADS.DE")."""
+    ticker = (ticker or "").strip().upper()
+    if not ticker:
+        return None
+    if "." in ticker:
+        return ticker
+    return f"{ticker}{suffix}" if suffix else None
+
+
+def tag_companies(companies, page):
+    """Ajoute à chaque entreprise son indice, sa place et le symbole lu sur la page."""
+    tagged = []
+    for company in companies:
+        company = dict(company, indices=[page.name], suffix=page.suffix, exchange=page.exchange)
+        symbol = page_symbol(company.pop("ticker", None), page.suffix)
+        if symbol:
+            company["symbol"] = symbol
+        tagged.append(company)
+    return tagged
+
+
+def merge_companies(groups):
+    """Fusionne des listes d'entreprises sans doublon, dans l'ordre : deux entreprises sont
+    identiques si elles ont le même ISIN, ou à défaut le même nom normalisé (une page
+    peut afficher les ISIN et l'autre non)."""
+    merged, by_isin, by_name = [], {}, {}
+    for companies in groups:
+        for company in companies:
+            isin, name = company.get("isin"), normalize_name(company.get("name"))
+            existing = by_isin.get(isin) if isin else None
+            if existing is None:
+                existing = by_name.get(name)
+            if existing is None:
+                existing = dict(company, indices=list(company.get("indices", [])))
+                merged.append(existing)
+            else:
+                indices = company.get("indices", [])
+                existing["indices"] += [index for index in indices if index not in existing["indices"]]
+                for field, value in company.items():
+                    if existing.get(field) in (None, "", "N/A"):
+                        existing[field] = value
+            if existing.get("isin"):
+                by_isin[existing["isin"]] = existing
+            by_name.setdefault(name, existing)
+    return merged
+
+
+async def scrape_index(page, client, parser=None):
+    """Liste des entreprises d'un indice : cache disque, sinon page téléchargée sur ``client``."""
+    from extract import CompanyScraper  # Import circulaire : extract utilise ce module
+
+    cache = index_cache(page)
+    entry = cache.load(page.url)
+    if entry and cache.is_fresh(entry):
+        return entry["companies"]
+
+    scraper = CompanyScraper(
+        url=page.url, cache=cache, parser=parser,
+        required=page.required, symbol_headers=page.symbol_headers, client=client,
+    )
+    with get_metrics().span("scrape_index", index=page.name) as span:
+        try:
+            companies = await scraper.scrape_httpx()
+        except Exception as e:  # Erreur HTTP (404, 500...) : les autres indices continuent
+            logger.error(f"Échec du scraping de {page.name} ({page.url}) : {e}")
+            companies = []
+        span.set(rows=len(companies))
+        if not companies:
+            span.fail()
+
+    if cache.is_valid(companies):
+        cache.save(page.url, companies)
+        return companies
+    if entry:
+        # Une liste expirée vaut mieux qu'un indice absent : elle change rarement
+        logger.warning(f"Liste en cache expirée utilisée pour {page.name}")
+        return entry["companies"]
+    return companies
+
+
+async def scrape_universe(names=None, client=None, parser=None):
+    """
+    Entreprises de tous les indices sélectionnés, sans doublon.
+
+    Args:
+        names (list | str): Indices du registre (``UNIVERSE`` par défaut).
+        client (httpx.AsyncClient): Client partagé (créé puis fermé ici par défaut).
+
+    Returns:
+        list: Entreprises avec leurs clés "indices", "suffix", "exchange" (et "symbol"
+        si la page affiche les tickers).
+    """
+    pages = selected_indices(names)
+    owned = client is None
+    if owned:
+        import httpx  # Importé seulement quand l'univers est scrapé
+
+        client = httpx.AsyncClient(
+            timeout=UNIVERSE_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=UNIVERSE_MAX_CONNECTIONS, max_keepalive_connections=UNIVERSE_MAX_CONNECTIONS,
+            ),
+        )
+    try:
+        results = await asyncio.gather(*(scrape_index(page, client, parser) for page in pages))
+    finally:
+        if owned:
+            await client.aclose()
+
+    groups = [tag_companies(companies, page) for page, companies in zip(pages, results)]
+    companies = merge_companies(groups)
+    counts = ", ".join(f"{page.name} {len(group)}" for page, group in zip(pages, groups))
+    logger.info(f"Univers de {len(companies)} entreprises sans doublon ({counts})")
+    return companies
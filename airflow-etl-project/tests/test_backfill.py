@@ -0,0 +1,135 @@
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+# Ajouter le dossier racine et 'scripts_etl' au path (comme test_extract.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+import scripts_etl.backfill as backfill_module
+from scripts_etl.backfill import backfill, reload_from_staging
+from scripts_etl.provider_client import ProviderClient
+from scripts_etl.quotes import QuoteProvider
+
+
+class FakeHistoryProvider(QuoteProvider):
+    """Faux fournisseur hors-ligne : une barre par jour ouvré, appels enregistrés."""
+
+    def __init__(self, fail=None):
+        self.calls = []
+        # Fonction (symboles, début) -> True pour simuler une requête en échec
+        self.fail = fail or (lambda symbols, start: False)
+
+    def fetch_history(self, symbols, start, end):
+        self.calls.append((tuple(symbols), start, end))
+        if self.fail(symbols, start):
+            raise ConnectionError("réseau indisponible")
+        days = pd.bdate_range(start, end - pd.Timedelta(days=1))
+        prices = np.linspace(100, 110, len(days))
+        return {
+            symbol: pd.DataFrame(
+                {
+                    "open": prices,
+                    "high": prices + 1,
+                    "low": prices - 1,
+                    "close": prices + 0.5,
+                    "adj_close": prices + 0.5,
+                    "volume": np.full(len(days), 1000.0),
+                },
+                index=days,
+            )
+            for symbol in symbols
+        }
+
+
+COMPANIES = [{"name": f"C{i}", "symbol": f"C{i}.PA"} for i in range(3)]
+
+
+def _rows(db_url):
+    engine = create_engine(db_url)
+    with engine.connect() as conn:
+        rows = conn.execute(text('SELECT name, COUNT(*), MAX(date) FROM stock_history GROUP BY name ORDER BY name'))
+        result = {name: (count, pd.Timestamp(last)) for name, count, last in rows}
+    engine.dispose()
+    return result
+
+
+@pytest.fixture
+def db_url(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'history.db'}"
+    monkeypatch.setenv("DATABASE_URL", url)
+    monkeypatch.setattr(backfill_module, "HISTORY_STAGING_DIR", str(tmp_path / "history"))
+    return url
+
+
+def test_backfill_loads_in_chunks_and_resumes(db_url):
+    provider = FakeHistoryProvider()
+    summary = asyncio.run(backfill(
+        COMPANIES, start="2024-01-01", end="2024-03-01", provider=provider,
+        batch_size=2, window_days=20, concurrency=2,
+    ))
+
+    days = len(pd.bdate_range("2024-01-01", "2024-02-29"))
+    assert summary["rows"] == 3 * days and not summary["failed"]
+    # 2 lots x 3 fenêtres de 20 jours : plusieurs morceaux, jamais toute la période d'un coup
+    assert summary["chunks"] == 6
+    assert all(len(symbols) <= 2 and end - start <= pd.Timedelta(days=20) for symbols, start, end in provider.calls)
+    assert {name: count for name, (count, _) in _rows(db_url).items()} == {"C0": days, "C1": days, "C2": days}
+
+    # Nouveau run plus long : seules les dates après la dernière chargée sont demandées
+    provider.calls.clear()
+    asyncio.run(backfill(COMPANIES, start="2024-01-01", end="2024-03-15", provider=provider, batch_size=2))
+    assert provider.calls and all(start == pd.Timestamp("2024-03-01") for _, start, _ in provider.calls)
+    days = len(pd.bdate_range("2024-01-01", "2024-03-14"))
+    assert {name: count for name, (count, _) in _rows(db_url).items()} == {"C0": days, "C1": days, "C2": days}
+
+
+def test_failed_window_stops_its_batch_and_is_resumed(db_url):
+    # La deuxième fenêtre du lot de C0 échoue (même après relance) : C0 doit s'arrêter
+    # à la fin de la première
+    provider = FakeHistoryProvider(fail=lambda symbols, start: "C0.PA" in symbols and start > pd.Timestamp("2024-01-01"))
+    summary = asyncio.run(backfill(
+        COMPANIES, start="2024-01-01", end="2024-03-01", provider=provider,
+        batch_size=1, window_days=20, concurrency=3, client=ProviderClient(retries=1, backoff_base=0),
+    ))
+
+    assert summary["failed"] == ["C0"]
+    # Première fenêtre, puis la deuxième et sa relance ; les suivantes ne sont pas demandées
+    assert sum(1 for symbols, _, _ in provider.calls if symbols == ("C0.PA",)) == 3
+    rows = _rows(db_url)
+    assert rows["C0"][1] < pd.Timestamp("2024-01-21") <= rows["C1"][1]
+
+    # Le run suivant comble le trou à partir de la dernière date de C0
+    summary = asyncio.run(backfill(
+        COMPANIES, start="2024-01-01", end="2024-03-01", provider=FakeHistoryProvider(), batch_size=1,
+    ))
+    assert not summary["failed"]
+    days = len(pd.bdate_range("2024-01-01", "2024-02-29"))
+    assert {name: count for name, (count, _) in _rows(db_url).items()} == {"C0": days, "C1": days, "C2": days}
+
+
+def test_reload_from_staging_without_provider(db_url, tmp_path):
+    asyncio.run(backfill(
+        COMPANIES, start="2023-12-01", end="2024-03-01", provider=FakeHistoryProvider(),
+        batch_size=2, window_days=30,
+    ))
+    # Un fichier par morceau, rangé par entreprise puis par année
+    assert (tmp_path / "history" / "name=C0" / "year=2023").is_dir()
+    assert (tmp_path / "history" / "name=C2" / "year=2024").is_dir()
+
+    engine = create_engine(db_url)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE stock_history"))
+    engine.dispose()
+
+    # Seules les partitions de C1 pour 2024 sont relues
+    rows = reload_from_staging(start="2024-01-01", names=["C1"], staging_dir=str(tmp_path / "history"))
+    days = len(pd.bdate_range("2024-01-01", "2024-02-29"))
+    assert rows == days
+    assert _rows(db_url) == {"C1": (days, pd.Timestamp("2024-02-29"))}
@@ -0,0 +1,54 @@
+import os
+import sys
+
+# Ajouter le dossier 'benchmarks' au path (fakes.py y ajoute 'scripts_etl')
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, "benchmarks"))
+
+from run_benchmarks import compare, run_suite
+
+
+def test_suite_runs_offline_on_a_tiny_workload():
+    config = {"tickers": 3, "days": 5, "pages": 1, "latency": 0.0, "database_url": None}
+    results = run_suite(config, repeat=1)
+
+    assert set(results) == {"scrape", "fetch", "transform", "load", "backfill", "staging"}
+    assert results["scrape"]["rows"] == 40
+    assert results["fetch"]["rows"] == 3
+    assert results["transform"]["rows"] == results["load"]["rows"] == results["backfill"]["rows"] == 15
+    assert all(r["rows_per_sec"] > 0 and r["peak_mb"] >= 0 for r in results.values())
+
+
+def test_compare_flags_slower_or_bigger_stages():
+    baseline = {"stages": {
+        "transform": {"rows_per_sec": 1000.0, "peak_mb": 10.0},
+        "load": {"rows_per_sec": 1000.0, "peak_mb": 10.0},
+    }}
+    results = {
+        "transform": {"rows_per_sec": 800.0, "peak_mb": 11.0},  # dans la tolérance
+        "load": {"rows_per_sec": 500.0, "peak_mb": 30.0},       # deux fois plus lent, 3x plus de mémoire
+        "scrape": {"rows_per_sec": 1.0, "peak_mb": 1.0},        # pas de référence : ignoré
+    }
+
+    regressions = compare(results, baseline, tolerance=0.3)
+
+    assert len(regressions) == 2 and all(message.startswith("load") for message in regressions)
+
+
+def test_compare_scales_the_reference_to_the_machine_speed():
+    baseline = {"calibration_seconds": 0.1, "stages": {
+        "transform": {"rows_per_sec": 1000.0, "peak_mb": 10.0},
+        "fetch": {"rows_per_sec": 100.0, "peak_mb": 1.0},
+    }}
+    results = {
+        "transform": {"rows_per_sec": 450.0, "peak_mb": 10.0},
+        "fetch": {"rows_per_sec": 95.0, "peak_mb": 1.0},
+    }
+
+    # Machine deux fois plus lente : 450 lignes/s tient la référence ramenée à 500 lignes/s ;
+    # l'étape fetch, limitée par la latence injectée, n'est pas corrigée
+    assert compare(results, baseline, tolerance=0.3, calibration=0.2) == []
+    assert compare(results, baseline, tolerance=0.3) != []
+    # Machine deux fois plus rapide : le même débit est une régression
+    regressions = compare(results, baseline, tolerance=0.3, calibration=0.05)
+    assert len(regressions) == 1 and regressions[0].startswith("transform")
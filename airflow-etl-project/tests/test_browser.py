@@ -0,0 +1,110 @@
+import asyncio
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Ajouter le dossier racine et 'scripts_etl' au path (comme test_extract.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+# Imports "à plat", comme extract.py : le navigateur partagé est le même
+import browser as browser_module
+import extract
+from browser import LeanBrowser, should_block
+from html_tables import CONSTITUENT_HEADERS
+
+TABLE = (
+    "<table><tr><th>Société</th><th>Secteur</th></tr>"
+    + "".join(f"<tr><td>Entreprise {i}</td><td>Secteur</td></tr>" for i in range(12))
+    + "</table>"
+)
+PAGE = f"""<html><head><link rel="stylesheet" href="/style.css"></head><body>
+<img src="/logo.png"><table><tr><th>Année</th></tr></table>{TABLE}</body></html>"""
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Page locale avec une feuille de style et une image ; note les chemins demandés."""
+    paths = []
+
+    def do_GET(self):
+        self.paths.append(self.path)
+        body, content_type = PAGE.encode("utf-8"), "text/html; charset=utf-8"
+        if self.path == "/style.css":
+            body, content_type = b"body { margin: 0 }", "text/css"
+        elif self.path == "/logo.png":
+            body, content_type = b"\x89PNG", "image/png"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    StubHandler.paths = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/wiki/CAC_40"
+    server.shutdown()
+    server.server_close()
+
+
+def test_heavy_resources_are_blocked():
+    for resource_type in ("image", "media", "font", "stylesheet"):
+        assert should_block(resource_type)
+    for resource_type in ("document", "script", "xhr", "fetch"):
+        assert not should_block(resource_type)
+    assert not should_block("image", blocked=())
+
+
+def test_lean_scrape_parses_only_the_table(monkeypatch):
+    class FakeBrowser:
+        async def table_html(self, url, required):
+            assert required == CONSTITUENT_HEADERS
+            return TABLE
+
+    monkeypatch.setattr(extract, "PLAYWRIGHT_LEAN", True)
+    monkeypatch.setattr(extract, "get_browser", lambda: FakeBrowser())
+
+    companies = asyncio.run(extract.CompanyScraper(url="http://localhost/").scrape_playwright())
+
+    assert len(companies) == 12 and companies[0]["name"] == "Entreprise 0"
+
+
+def test_close_without_launch_is_a_no_op():
+    asyncio.run(LeanBrowser().close())
+    asyncio.run(browser_module.close_browser())
+
+
+def test_browser_is_reused_and_skips_heavy_resources(stub_url):
+    lean = LeanBrowser()
+
+    async def scenario():
+        try:
+            first = await lean.table_html(stub_url, CONSTITUENT_HEADERS)
+            context = await lean.context()
+            second = await lean.table_html(stub_url, CONSTITUENT_HEADERS)
+            return first, second, context is await lean.context()
+        finally:
+            await lean.close()
+
+    try:
+        first, second, reused = asyncio.run(scenario())
+    except Exception as e:  # Chromium absent ou non lançable dans cet environnement
+        pytest.skip(f"Navigateur Playwright indisponible : {type(e).__name__}")
+
+    # Seul le tableau des entreprises revient (le navigateur ajoute <tbody>)
+    assert first == second and "Année" not in first
+    assert len(extract.CompanyScraper()._parse_html(first)) == 12
+    assert reused
+    assert StubHandler.paths == ["/wiki/CAC_40", "/wiki/CAC_40"]
+    assert lean.blocked_types == {"stylesheet": 2, "image": 2}
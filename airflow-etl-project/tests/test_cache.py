@@ -0,0 +1,83 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Ajouter le dossier racine et 'scripts_etl' au path (comme test_extract.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+from scripts_etl.cache import ConstituentCache
+from scripts_etl.extract import CompanyScraper
+
+ETAG = '"v1"'
+ROWS = "".join(f"<tr><td>{i}</td><td>Entreprise {i}</td><td>Secteur</td></tr>" for i in range(3))
+PAGE = f'<html><body><table class="wikitable"><tr><th>#</th><th>Nom</th><th>Secteur</th></tr>{ROWS}</table></body></html>'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Page Wikipedia locale : renvoie 304 si l'ETag envoyé correspond."""
+    statuses = []
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == ETAG:
+            self.statuses.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = PAGE.encode("utf-8")
+        self.statuses.append(200)
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    StubHandler.statuses = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/wiki/CAC_40"
+    server.shutdown()
+    server.server_close()
+
+
+def test_cache_hit_within_ttl_makes_no_request(stub_url, tmp_path):
+    cache = ConstituentCache(path=str(tmp_path / "c.json"), ttl=3600, min_companies=1)
+    scraper = CompanyScraper(url=stub_url, cache=cache)
+
+    first = scraper.scrape_cached()
+    second = scraper.scrape_cached()
+
+    assert len(first) == 3
+    assert second == first
+    assert StubHandler.statuses == [200]
+
+
+def test_expired_cache_revalidates_with_etag(stub_url, tmp_path):
+    cache = ConstituentCache(path=str(tmp_path / "c.json"), ttl=0, min_companies=1)
+    scraper = CompanyScraper(url=stub_url, cache=cache)
+
+    scraper.scrape_cached()
+    companies = scraper.scrape_cached()
+    scraper.scrape_cached(force_refresh=True)
+
+    assert companies[0]["name"] == "Entreprise 0"
+    assert StubHandler.statuses == [200, 304, 200]
+
+
+def test_incomplete_list_is_not_cached(tmp_path):
+    cache = ConstituentCache(path=str(tmp_path / "c.json"), min_companies=10)
+
+    assert cache.save("http://x", [{"name": "A", "sector": "B"}]) is None
+    assert cache.load("http://x") is None
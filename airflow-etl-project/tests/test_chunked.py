@@ -0,0 +1,120 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+# Ajouter le dossier racine et 'scripts_etl' au path (comme test_extract.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+import scripts_etl.chunked as chunked_module
+from scripts_etl.db import read_watermark
+from scripts_etl.chunked import chunk_modes, chunked, run_chunked
+from scripts_etl.provider_client import ProviderClient, TokenBucket
+from scripts_etl.quotes import QuoteProvider
+
+
+class RecordingProvider(QuoteProvider):
+    """Faux fournisseur hors-ligne : un cours par symbole, appels enregistrés dans ``events``."""
+
+    def __init__(self, events, latency=0.0):
+        self.events = events
+        self.latency = latency
+        self.lock = threading.Lock()
+
+    def fetch_quote(self, symbol):
+        if self.latency:
+            threading.Event().wait(self.latency)
+        with self.lock:
+            self.events.append(("fetch", symbol))
+        return {"price": 10.0, "change": 1.0, "open": 9.5, "date": pd.Timestamp("2024-01-02 17:35")}
+
+
+def unlimited():
+    return ProviderClient(limiter=TokenBucket(rate=0))
+
+
+def companies(count):
+    # Générateur : la liste n'est jamais matérialisée
+    return ({"name": f"C{i:02d}", "symbol": f"C{i:02d}.PA"} for i in range(count))
+
+
+@pytest.fixture
+def db_url(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'chunked.db'}"
+    monkeypatch.setenv("DATABASE_URL", url)
+    return url
+
+
+def _count(db_url):
+    engine = create_engine(db_url)
+    with engine.connect() as conn:
+        count = conn.execute(text("SELECT COUNT(*) FROM stock_prices")).scalar()
+    engine.dispose()
+    return count
+
+
+def test_chunks_are_read_lazily():
+    assert [len(chunk) for chunk in chunked(companies(25), 10)] == [10, 10, 5]
+    assert list(chunked([], 10)) == []
+    assert chunk_modes("replace") == ("replace", "append")
+    assert chunk_modes("upsert") == ("upsert", "upsert")
+
+
+@pytest.mark.parametrize("mode", ["upsert", "replace"])
+def test_every_chunk_is_loaded(db_url, mode):
+    summary = asyncio.run(run_chunked(
+        companies(25), provider=RecordingProvider([]), chunk_size=10, max_pending=1, mode=mode,
+        client=unlimited(),
+    ))
+
+    assert summary["chunks"] == 3 and summary["rows"] == 25
+    assert summary["max_rows"] == 30 and summary["peak_mb"] > 0
+    # "replace" ne vide la table qu'au premier morceau
+    assert _count(db_url) == 25
+    # Un filigrane par morceau chargé, puis un rafraîchissement des tables de service en fin de run
+    assert read_watermark("stock_prices") == {**read_watermark("stock_prices"), "version": 3 + 1, "rows_loaded": 25}
+    engine = create_engine(db_url)
+    assert pd.read_sql("SELECT COUNT(*) AS n FROM stock_prices_latest", engine)["n"].item() == 25
+    engine.dispose()
+
+
+def test_loading_starts_before_fetching_ends(db_url, monkeypatch):
+    events = []
+
+    def recording_load(frame, table_name, mode, **options):
+        events.append(("load", len(frame)))
+        return True
+
+    monkeypatch.setattr(chunked_module, "load_to_postgresql", recording_load)
+    asyncio.run(run_chunked(
+        companies(40), provider=RecordingProvider(events, latency=0.01), chunk_size=5, max_pending=1,
+        client=unlimited(),
+    ))
+
+    kinds = [kind for kind, _ in events]
+    assert kinds.count("load") == 8
+    # Le premier morceau est chargé alors que d'autres restent à télécharger
+    assert kinds.index("load") < len(kinds) - 1 - kinds[::-1].index("fetch")
+
+
+def test_failed_load_stops_the_fetch(db_url, monkeypatch):
+    events = []
+
+    def failing_load(frame, table_name, mode, **options):
+        raise ConnectionError("base indisponible")
+
+    monkeypatch.setattr(chunked_module, "load_to_postgresql", failing_load)
+    with pytest.raises(ConnectionError):
+        asyncio.run(run_chunked(
+            companies(100), provider=RecordingProvider(events, latency=0.01), chunk_size=5, max_pending=1,
+            client=unlimited(),
+        ))
+
+    # Au plus les morceaux en cours et en attente ont été téléchargés
+    assert len(events) < 100
@@ -0,0 +1,135 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ajouter 'scripts_etl' et 'affichage' au path (comme dans le conteneur du dashboard)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+sys.path.append(os.path.join(PROJECT_ROOT, "affichage"))
+
+from queries import daily_aggregates, fetch_page, latest_quotes, page_cursor, serving_ready, summary_stats, table_columns
+from scripts_etl.db import get_engine, read_watermark
+from scripts_etl.load import load_to_postgresql
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'dashboard.db'}")
+    rng = np.random.default_rng(0)
+    days = pd.date_range("2024-01-01", periods=30, freq="D")
+    frame = pd.DataFrame({
+        "name": np.repeat(["AAA", "BBB", "CCC"], len(days)),
+        "price": rng.uniform(10, 100, 3 * len(days)),
+        "change": rng.normal(0, 1, 3 * len(days)),
+        "open": rng.uniform(10, 100, 3 * len(days)),
+        "date": np.tile(days, 3),
+    })
+    load_to_postgresql(frame, "stock_prices", mode="upsert")
+    return get_engine()
+
+
+def test_loader_bumps_the_watermark(engine):
+    first = read_watermark("stock_prices", engine)
+    assert first["version"] == 1 and first["rows_loaded"] == 90
+
+    load_to_postgresql(pd.DataFrame({"name": ["AAA"], "price": [1.0], "date": ["2024-03-01"]}), "stock_prices")
+
+    second = read_watermark("stock_prices", engine)
+    assert second["version"] == 2 and second["loaded_at"] >= first["loaded_at"]
+    assert read_watermark("unknown_table", engine) is None
+
+
+def test_keyset_pages_cover_the_filtered_rows_in_order(engine):
+    pages, cursor = [], None
+    while True:
+        page = fetch_page(engine, "stock_prices", names=("AAA", "CCC"), start="2024-01-05", cursor=cursor, page_size=7)
+        if page.empty:
+            break
+        assert len(page) <= 7
+        pages.append(page)
+        cursor = page_cursor(page)
+
+    rows = pd.concat(pages, ignore_index=True)
+    expected = (
+        pd.read_sql_table("stock_prices", engine)
+        .query("name in ('AAA', 'CCC') and date >= '2024-01-05'")
+        .sort_values(["date", "name"], ascending=False)
+    )
+    assert list(zip(rows["date"], rows["name"])) == list(zip(expected["date"], expected["name"]))
+
+
+def test_summary_stats_match_pandas_describe(engine):
+    numeric = [name for name, _, is_numeric in table_columns(engine, "stock_prices") if is_numeric]
+    total, stats = summary_stats(engine, "stock_prices", numeric, names=("BBB",), end="2024-01-10")
+
+    frame = pd.read_sql_table("stock_prices", engine).query("name == 'BBB' and date <= '2024-01-10'")
+    expected = frame[numeric].describe().loc[["count", "mean", "std", "min", "max"]]
+    assert total == 10
+    pd.testing.assert_frame_equal(stats, expected, check_exact=False, rtol=1e-6)
+
+
+def test_summary_stats_keep_precision_on_high_prices(tmp_path, monkeypatch):
+    """Cours élevés et peu dispersés : l'écart-type reste celui de describe()."""
+    db_url = os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{tmp_path / 'prices.db'}"
+    monkeypatch.setenv("DATABASE_URL", db_url)
+    rng = np.random.default_rng(1)
+    frame = pd.DataFrame({
+        "name": "AAA",
+        "price": 1e8 + rng.normal(0, 1e-2, 200),
+        "date": pd.date_range("2024-01-01", periods=200, freq="h"),
+    })
+    load_to_postgresql(frame, "precise_prices", mode="replace")
+
+    _, stats = summary_stats(get_engine(), "precise_prices", ["price"])
+
+    expected = frame[["price"]].describe().loc[["count", "mean", "std", "min", "max"]]
+    pd.testing.assert_frame_equal(stats, expected, check_exact=False, rtol=1e-6)
+
+
+def test_latest_quotes_come_from_the_serving_table(engine):
+    assert serving_ready(engine, "stock_prices")
+    raw = pd.read_sql_table("stock_prices", engine)
+    expected = raw.sort_values("date").groupby("name").tail(1).sort_values("name")
+
+    latest = latest_quotes(engine, "stock_prices")
+
+    assert latest["name"].tolist() == ["AAA", "BBB", "CCC"]
+    assert latest["price"].tolist() == expected["price"].tolist()
+    assert latest_quotes(engine, "stock_prices", names=("BBB",))["name"].tolist() == ["BBB"]
+
+    # Rafraîchie dans la transaction du chargement suivant
+    load_to_postgresql(
+        pd.DataFrame({"name": ["AAA"], "price": [1.0], "date": ["2024-03-01 09:30"]}), "stock_prices", mode="upsert",
+    )
+    assert latest_quotes(engine, "stock_prices", names=("AAA",))["price"].tolist() == [1.0]
+
+
+def test_daily_aggregates_per_ticker_and_day(engine):
+    intraday = pd.DataFrame({
+        "name": ["AAA", "AAA"], "price": [5.0, 7.0], "change": [0.1, 0.2], "open": [4.0, 4.0],
+        "date": ["2024-03-04 10:00", "2024-03-04 17:30"],
+    })
+    load_to_postgresql(intraday, "stock_prices", mode="upsert")
+
+    daily = daily_aggregates(engine, "stock_prices", names=("AAA",), start="2024-01-30", end="2024-03-04")
+
+    assert daily["day"].dt.strftime("%Y-%m-%d").tolist() == ["2024-01-30", "2024-03-04"]
+    last = daily.iloc[-1]
+    assert (last["quotes"], last["low"], last["high"], last["avg_price"], last["close"]) == (2, 5.0, 7.0, 6.0, 7.0)
+
+
+def test_serving_tables_tolerate_duplicate_rows(tmp_path, monkeypatch):
+    """Mode append : le même cours chargé deux fois ne casse pas l'index unique des tables de service."""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'append.db'}")
+    quote = pd.DataFrame({"name": ["AAA"], "price": [3.0], "change": [0.1], "open": [2.0], "date": ["2024-03-01 09:30"]})
+    for _ in range(3):
+        assert load_to_postgresql(quote, "stock_prices", mode="append") is True
+
+    engine = get_engine()
+    assert latest_quotes(engine, "stock_prices", names=("AAA",))["price"].tolist() == [3.0]
+    daily = daily_aggregates(engine, "stock_prices", names=("AAA",), start="2024-03-01", end="2024-03-01")
+    assert daily[["quotes", "close"]].values.tolist() == [[3, 3.0]]
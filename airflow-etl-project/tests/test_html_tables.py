@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+
+# Ajouter le dossier racine et 'scripts_etl' au path (comme test_extract.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+from scripts_etl.extract import CompanyScraper
+from scripts_etl.html_tables import find_table
+
+FIXTURE = os.path.join(PROJECT_ROOT, "benchmarks", "fixtures", "cac40.html")
+
+# Le premier "wikitable" n'est pas celui des entreprises ; celui-ci contient un tableau imbriqué
+PAGE = """
+<html><body>
+<table class="wikitable"><tr><th>Année</th><th>Entrée</th><th>Sortie</th></tr>
+<tr><td>1988</td><td>Crédit Agricole</td><td>Bouygues</td></tr></table>
+<table class="wikitable sortable">
+<tr><th>Logo</th><th>Société</th><th>Secteur d'activité</th><th>Code ISIN</th></tr>
+<tr><td><table><tr><td>logo</td></tr></table></td><td><a href="/wiki/Accor">Accor</a></td>
+    <td>Hôtellerie</td><td>FR0000120404</td></tr>
+<tr><td></td><td>Air&#160;Liquide</td><td>Chimie</td><td>FR0000120073</td></tr>
+</table>
+</body></html>
+"""
+
+
+@pytest.mark.parametrize("backend", ["lxml", "bs4"])
+def test_table_is_found_by_its_headers(backend):
+    table = find_table(PAGE, backend=backend)
+
+    assert table.headers == ["Logo", "Société", "Secteur d'activité", "Code ISIN"]
+    assert [row[1:] for row in table.rows] == [
+        ["Accor", "Hôtellerie", "FR0000120404"],
+        ["Air\xa0Liquide", "Chimie", "FR0000120073"],
+    ]
+
+
+@pytest.mark.parametrize("backend", ["lxml", "bs4"])
+def test_no_matching_table(backend):
+    assert find_table("<table><tr><th>Année</th></tr></table>", backend=backend) is None
+    assert CompanyScraper(parser=backend)._parse_html("<p>Pas de tableau</p>") == []
+
+
+def test_backends_give_the_same_companies_on_the_saved_page():
+    with open(FIXTURE, encoding="utf-8") as f:
+        html = f.read()
+
+    companies = CompanyScraper(parser="lxml")._parse_html(html)
+
+    assert companies == CompanyScraper(parser="bs4")._parse_html(html)
+    assert len(companies) == 40
+    assert companies[0] == {"name": "Accor", "sector": "Hôtellerie", "isin": "FR0000120404"}
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        find_table(PAGE, backend="regex")
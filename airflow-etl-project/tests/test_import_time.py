@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+# Les modules sont importés depuis scripts_etl, comme dans le conteneur ETL
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(PROJECT_ROOT, "scripts_etl")
+
+# Bibliothèques chargées seulement par l'étape qui s'en sert
+HEAVY_MODULES = (
+    "playwright", "httpx", "requests", "yfinance", "bs4", "lxml", "pandas", "sqlalchemy", "pyarrow",
+)
+
+
+def import_times(module):
+    """Temps d'import cumulé (µs) de chaque module chargé par ``import module`` (python -X importtime)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_extract_import_loads_no_heavy_library():
+    times = import_times("extract")
+
+    loaded = sorted({name.split(".")[0] for name in times} & set(HEAVY_MODULES))
+    assert loaded == []
+    # Avec pandas, SQLAlchemy, yfinance et Playwright chargés d'office : ~1.5s
+    assert times["extract"] < 500_000
+
+
+def test_pipeline_import_loads_no_heavy_library():
+    times = import_times("pipeline")
+
+    # Les étapes importent load, quotes, schema, staging et transform quand elles s'exécutent
+    loaded = sorted({name.split(".")[0] for name in times} & set(HEAVY_MODULES))
+    assert loaded == []
+    assert times["pipeline"] < 500_000
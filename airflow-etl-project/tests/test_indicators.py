@@ -0,0 +1,108 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+# Ajouter le dossier racine et 'scripts_etl' au path (comme test_extract.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+from scripts_etl.indicators import compute_indicators, update_indicators
+from scripts_etl.load import load_to_postgresql
+from scripts_etl.schema import STOCK_HISTORY_SCHEMA
+
+COLUMNS = ["close", "return_1d", "ma_5", "ma_10", "volatility_4", "drawdown"]
+WINDOWS = {"ma_windows": (5, 10), "volatility_window": 4}
+
+
+def random_walk(days, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+
+
+def history(names, start, days):
+    dates = pd.bdate_range(start, periods=days)
+    frames = []
+    for seed, name in enumerate(names):
+        closes = random_walk(len(dates), seed)
+        frames.append(pd.DataFrame({
+            "name": name, "date": dates, "open": closes, "high": closes, "low": closes,
+            "close": closes, "adj_close": closes, "volume": 1000,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_indicators_match_pandas():
+    closes = pd.Series(random_walk(60))
+    columns, state = compute_indicators(closes.to_numpy(), **WINDOWS)
+
+    returns = closes.pct_change()
+    np.testing.assert_allclose(columns["return_1d"], returns)
+    np.testing.assert_allclose(columns["ma_10"], closes.rolling(10).mean())
+    np.testing.assert_allclose(columns["volatility_4"], np.log1p(returns).rolling(4).std() * np.sqrt(252))
+    np.testing.assert_allclose(columns["drawdown"], closes / closes.cummax() - 1)
+    # L'état ne garde que la plus longue fenêtre
+    assert len(state["closes"]) == 10 and state["peak"] == closes.max()
+
+
+@pytest.mark.parametrize("split", [1, 3, 10, 45])
+def test_incremental_equals_full_recompute(split):
+    closes = random_walk(60, seed=split)
+    full, _ = compute_indicators(closes, **WINDOWS)
+
+    first, state = compute_indicators(closes[:split], **WINDOWS)
+    rest, _ = compute_indicators(closes[split:], state, **WINDOWS)
+
+    for column in COLUMNS:
+        np.testing.assert_allclose(np.concatenate([first[column], rest[column]]), full[column], rtol=1e-10)
+
+
+@pytest.fixture
+def db_url(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'indicators.db'}"
+    monkeypatch.setenv("DATABASE_URL", url)
+    return url
+
+
+def _indicators(db_url):
+    engine = create_engine(db_url)
+    frame = pd.read_sql("SELECT * FROM stock_indicators ORDER BY name, date", engine)
+    engine.dispose()
+    return frame
+
+
+def test_daily_run_only_processes_new_bars(db_url, tmp_path):
+    names = ["A", "B", "C"]
+    bars = history(names, "2023-01-02", 80)
+    state_path = str(tmp_path / "state.json")
+    run = dict(state_path=state_path, batch_size=2, **WINDOWS)
+
+    load_to_postgresql(bars[bars["date"] < "2023-04-01"], "stock_history", "upsert", schema=STOCK_HISTORY_SCHEMA)
+    # Premier run : recalcul complet, réparti sur deux processus
+    first = update_indicators(workers=2, **run)
+    assert first["full"] == 3 and first["incremental"] == 0
+
+    load_to_postgresql(bars[bars["date"] >= "2023-04-01"], "stock_history", "upsert", schema=STOCK_HISTORY_SCHEMA)
+    daily = update_indicators(**run)
+    new_rows = int((bars["date"] >= "2023-04-01").sum())
+    assert daily == {"incremental": 3, "full": 0, "rows": new_rows}
+    assert update_indicators(**run)["rows"] == 0
+
+    incremental = _indicators(db_url)
+    update_indicators(full=True, workers=1, **run)
+    recomputed = _indicators(db_url)
+    assert len(incremental) == len(bars)
+    np.testing.assert_allclose(incremental[COLUMNS], recomputed[COLUMNS], rtol=1e-6)
+
+
+def test_changed_windows_trigger_recompute(db_url, tmp_path):
+    load_to_postgresql(history(["A"], "2023-01-02", 30), "stock_history", "upsert", schema=STOCK_HISTORY_SCHEMA)
+    state_path = str(tmp_path / "state.json")
+    update_indicators(state_path=state_path, workers=1, **WINDOWS)
+
+    summary = update_indicators(state_path=state_path, workers=1, ma_windows=(5,), volatility_window=4)
+    assert summary["full"] == 1 and summary["rows"] == 30
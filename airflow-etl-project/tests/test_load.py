@@ -1,9 +1,19 @@
 import os
+import sys
 import pandas as pd
 import pytest
 from sqlalchemy import create_engine, text
 
-from scripts_etl.load import load_to_postgresql
+# Ajouter le dossier racine et 'scripts_etl' au path (load.py importe db.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+from scripts_etl.db import read_watermark
+from scripts_etl.load import _copy_buffer, load_to_postgresql
+
+# Import "à plat", comme load.py : le registre de métriques est le même
+import metrics as metrics_module
 
 
 @pytest.fixture(scope="module")
@@ -20,13 +30,17 @@ def pg_engine():
 
     # Ensure table is clean before running tests
     with engine.begin() as conn:
-        conn.execute(text("DROP TABLE IF EXISTS stock_prices"))
+        # CASCADE : les vues matérialisées du dashboard dépendent de la table
+        conn.execute(text("DROP TABLE IF EXISTS stock_prices CASCADE"))
+        conn.execute(text("DROP TABLE IF EXISTS stock_prices_row_hashes"))
 
     yield engine
 
     # Cleanup after tests
     with engine.begin() as conn:
-        conn.execute(text("DROP TABLE IF EXISTS stock_prices"))
+        # CASCADE : les vues matérialisées du dashboard dépendent de la table
+        conn.execute(text("DROP TABLE IF EXISTS stock_prices CASCADE"))
+        conn.execute(text("DROP TABLE IF EXISTS stock_prices_row_hashes"))
 
     engine.dispose()
 
@@ -49,4 +63,148 @@ def test_load_to_postgresql(pg_engine, monkeypatch):
 
     with pg_engine.begin() as conn:
         result = conn.execute(text("SELECT COUNT(*) FROM stock_prices")).scalar()
-    assert result == len(df)
\ No newline at end of file
+    assert result == len(df)
+
+def test_load_upsert_keeps_history_and_updates(tmp_path, monkeypatch):
+    """Le mode upsert conserve l'historique et met à jour les lignes de même clé."""
+    db_url = f"sqlite:///{tmp_path / 'stock.db'}"
+    monkeypatch.setenv("DATABASE_URL", db_url)
+
+    first = pd.DataFrame(
+        {
+            "name": ["AAPL", "MSFT"],
+            "price": [150.0, 300.0],
+            "change": [1.5, 0.8],
+            "open": [148.0, 298.0],
+            "date": ["2023-04-01", "2023-04-01"],
+        }
+    )
+    second = pd.DataFrame(
+        {
+            "name": ["AAPL", "AAPL"],
+            "price": [155.0, 151.0],
+            "change": [3.3, 0.7],
+            "open": [150.0, 150.5],
+            "date": ["2023-04-02", "2023-04-01"],
+        }
+    )
+
+    assert load_to_postgresql(first, "stock_prices", mode="upsert") is True
+    assert load_to_postgresql(second, "stock_prices", mode="upsert") is True
+
+    engine = create_engine(db_url)
+    rows = pd.read_sql("SELECT name, price FROM stock_prices ORDER BY name, date", engine)
+    engine.dispose()
+    assert rows["name"].tolist() == ["AAPL", "AAPL", "MSFT"]
+    assert rows["price"].tolist() == [151.0, 155.0, 300.0]
+
+
+@pytest.mark.parametrize("method", ["copy", "multi"])
+def test_prices_are_stored_exactly(tmp_path, monkeypatch, method):
+    """Les cours sont relus à l'identique, quelle que soit la méthode d'écriture."""
+    from scripts_etl.transform import transform
+
+    db_url = f"sqlite:///{tmp_path / 'stock.db'}"
+    monkeypatch.setenv("DATABASE_URL", db_url)
+    frame = transform([{"name": "AAPL", "price": "170.53", "change": "0.1", "open": 170.12, "date": "2023-04-01"}])
+
+    assert load_to_postgresql(frame, "stock_prices", mode="upsert", method=method) is True
+
+    engine = create_engine(db_url)
+    rows = pd.read_sql("SELECT price, open FROM stock_prices", engine)
+    engine.dispose()
+    assert rows.iloc[0].tolist() == [170.53, 170.12]
+
+
+def test_upsert_skips_unchanged_rows(tmp_path, monkeypatch):
+    """Seules les lignes nouvelles ou modifiées sont réécrites ; le filigrane ne bouge pas sans changement."""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'stock.db'}")
+    registry = metrics_module.Metrics([metrics_module.NullSink()], job="test")
+    previous = metrics_module.set_metrics(registry)
+    frame = pd.DataFrame({
+        "name": ["AAPL", "MSFT", "ORA"],
+        "price": [150.5, 300.25, float("nan")],
+        "change": [1.5, 0.8, 0.0],
+        "open": [148.0, 298.0, 10.0],
+        "date": ["2023-04-01"] * 3,
+    })
+
+    def counts():
+        return {kind: registry.total(f"load_{kind}_total") for kind in ("inserted", "updated", "skipped")}
+
+    try:
+        load_to_postgresql(frame, "stock_prices", mode="upsert")
+        assert counts() == {"inserted": 3, "updated": 0, "skipped": 0}
+        version = read_watermark("stock_prices")["version"]
+
+        # Même contenu (un week-end) : rien n'est réécrit, le cache du dashboard reste valide
+        load_to_postgresql(frame, "stock_prices", mode="upsert")
+        assert counts() == {"inserted": 3, "updated": 0, "skipped": 3}
+        assert read_watermark("stock_prices")["version"] == version
+
+        changed = pd.concat([frame, frame.head(1).assign(date="2023-04-02")], ignore_index=True)
+        changed.loc[1, "price"] = 301.0
+        load_to_postgresql(changed, "stock_prices", mode="upsert")
+        assert counts() == {"inserted": 4, "updated": 1, "skipped": 5}
+        assert read_watermark("stock_prices") == {**read_watermark("stock_prices"), "version": version + 1, "rows_loaded": 2}
+
+        # Chargement hors upsert : l'index des empreintes est reconstruit depuis la table
+        load_to_postgresql(changed.head(0), "stock_prices", mode="append")
+        load_to_postgresql(changed, "stock_prices", mode="upsert")
+        assert counts() == {"inserted": 4, "updated": 1, "skipped": 9}
+    finally:
+        metrics_module.set_metrics(previous)
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'stock.db'}")
+    rows = pd.read_sql("SELECT name, price FROM stock_prices ORDER BY date, name", engine)
+    engine.dispose()
+    assert rows["price"].tolist()[:2] == [150.5, 301.0] and len(rows) == 4
+
+
+def test_row_count_is_only_checked_in_debug(tmp_path, monkeypatch, caplog):
+    """Le COUNT(*) de diagnostic (parcours de toute la table) n'est fait qu'en niveau DEBUG."""
+    from sqlalchemy import event
+    from db import get_engine  # Import "à plat", comme load.py : le même engine
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'stock.db'}")
+    statements = []
+    event.listen(get_engine(), "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+    frame = pd.DataFrame({"name": ["AAPL"], "price": [150.0], "date": ["2023-04-01"]})
+
+    load_to_postgresql(frame, "stock_prices", mode="append")
+    assert 'SELECT COUNT(*) FROM "stock_prices"' not in statements
+
+    with caplog.at_level("DEBUG", logger="scripts_etl.load"):
+        load_to_postgresql(frame, "stock_prices", mode="append")
+    assert 'SELECT COUNT(*) FROM "stock_prices"' in statements
+
+
+def test_copy_buffer_serialises_missing_values_as_null():
+    """NaN, NaT et pd.NA deviennent le marqueur NULL de COPY, les chaînes vides restent vides."""
+    df = pd.DataFrame(
+        {
+            "name": pd.Categorical(["A,B", ""]),
+            "price": [1.5, float("nan")],
+            "volume": pd.array([pd.NA, 3], dtype="Int64"),
+            "date": [pd.Timestamp("2023-04-01 09:30"), pd.NaT],
+        }
+    )
+
+    lines = _copy_buffer(df).read().splitlines()
+
+    assert lines == [
+        '"A,B",1.5,\\N,2023-04-01 09:30:00.000000',
+        ",\\N,3,\\N",
+    ]
+
+
+def test_get_engine_is_shared_per_url(tmp_path, monkeypatch):
+    """Un seul engine (et donc un seul pool) par processus et par URL."""
+    from scripts_etl.db import database_ready, get_engine
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'a.db'}")
+    engine = get_engine()
+
+    assert get_engine() is engine
+    assert get_engine(f"sqlite:///{tmp_path / 'b.db'}") is not engine
+    assert database_ready(engine, timeout=1) is True
@@ -0,0 +1,122 @@
+import asyncio
+import io
+import json
+import os
+import socket
+import sys
+
+import pytest
+
+# Ajouter le dossier racine et 'scripts_etl' au path (comme test_extract.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+import metrics as metrics_module
+from metrics import JsonLogSink, Metrics, NullSink, PrometheusTextfileSink, StatsdSink
+from provider_client import ProviderClient
+from quotes import QuoteProvider, fetch_quotes
+
+
+class SlowProvider(QuoteProvider):
+    """Faux fournisseur : BAD.PA échoue, les autres répondent immédiatement."""
+
+    def fetch_quote(self, symbol):
+        if symbol == "BAD.PA":
+            raise ConnectionError("indisponible")
+        return {"price": 1.0, "change": 0.0, "open": 1.0, "date": None}
+
+
+@pytest.fixture
+def metrics():
+    registry = Metrics([NullSink()], job="test")
+    previous = metrics_module.set_metrics(registry)
+    yield registry
+    metrics_module.set_metrics(previous)
+
+
+def test_span_records_duration_counters_and_failures(metrics):
+    with metrics.span("load", table="t") as span:
+        span.set(rows=10, method="copy")
+    with pytest.raises(ValueError):
+        with metrics.span("load", table="t"):
+            raise ValueError("boom")
+    with metrics.span("scrape_strategy", strategy="httpx") as span:
+        span.fail("timeout")
+
+    count, total, maximum = metrics.timings[("load_seconds", (("table", "t"),))]
+    assert count == 2 and total >= maximum >= 0
+    assert metrics.total("load_rows_total", table="t") == 10
+    assert metrics.total("load_failures_total") == 1
+    assert metrics.total("scrape_strategy_failures_total", strategy="httpx") == 1
+    # Les champs non numériques ne deviennent pas des compteurs
+    assert metrics.total("load_method_total") == 0
+
+
+def test_fetch_quotes_traces_each_ticker(metrics):
+    companies = [{"name": "A", "symbol": "A.PA"}, {"name": "Bad", "symbol": "BAD.PA"}]
+    asyncio.run(fetch_quotes(companies, provider=SlowProvider(), client=ProviderClient(retries=0)))
+
+    assert ("quote_fetch_seconds", (("symbol", "A.PA"),)) in metrics.timings
+    assert metrics.total("quote_fetch_failures_total", symbol="BAD.PA") == 1
+    assert metrics.total("quote_fetch_failures_total", symbol="A.PA") == 0
+    assert metrics.total("quotes_total") == 2 and metrics.total("quotes_missing_total") == 1
+
+
+def test_json_sink_writes_one_json_line_per_span():
+    stream = io.StringIO()
+    sink = JsonLogSink(stream)
+    # Le handler du logger dédié n'est installé qu'une fois par processus
+    sink.logger.handlers[0].setStream(stream)
+    registry = Metrics([sink], job="test")
+    with registry.span("transform") as span:
+        span.set(rows=3)
+    registry.flush()
+
+    span_event, summary = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert span_event["name"] == "transform" and span_event["rows"] == 3 and span_event["status"] == "ok"
+    assert summary["event"] == "summary" and summary["counters"]["transform_rows_total"] == 3
+
+
+def test_prometheus_textfile(tmp_path):
+    registry = Metrics([PrometheusTextfileSink(str(tmp_path))], job="pipeline-fetch-001")
+    registry.incr("scrape_bytes_total", 2048, strategy="requests")
+    registry.observe("quote_fetch_seconds", 0.5, symbol='A"B.PA')
+    registry.flush()
+
+    text = (tmp_path / "pipeline-fetch-001.prom").read_text()
+    assert "# TYPE etl_scrape_bytes_total counter" in text
+    assert 'etl_scrape_bytes_total{strategy="requests"} 2048' in text
+    assert 'etl_quote_fetch_seconds_count{symbol="A\\"B.PA"} 1' in text
+    assert 'etl_quote_fetch_seconds_max{symbol="A\\"B.PA"} 0.500000' in text
+
+
+def test_prometheus_textfile_is_written_during_the_run(tmp_path):
+    """Le fichier existe dès le premier span, puis est réécrit au plus toutes les ``interval`` secondes."""
+    registry = Metrics([PrometheusTextfileSink(str(tmp_path), interval=3600)], job="intraday")
+    path = tmp_path / "intraday.prom"
+
+    with registry.span("stream_batch", table="stock_prices") as span:
+        span.set(written=5)
+    assert 'etl_stream_batch_written_total{table="stock_prices"} 5' in path.read_text()
+
+    with registry.span("stream_batch", table="stock_prices") as span:
+        span.set(written=3)
+    assert 'etl_stream_batch_written_total{table="stock_prices"} 5' in path.read_text()
+
+    registry.flush()
+    assert 'etl_stream_batch_written_total{table="stock_prices"} 8' in path.read_text()
+
+
+def test_statsd_sink_sends_udp_datagrams():
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(("127.0.0.1", 0))
+    server.settimeout(2)
+    try:
+        registry = Metrics([StatsdSink("127.0.0.1", server.getsockname()[1], prefix="etl")])
+        registry.incr("quote_retries_total", 3, symbol="AI.PA")
+        registry.observe("load_seconds", 0.25)
+        assert server.recv(1024) == b"etl.quote_retries_total:3|c|#symbol:AI.PA"
+        assert server.recv(1024) == b"etl.load_seconds:250.000|ms"
+    finally:
+        server.close()
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import sys
+import time
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+# Ajouter le dossier racine et 'scripts_etl' au path (comme test_extract.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+from scripts_etl.pipeline import (
+    complete_stage, new_run_id, resumable_run, run_all, run_fetch, run_load, run_scrape, run_transform, stage_done,
+)
+from scripts_etl.provider_client import ProviderClient, TokenBucket
+from scripts_etl.quotes import QuoteProvider
+from scripts_etl.staging import run_dir
+
+RUN_ID = "scheduled__2024-01-02T00:00:00+00:00"
+
+
+class FlakyProvider(QuoteProvider):
+    """Faux fournisseur : les symboles de ``down`` sont indisponibles."""
+
+    def __init__(self, down=()):
+        self.down = set(down)
+        self.calls = []
+
+    def fetch_quote(self, symbol):
+        self.calls.append(symbol)
+        if symbol in self.down:
+            raise ConnectionError("indisponible")
+        return {"price": 10.0, "change": 1.0, "open": 9.5, "date": pd.Timestamp("2024-01-02 17:35")}
+
+
+COMPANIES = [{"name": f"C{i}", "symbol": f"C{i}.PA"} for i in range(5)]
+
+
+def unlimited():
+    return ProviderClient(limiter=TokenBucket(rate=0))
+
+
+def test_stages_hand_off_through_staging_and_retry_one_shard(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'etl.db'}")
+    root = str(tmp_path / "staging")
+
+    plan = asyncio.run(run_scrape(RUN_ID, companies=COMPANIES, shard_size=2, root=root))
+    assert plan["shards"] == [0, 1, 2]
+
+    # Le shard 1 (C2, C3) échoue entièrement : seul lui est à relancer
+    flaky = FlakyProvider(down={"C2.PA", "C3.PA"})
+    asyncio.run(run_fetch(RUN_ID, 0, provider=flaky, root=root))
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_fetch(RUN_ID, 1, provider=flaky, root=root))
+    asyncio.run(run_fetch(RUN_ID, 2, provider=flaky, root=root))
+    with pytest.raises(FileNotFoundError):
+        run_transform(RUN_ID, root=root)
+
+    retry = FlakyProvider()
+    asyncio.run(run_fetch(RUN_ID, 1, provider=retry, root=root))
+    assert sorted(retry.calls) == ["C2.PA", "C3.PA"]
+
+    assert run_transform(RUN_ID, root=root) == 5
+    assert run_load(RUN_ID, root=root) == 5
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'etl.db'}")
+    rows = pd.read_sql("SELECT name, price FROM stock_prices ORDER BY name", engine)
+    engine.dispose()
+    assert rows["name"].tolist() == [f"C{i}" for i in range(5)]
+    assert rows["price"].tolist() == [10.0] * 5
+
+
+def test_rerun_resumes_from_the_first_incomplete_unit(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'etl.db'}")
+    root = str(tmp_path / "staging")
+    run = dict(companies=COMPANIES, shard_size=2, root=root)
+
+    # Premier essai : le shard 1 échoue, les shards 0 et 2 sont conservés
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_all(provider=FlakyProvider(down={"C2.PA", "C3.PA"}), client=unlimited(), **run))
+    run_id = resumable_run("extract", root)
+    assert stage_done(run_id, "scrape", root) and not stage_done(run_id, "fetch", root)
+
+    # La relance reprend le même run et ne récupère que le shard manquant
+    retry = FlakyProvider()
+    summary = asyncio.run(run_all(provider=retry, client=unlimited(), **run))
+    assert summary == {"run_id": run_id, "fetched": 1, "rows": 5}
+    assert sorted(retry.calls) == ["C2.PA", "C3.PA"]
+    assert resumable_run("extract", root) is None
+
+    # Étapes terminées : relancées seules, elles ne refont rien ; un shard rechargé
+    # invalide transform et load
+    assert run_transform(run_id, root=root) == 5
+    asyncio.run(run_fetch(run_id, 0, provider=FlakyProvider(), root=root, restart=True))
+    assert not stage_done(run_id, "transform", root) and not stage_done(run_id, "load", root)
+
+
+def test_completed_or_stale_runs_are_not_resumed(tmp_path):
+    root = str(tmp_path / "staging")
+    complete_stage("extract-20240102T090000", "scrape", root)
+    assert resumable_run("extract", root) == "extract-20240102T090000"
+    assert resumable_run("extract", root, max_age=3600, now=time.time() + 7200) is None
+
+    complete_stage("extract-20240102T090000", "load", root, rows=5)
+    assert resumable_run("extract", root) is None
+
+    # Scrape jamais terminé (pas de checkpoint) : l'âge du run est celui de son dossier
+    base = run_dir("extract-20240103T090000", root)
+    os.makedirs(os.path.join(base, "companies"))
+    assert resumable_run("extract", root) == "extract-20240103T090000"
+    os.utime(base, (time.time() - 7 * 3600,) * 2)
+    assert resumable_run("extract", root) is None
+    assert new_run_id("extract", now=0).startswith("extract-1970")
+
+
+def test_extract_without_checkpoint_runs_in_memory(tmp_path, monkeypatch):
+    """ETL_CHECKPOINT=0 : scrape, fetch, transform et load d'un seul bloc (spans de chaque étape)."""
+    import scripts_etl.extract as extract_module
+    import metrics as metrics_module  # Import "à plat", comme extract.py
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'etl.db'}")
+    monkeypatch.setattr(extract_module, "CHECKPOINT", False)
+
+    async def companies():
+        return COMPANIES
+
+    async def prices(companies):
+        return [{"name": c["name"], **FlakyProvider().fetch_quote(c["symbol"])} for c in companies]
+
+    monkeypatch.setattr(extract_module, "get_companies", companies)
+    monkeypatch.setattr(extract_module, "get_stock_prices", prices)
+    registry = metrics_module.Metrics([metrics_module.NullSink()], job="test")
+    previous = metrics_module.set_metrics(registry)
+    try:
+        asyncio.run(extract_module.main())
+    finally:
+        metrics_module.set_metrics(previous)
+
+    assert registry.total("scrape_rows_total") == registry.total("load_rows_total") == 5
+
@@ -0,0 +1,199 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Ajouter le dossier racine et 'scripts_etl' au path (comme test_extract.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+# Imports "à plat", comme les modules de l'ETL : les classes d'exception sont les mêmes
+from provider_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ProviderClient,
+    RateLimitError,
+    TokenBucket,
+    backoff_delay,
+    is_permanent,
+    is_transient,
+)
+from quotes import QuoteProvider, fetch_quotes
+
+
+class ThrottlingProvider(QuoteProvider):
+    """
+    Faux fournisseur hors-ligne qui refuse les requêtes (429) et répond avec latence.
+
+    ``throttled(n)`` indique si le n-ième appel (à partir de 0) est refusé ;
+    ``retry_after`` est transmis avec chaque refus.
+    """
+
+    def __init__(self, throttled=lambda n: False, latency=0.0, retry_after=None):
+        self.throttled = throttled
+        self.latency = latency
+        self.retry_after = retry_after
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def fetch_quote(self, symbol):
+        with self._lock:
+            number = len(self.calls)
+            self.calls.append((symbol, time.monotonic()))
+        time.sleep(self.latency)
+        if self.throttled(number):
+            raise RateLimitError(retry_after=self.retry_after)
+        return {"price": 100.0, "change": 1.0, "open": 99.0, "date": "2024-01-02"}
+
+
+def _companies(count):
+    return [{"name": f"C{i}", "symbol": f"C{i}.PA"} for i in range(count)]
+
+
+def test_token_bucket_paces_concurrent_callers():
+    async def scenario():
+        bucket = TokenBucket(rate=50, burst=5)
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(15)))
+        return time.monotonic() - start
+
+    # 5 jetons en réserve, puis 10 au rythme de 50/s : au moins 0.2s
+    assert 0.18 <= asyncio.run(scenario()) < 1.0
+
+
+def test_backoff_is_jittered_and_capped():
+    delays = [backoff_delay(attempt, base=0.1, cap=0.5) for attempt in range(8) for _ in range(20)]
+    assert all(0 <= delay <= 0.5 for delay in delays)
+    assert len(set(delays)) > 100
+
+
+def test_transient_errors():
+    assert is_transient(RateLimitError())
+    assert is_transient(ConnectionError())
+    assert is_transient(asyncio.TimeoutError())
+    assert not is_transient(KeyError("regularMarketPrice"))
+    assert is_permanent(KeyError("regularMarketPrice"))
+
+
+class CurlConnectionError(OSError):
+    """Comme curl_cffi.requests.exceptions.ConnectionError (RequestException -> CurlError -> OSError)."""
+
+
+class HTTPStatusError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.response = type("Response", (), {"status_code": status, "headers": {}})()
+
+
+def test_http_client_errors_are_classified():
+    requests = pytest.importorskip("requests")
+    assert is_transient(requests.exceptions.ConnectionError("connexion refusée"))
+    assert is_transient(requests.exceptions.ReadTimeout())
+    assert is_transient(CurlConnectionError("Failed to connect"))
+    assert is_transient(HTTPStatusError(503)) and not is_permanent(HTTPStatusError(503))
+    assert is_permanent(HTTPStatusError(404)) and not is_transient(HTTPStatusError(404))
+
+
+def test_network_outage_is_retried_and_trips_the_breaker():
+    calls = []
+
+    async def attempt():
+        calls.append(1)
+        raise CurlConnectionError("Failed to connect to query2.finance.yahoo.com: Connection refused")
+
+    client = ProviderClient(
+        limiter=TokenBucket(rate=0),
+        breaker=CircuitBreaker(threshold=0.5, window=10, min_calls=4, cooldown=60),
+        retries=2,
+        backoff_base=0,
+    )
+
+    async def scenario():
+        for _ in range(20):
+            with pytest.raises((CurlConnectionError, CircuitOpenError)):
+                await client.call(attempt)
+
+    asyncio.run(scenario())
+    # Relancé (3 tentatives par appel) puis plus appelé du tout une fois le disjoncteur ouvert
+    assert 4 <= len(calls) <= 6
+    assert client.breaker.state == "open"
+
+
+def test_429s_are_retried_with_backoff():
+    # Un appel sur deux est refusé : chaque ticker finit par avoir son cours
+    provider = ThrottlingProvider(throttled=lambda n: n % 2 == 0, latency=0.01)
+    client = ProviderClient(
+        limiter=TokenBucket(rate=0), breaker=CircuitBreaker(threshold=0.9), retries=3, backoff_base=0.01,
+    )
+
+    records = asyncio.run(fetch_quotes(_companies(6), provider=provider, concurrency=3, client=client))
+
+    assert all(record["price"] == 100.0 for record in records)
+    assert len(provider.calls) > 6
+
+
+def test_retry_after_pauses_every_caller():
+    # Le premier appel est refusé avec Retry-After : aucun autre appel ne part pendant ce délai
+    provider = ThrottlingProvider(throttled=lambda n: n == 0, retry_after=0.3)
+    client = ProviderClient(limiter=TokenBucket(rate=1000, burst=1), retries=2, backoff_base=0)
+
+    records = asyncio.run(fetch_quotes(_companies(4), provider=provider, concurrency=1, client=client))
+
+    assert all(record["price"] == 100.0 for record in records)
+    first, second = provider.calls[0][1], provider.calls[1][1]
+    assert second - first >= 0.28
+
+
+def test_breaker_fails_fast_once_provider_rejects_everything():
+    provider = ThrottlingProvider(throttled=lambda n: True, latency=0.01)
+    client = ProviderClient(
+        limiter=TokenBucket(rate=0),
+        breaker=CircuitBreaker(threshold=0.5, window=10, min_calls=4, cooldown=60),
+        retries=2,
+        backoff_base=0.001,
+    )
+
+    start = time.perf_counter()
+    records = asyncio.run(fetch_quotes(_companies(40), provider=provider, concurrency=2, client=client))
+
+    assert all(record["price"] == "N/A" for record in records)
+    # Sans disjoncteur : 40 tickers x 3 tentatives ; ici l'essentiel n'est jamais appelé
+    assert len(provider.calls) < 10
+    assert time.perf_counter() - start < 1.0
+    assert client.breaker.state == "open"
+
+
+def test_breaker_half_open_probe_closes_on_success():
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=0.5, window=4, min_calls=2, cooldown=10, clock=lambda: now[0])
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now[0] = 11.0
+    breaker.before_call()  # appel d'essai autorisé
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # un seul essai à la fois
+    breaker.record(True)
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_non_transient_errors_are_not_retried():
+    calls = []
+
+    async def attempt():
+        calls.append(1)
+        raise KeyError("symbole inconnu")
+
+    client = ProviderClient(limiter=TokenBucket(rate=0), retries=3, backoff_base=0)
+    with pytest.raises(KeyError):
+        asyncio.run(client.call(attempt))
+    assert len(calls) == 1
+    assert client.breaker.state == "closed"
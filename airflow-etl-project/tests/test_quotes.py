@@ -0,0 +1,114 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Ajouter le dossier racine et 'scripts_etl' au path (comme test_extract.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+from scripts_etl.quotes import QuoteProvider, fetch_quotes
+
+
+class FakeSlowProvider(QuoteProvider):
+    """Faux fournisseur hors-ligne : latence injectable et suivi des appels simultanés."""
+
+    def __init__(self, latency=0.05, slow_symbols=(), supports_batch=False):
+        self.latency = latency
+        self.slow_symbols = set(slow_symbols)
+        self.supports_batch = supports_batch
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _quote(self, symbol):
+        return {"price": 100.0, "change": 1.0, "open": 99.0, "date": "2024-01-02"}
+
+    def fetch_quote(self, symbol):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(1.0 if symbol in self.slow_symbols else self.latency)
+            return self._quote(symbol)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def fetch_batch(self, symbols):
+        self.batches.append(list(symbols))
+        return {symbol: self._quote(symbol) for symbol in symbols}
+
+
+def _companies(count):
+    return [{"name": f"C{i}", "sector": "Test"} for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_fetch_quotes_is_concurrent_and_bounded():
+    provider = FakeSlowProvider(latency=0.1)
+
+    start = time.perf_counter()
+    records = await fetch_quotes(_companies(12), provider=provider, concurrency=4, timeout=5)
+    elapsed = time.perf_counter() - start
+
+    assert [r["name"] for r in records] == [f"C{i}" for i in range(12)]
+    assert all(r["price"] == 100.0 for r in records)
+    assert provider.max_in_flight <= 4
+    # 12 appels de 0.1s en série prendraient 1.2s
+    assert elapsed < 0.8
+
+
+@pytest.mark.asyncio
+async def test_fetch_quotes_timeout_yields_na_row():
+    provider = FakeSlowProvider(latency=0.01, slow_symbols={"C1.PA"})
+
+    records = await fetch_quotes(_companies(3), provider=provider, concurrency=3, timeout=0.2)
+
+    assert records[1] == {"name": "C1", "price": "N/A", "change": "N/A", "open": "N/A", "date": "N/A"}
+    assert records[0]["price"] == 100.0
+    assert records[2]["price"] == 100.0
+
+
+@pytest.mark.asyncio
+async def test_fetch_quotes_uses_batches_when_supported():
+    provider = FakeSlowProvider(supports_batch=True)
+
+    records = await fetch_quotes(_companies(5), provider=provider, batch_size=2)
+
+    assert [len(batch) for batch in provider.batches] == [2, 2, 1]
+    assert len(records) == 5
+    assert all(r["open"] == 99.0 for r in records)
+
+
+class PartialBatchProvider(FakeSlowProvider):
+    """Lot réussi auquel il manque des symboles (ex: yf.download sans données pour un ticker)."""
+
+    def __init__(self, absent):
+        super().__init__(latency=0.0, supports_batch=True)
+        self.absent = set(absent)
+        self.single = []
+
+    def fetch_quote(self, symbol):
+        self.single.append(symbol)
+        return super().fetch_quote(symbol)
+
+    def fetch_batch(self, symbols):
+        batch = super().fetch_batch(symbols)
+        return {symbol: quote for symbol, quote in batch.items() if symbol not in self.absent}
+
+
+@pytest.mark.asyncio
+async def test_symbols_missing_from_a_batch_are_fetched_individually():
+    provider = PartialBatchProvider(absent={"C1.PA", "C3.PA"})
+
+    records = await fetch_quotes(_companies(4), provider=provider, batch_size=4)
+
+    assert provider.batches == [["C0.PA", "C1.PA", "C2.PA", "C3.PA"]]
+    assert sorted(provider.single) == ["C1.PA", "C3.PA"]
+    assert all(r["price"] == 100.0 for r in records)
@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pandas as pd
+
+# Ajouter le dossier racine et 'scripts_etl' au path (comme test_extract.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+from scripts_etl.schema import STOCK_HISTORY_SCHEMA, build_frame
+from scripts_etl.staging import iter_batches, read_dataset, read_json, write_dataset, write_json
+
+
+def _history(names, start, periods, close=1.0):
+    dates = pd.bdate_range(start, periods=periods)
+    rows = len(names) * periods
+    return build_frame({
+        "name": [name for name in names for _ in dates],
+        "date": list(dates) * len(names),
+        **{column: [close] * rows for column in ("open", "high", "low", "close", "adj_close")},
+        "volume": [100] * rows,
+    }, STOCK_HISTORY_SCHEMA)
+
+
+def test_json_round_trip_with_dates(tmp_path):
+    path = str(tmp_path / "plan.json")
+    write_json(path, {"date": pd.Timestamp("2024-01-02 17:35"), "shards": [0, 1]})
+    assert read_json(path) == {"date": "2024-01-02T17:35:00", "shards": [0, 1]}
+    assert os.listdir(tmp_path) == ["plan.json"]
+
+
+def test_dataset_keeps_schema_types_and_prunes_partitions(tmp_path):
+    path = str(tmp_path / "history")
+    write_dataset(path, _history(["A", "B"], "2023-12-25", 10), partition_by=("name", "year"), basename="chunk")
+    assert sorted(os.listdir(path)) == ["name=A", "name=B"]
+    assert sorted(os.listdir(os.path.join(path, "name=A"))) == ["year=2023", "year=2024"]
+
+    frame = read_dataset(path, columns=list(STOCK_HISTORY_SCHEMA))
+    assert len(frame) == 20
+    assert {column: str(frame[column].dtype) for column in frame} == dict(STOCK_HISTORY_SCHEMA)
+
+    # Projection et filtres (partition + colonne)
+    frame = read_dataset(path, columns=["name", "close"], filters=[
+        ("name", "in", ["B"]), ("year", "=", 2024), ("date", ">=", pd.Timestamp("2024-01-03")),
+    ])
+    assert list(frame.columns) == ["name", "close"]
+    assert set(frame["name"]) == {"B"} and len(frame) == 3
+
+
+def test_rewriting_a_basename_replaces_only_its_files(tmp_path):
+    path = str(tmp_path / "quotes")
+    write_dataset(path, _history(["A"], "2024-01-01", 3), basename="shard-000")
+    write_dataset(path, _history(["B"], "2024-01-01", 3), basename="shard-001")
+    # Nouvelle tentative du shard 0 : ses anciens fichiers disparaissent
+    write_dataset(path, _history(["A"], "2024-01-02", 2, close=2.0), basename="shard-000")
+
+    frame = read_dataset(path, columns=["name", "date", "close"])
+    assert len(frame) == 5
+    assert frame.loc[frame["name"] == "A", "close"].tolist() == [2.0, 2.0]
+
+
+def test_iter_batches_bounds_batch_size(tmp_path):
+    path = str(tmp_path / "history")
+    write_dataset(path, _history(["A", "B", "C"], "2024-01-01", 50), partition_by=("name",))
+
+    batches = list(iter_batches(path, columns=["name", "date"], batch_rows=20))
+    assert all(len(batch) <= 20 for batch in batches)
+    assert sum(len(batch) for batch in batches) == 150
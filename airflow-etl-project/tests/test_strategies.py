@@ -0,0 +1,102 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# Ajouter le dossier racine et 'scripts_etl' au path (comme test_extract.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+from scripts_etl.extract import CompanyScraper
+from scripts_etl.strategies import Strategy, StrategyRunner, build_strategies
+
+COMPANIES = [{"name": f"E{i}", "sector": "S"} for i in range(5)]
+
+
+def slow(delay, result=COMPANIES):
+    """Fabrique une fausse stratégie asynchrone qui répond après ``delay`` secondes."""
+    async def strategy():
+        await asyncio.sleep(delay)
+        return result
+    return strategy
+
+
+@pytest.mark.asyncio
+async def test_race_takes_first_valid_result_and_cancels_others():
+    runner = StrategyRunner(
+        [Strategy("lente", slow(5)), Strategy("rapide", slow(0.05))],
+        mode="race",
+        min_rows=3,
+    )
+
+    start = time.perf_counter()
+    companies = await runner.run()
+
+    assert companies == COMPANIES
+    assert runner.winner == "rapide"
+    assert time.perf_counter() - start < 1
+    assert ("lente", pytest.approx(0.05, abs=0.5), "annulée") in runner.timings
+
+
+@pytest.mark.asyncio
+async def test_sequential_skips_implausible_and_late_results():
+    def too_short():
+        return COMPANIES[:1]
+
+    runner = StrategyRunner(
+        [
+            Strategy("incomplete", too_short),
+            Strategy("hors_delai", slow(1), deadline=0.05),
+            Strategy("valide", slow(0)),
+        ],
+        mode="sequential",
+        min_rows=3,
+    )
+
+    companies = await runner.run()
+
+    assert companies == COMPANIES
+    assert runner.winner == "valide"
+    assert [status.split(" ")[0] for _, _, status in runner.timings] == ["rejetée", "délai", "ok"]
+
+
+@pytest.mark.asyncio
+async def test_hedged_starts_backup_after_delay():
+    runner = StrategyRunner(
+        [Strategy("bloquee", slow(5)), Strategy("secours", slow(0))],
+        mode="hedged",
+        min_rows=3,
+        hedge_delay=0.1,
+    )
+
+    assert await runner.run() == COMPANIES
+    assert runner.winner == "secours"
+
+
+def test_registry_builds_selected_strategies_in_order():
+    scraper = CompanyScraper(url="http://localhost/")
+
+    strategies = build_strategies(scraper, "httpx, requests")
+
+    assert [strategy.name for strategy in strategies] == ["httpx", "requests"]
+    assert strategies[1].func == scraper.scrape_requests and strategies[1].deadline == 15
+    with pytest.raises(ValueError):
+        build_strategies(scraper, ["requests", "selenium"])
+
+
+def test_requests_strategy_has_a_request_timeout(monkeypatch):
+    requests = pytest.importorskip("requests")
+    calls = []
+
+    def unreachable(url, **kwargs):
+        calls.append(kwargs)
+        raise requests.Timeout("délai dépassé")
+
+    monkeypatch.setattr(requests, "get", unreachable)
+
+    # Le thread de la stratégie n'attend pas la page au-delà du délai de la stratégie
+    assert CompanyScraper(url="http://localhost/").scrape_requests() == []
+    assert calls[0]["timeout"] == 15
@@ -0,0 +1,219 @@
+import asyncio
+import gc
+import os
+import sys
+import tracemalloc
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+# Ajouter le dossier racine et 'scripts_etl' au path (comme test_extract.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+from scripts_etl.db import LoadListener, read_watermark
+from scripts_etl.load import load_to_postgresql
+from scripts_etl.quotes import QuoteProvider
+from scripts_etl.stream import next_slot, session_end, stream
+
+COMPANIES = [{"name": f"C{i}", "symbol": f"C{i}.PA"} for i in range(5)]
+
+
+class RandomWalkProvider(QuoteProvider):
+    """Faux fournisseur : un nouveau cours par relevé (une minute plus tard), ou figé."""
+
+    supports_batch = True
+
+    def __init__(self, frozen=False):
+        self.frozen = frozen
+        self.ticks = 0
+
+    def fetch_batch(self, symbols):
+        if not self.frozen:
+            self.ticks += 1
+        date = pd.Timestamp("2024-01-02 09:00") + pd.Timedelta(minutes=self.ticks)
+        return {
+            symbol: {"price": 100.0 + self.ticks * 0.25 + i, "change": 0.5, "open": 100.0, "date": date}
+            for i, symbol in enumerate(symbols)
+        }
+
+
+async def no_wait(delay):
+    pass
+
+
+@pytest.fixture
+def db_url(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'stream.db'}"
+    monkeypatch.setenv("DATABASE_URL", url)
+    return url
+
+
+def _count(db_url):
+    engine = create_engine(db_url)
+    with engine.connect() as conn:
+        count = conn.execute(text("SELECT COUNT(*) FROM stock_prices")).scalar()
+    engine.dispose()
+    return count
+
+
+def test_micro_batches_write_only_new_quotes(db_url):
+    provider = RandomWalkProvider()
+    summary = asyncio.run(stream(COMPANIES, provider=provider, interval=60, max_batches=4, sleep=no_wait))
+
+    assert summary["batches"] == 4 and summary["rows"] == 20 and summary["written"] == 20
+    assert _count(db_url) == 20
+
+    # Cours inchangés : les relevés suivants n'écrivent rien (ni notification)
+    provider.frozen = True
+    summary = asyncio.run(stream(COMPANIES, provider=provider, interval=60, max_batches=3, sleep=no_wait))
+    assert summary["written"] == 0 and _count(db_url) == 20
+
+
+def test_failed_batch_does_not_stop_the_session(db_url, monkeypatch):
+    import scripts_etl.stream as stream_module
+
+    calls = []
+
+    def flaky_load(frame, table_name, mode, **options):
+        calls.append(len(frame))
+        if len(calls) == 2:
+            raise ConnectionError("base indisponible")
+        return load_to_postgresql(frame, table_name, mode, **options)
+
+    monkeypatch.setattr(stream_module, "load_to_postgresql", flaky_load)
+    summary = asyncio.run(stream(COMPANIES, provider=RandomWalkProvider(), interval=60, max_batches=3, sleep=no_wait))
+
+    assert summary["batches"] == 3 and summary["failed"] == 1
+    assert _count(db_url) == 10
+
+
+def test_serving_tables_are_refreshed_on_a_timer(db_url):
+    # Horloge factice avancée par l'attente : relevés à t = 0, 1, ..., 5 secondes
+    now = [0.0]
+
+    async def advance(delay):
+        now[0] += delay
+
+    asyncio.run(stream(
+        COMPANIES, provider=RandomWalkProvider(), interval=1.0, max_batches=6, serving_interval=2.5,
+        clock=lambda: now[0], sleep=advance,
+    ))
+
+    # Un filigrane par relevé ; tables de service rafraîchies avec les relevés de t = 0 et
+    # t = 3, puis en fin de séance pour les deux derniers (un filigrane de plus)
+    assert read_watermark("stock_prices") == {**read_watermark("stock_prices"), "version": 6 + 1, "rows_loaded": 10}
+    engine = create_engine(db_url)
+    latest = pd.read_sql("SELECT price FROM stock_prices_latest ORDER BY name", engine)
+    engine.dispose()
+    assert latest["price"].tolist() == [100.0 + 6 * 0.25 + i for i in range(5)]
+
+
+def test_each_micro_batch_with_changes_bumps_the_watermark(db_url, monkeypatch):
+    import scripts_etl.stream as stream_module
+
+    provider = RandomWalkProvider()
+    versions = []
+
+    def load_and_read(frame, table_name, mode, **options):
+        loaded = load_to_postgresql(frame, table_name, mode, **options)
+        versions.append(read_watermark(table_name)["version"])
+        return loaded
+
+    monkeypatch.setattr(stream_module, "load_to_postgresql", load_and_read)
+    # Tables de service jamais rafraîchies en cours de séance : le filigrane avance quand même
+    asyncio.run(stream(COMPANIES, provider=provider, interval=60, max_batches=3, serving_interval=3600, sleep=no_wait))
+    assert versions == [1, 2, 3]
+
+    # Relevé inchangé : pas de nouveau filigrane
+    provider.frozen = True
+    asyncio.run(stream(COMPANIES, provider=provider, interval=60, max_batches=1, serving_interval=3600, sleep=no_wait))
+    assert versions[-1] == versions[-2]
+
+
+def test_late_batch_skips_missed_slots(db_url):
+    # Horloge factice : le deuxième relevé dure 2,5 intervalles
+    times = iter([0.0, 0.1, 0.1, 3.6, 3.7])
+    delays = []
+
+    async def record(delay):
+        delays.append(delay)
+
+    summary = asyncio.run(stream(
+        COMPANIES, provider=RandomWalkProvider(), interval=1.0, max_batches=3,
+        clock=lambda: next(times), sleep=record,
+    ))
+
+    assert summary["skipped"] == 2
+    # Calé sur la grille : 1,0 - 0,1 puis 4,0 - 3,7 (et non 1 s après la fin du relevé)
+    assert delays == pytest.approx([0.9, 0.3])
+    assert next_slot(0.0, 1.0, 0.99) == 1 and next_slot(0.0, 1.0, 1.0) == 2
+
+
+def test_session_end_is_in_market_time():
+    now = pd.Timestamp("2024-07-01 08:00", tz="UTC").to_pydatetime()
+    end = session_end("17:35", "Europe/Paris", now=now)
+
+    assert end.isoformat() == "2024-07-01T17:35:00+02:00"
+
+
+def test_memory_is_stable_across_micro_batches(db_url):
+    provider = RandomWalkProvider()
+    # Premier run : imports, engine, caches de pandas et de SQLAlchemy
+    asyncio.run(stream(COMPANIES, provider=provider, interval=60, max_batches=10, sleep=no_wait))
+
+    tracemalloc.start()
+    try:
+        asyncio.run(stream(COMPANIES, provider=provider, interval=60, max_batches=10, sleep=no_wait))
+        gc.collect()
+        warm, _ = tracemalloc.get_traced_memory()
+        asyncio.run(stream(COMPANIES, provider=provider, interval=60, max_batches=50, sleep=no_wait))
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # 50 relevés de plus ne gardent rien en mémoire (marge pour les caches internes)
+    assert after - warm < 256 * 1024
+
+
+@pytest.fixture
+def pg_url(monkeypatch):
+    db_url = os.environ.get("TEST_DATABASE_URL")
+    if not db_url:
+        pytest.skip("TEST_DATABASE_URL not configured")
+    engine = create_engine(db_url)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS stock_prices CASCADE"))
+        conn.execute(text("DROP TABLE IF EXISTS stock_prices_row_hashes"))
+    monkeypatch.setenv("DATABASE_URL", db_url)
+    yield db_url
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS stock_prices CASCADE"))
+        conn.execute(text("DROP TABLE IF EXISTS stock_prices_row_hashes"))
+    engine.dispose()
+
+
+def test_each_load_with_new_rows_is_notified(pg_url):
+    listener = LoadListener(pg_url, timeout=0.2)
+    assert listener.start()
+    try:
+        assert listener.listening.wait(10)
+        provider = RandomWalkProvider()
+
+        asyncio.run(stream(COMPANIES, provider=provider, max_batches=1, sleep=no_wait))
+        assert listener.wait("stock_prices", 0, timeout=10)
+
+        # Relevé sans changement : pas de notification, le dashboard ne se relance pas
+        provider.frozen = True
+        asyncio.run(stream(COMPANIES, provider=provider, max_batches=1, sleep=no_wait))
+        assert not listener.wait("stock_prices", 1, timeout=1)
+        assert listener.version("stock_prices") == 1
+    finally:
+        listener.stop()
+
+
+def test_listener_is_disabled_without_postgresql():
+    assert not LoadListener("sqlite:///:memory:").start()
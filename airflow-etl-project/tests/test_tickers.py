@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+
+# Ajouter le dossier racine et 'scripts_etl' au path (comme test_extract.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+from scripts_etl.tickers import TickerIndex, normalize_name
+
+
+class CountingResolver:
+    """Faux résolveur : connaît quelques symboles et compte les appels."""
+
+    def __init__(self, known):
+        self.known = known
+        self.calls = []
+
+    def __call__(self, company):
+        self.calls.append(company["name"])
+        return self.known.get(company["name"])
+
+
+def _index(tmp_path, resolver, overrides=None):
+    overrides_path = tmp_path / "overrides.json"
+    overrides_path.write_text(json.dumps(overrides or {}), encoding="utf-8")
+    return TickerIndex.load(
+        path=str(tmp_path / "tickers.json"),
+        overrides_path=str(overrides_path),
+        resolver=resolver,
+    )
+
+
+def test_normalize_name_ignores_accents_and_punctuation():
+    assert normalize_name("L'Oréal") == normalize_name("l oreal") == "l oreal"
+
+
+def test_refresh_only_resolves_unknown_companies(tmp_path):
+    resolver = CountingResolver({"Air Liquide": "AI.PA"})
+    companies = [{"name": "Air Liquide"}, {"name": "Inconnue"}, {"name": "L'Oréal"}]
+
+    index = _index(tmp_path, resolver, overrides={"L'OREAL": "OR.PA"})
+    index.refresh(companies)
+    resolved = index.resolve(companies)
+
+    assert resolver.calls == ["Air Liquide", "Inconnue"]
+    assert [(c["name"], c["symbol"]) for c in resolved] == [("Air Liquide", "AI.PA"), ("L'Oréal", "OR.PA")]
+
+    # Au run suivant, l'index est relu depuis le disque : aucun nouvel appel
+    reloaded = _index(tmp_path, resolver, overrides={"L'OREAL": "OR.PA"})
+    reloaded.refresh(companies)
+    assert resolver.calls == ["Air Liquide", "Inconnue"]
+    assert reloaded.lookup({"name": "AIR LIQUIDE"}) == "AI.PA"
+
+
+def test_failed_lookup_is_retried_next_run(tmp_path):
+    resolver = CountingResolver({"Air Liquide": "AI.PA"})
+
+    def flaky(company):
+        if company["name"] == "Air Liquide":
+            raise ConnectionError("recherche indisponible")
+        return resolver(company)
+
+    companies = [{"name": "Air Liquide"}, {"name": "Inconnue"}]
+    _index(tmp_path, flaky).refresh(companies)
+
+    # Erreur de recherche : rien d'enregistré, contrairement à une entreprise introuvable
+    reloaded = _index(tmp_path, resolver)
+    assert reloaded.needs_resolution({"name": "Air Liquide"})
+    assert not reloaded.needs_resolution({"name": "Inconnue"})
+    assert reloaded.refresh(companies) == 1 and reloaded.lookup({"name": "Air Liquide"}) == "AI.PA"
+
+
+def test_lookup_prefers_isin(tmp_path):
+    index = _index(tmp_path, CountingResolver({"TotalEnergies": "TTE.PA"}))
+    index.refresh([{"name": "TotalEnergies", "isin": "FR0014000MR3"}])
+
+    assert index.lookup({"name": "Total", "isin": "FR0014000MR3"}) == "TTE.PA"
@@ -46,4 +46,24 @@ def test_transform_basic():
     result_df = transform(test_dict)
 
     # Vérifier que le résultat correspond à ce qui est attendu
-    assert_frame_equal(result_df, expected_df)
\ No newline at end of file
+    assert_frame_equal(result_df, expected_df)
+
+
+def test_transform_records_with_missing_values():
+    """Les enregistrements de l'extract ('N/A', Timestamps) donnent un DataFrame typé."""
+    records = [
+        {"name": "Air Liquide", "price": 170.5, "change": "N/A", "open": 169.0, "date": pd.Timestamp("2024-01-02 17:35")},
+        {"name": "Airbus", "price": "N/A", "change": -0.4, "open": "N/A", "date": "N/A"},
+    ]
+
+    result_df = transform(records)
+
+    assert result_df.dtypes.astype(str).to_dict() == {
+        "name": "category",
+        "price": "float64",
+        "change": "float64",
+        "open": "float64",
+        "date": "datetime64[ns]",
+    }
+    assert result_df["price"].isna().tolist() == [False, True]
+    assert result_df["date"].isna().tolist() == [False, True]
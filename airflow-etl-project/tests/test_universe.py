@@ -0,0 +1,140 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Ajouter le dossier racine et 'scripts_etl' au path (comme test_extract.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts_etl"))
+
+import scripts_etl.universe as universe_module
+from scripts_etl.universe import INDEX_REGISTRY, merge_companies, scrape_universe, selected_indices
+
+FIXTURE = os.path.join(PROJECT_ROOT, "benchmarks", "fixtures", "cac40.html")
+LATENCY = 0.3
+
+
+def _table(headers, rows):
+    cells = "".join(f"<th>{header}</th>" for header in headers)
+    body = "".join("<tr>" + "".join(f"<td>{value}</td>" for value in row) + "</tr>" for row in rows)
+    return f"<html><body><table class='wikitable'><tr>{cells}</tr>{body}</table></body></html>"
+
+
+# Pages locales : le SBF 120 reprend des entreprises du CAC 40, l'Euro Stoxx 50 en
+# affiche une sans ISIN (dédoublonnée par son nom)
+PAGES = {
+    "/cac40": open(FIXTURE, encoding="utf-8").read(),
+    "/sbf120": _table(
+        ["Entreprise", "Secteur", "Code ISIN", "Mnémo"],
+        [["Accor", "Hôtellerie", "FR0000120404", "AC"], ["Alstom", "Industrie", "FR0010220475", "ALO"]],
+    ),
+    "/dax": _table(
+        ["Logo", "Company", "Prime Standard Sector", "Ticker"],
+        [["", "Adidas", "Apparel", "ADS"], ["", "SAP", "Software", "SAP"]],
+    ),
+    "/eurostoxx50": _table(
+        ["Name", "Sector", "Ticker"],
+        [["Air Liquide", "Chemicals", "AI.PA"], ["ASML Holding", "Technology", "ASML.AS"]],
+    ),
+}
+
+
+class PageServer(ThreadingHTTPServer):
+    """Serveur HTTP/1.1 local : chaque page répond après LATENCY secondes."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        self.ports = set()
+        super().__init__(("127.0.0.1", 0), PageHandler)
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Connexions keep-alive
+
+    def do_GET(self):
+        self.server.ports.add(self.client_address[1])
+        time.sleep(LATENCY)
+        body = PAGES.get(self.path, "").encode("utf-8")
+        self.send_response(200 if body else 404)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def pages(tmp_path, monkeypatch):
+    """Indices du registre redirigés vers le serveur local, caches dans tmp_path."""
+    server = PageServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(universe_module, "CACHE_DIR", str(tmp_path))
+    local = {name: page._replace(url=f"{base}/{name.lower()}") for name, page in INDEX_REGISTRY.items()}
+    yield server, local
+    server.shutdown()
+    server.server_close()
+
+
+def test_selected_indices():
+    assert [page.name for page in selected_indices("cac40, DAX,cac40")] == ["CAC40", "DAX"]
+    assert [page.name for page in selected_indices(["SBF120"])] == ["SBF120"]
+    with pytest.raises(ValueError):
+        selected_indices("CAC40,NIKKEI")
+
+
+def test_merge_by_isin_then_name():
+    merged = merge_companies([
+        [{"name": "Air Liquide", "isin": "FR0000120073", "indices": ["CAC40"]}],
+        [{"name": "AIR LIQUIDE", "symbol": "AI.PA", "indices": ["EUROSTOXX50"]}],
+        [{"name": "Air Liquide SA", "isin": "FR0000120073", "indices": ["SBF120"]}],
+    ])
+
+    assert len(merged) == 1
+    assert merged[0]["indices"] == ["CAC40", "EUROSTOXX50", "SBF120"]
+    assert merged[0]["symbol"] == "AI.PA"
+
+
+def test_indices_are_scraped_concurrently(pages):
+    server, local = pages
+    start = time.perf_counter()
+    companies = asyncio.run(scrape_universe(list(local.values())))
+    elapsed = time.perf_counter() - start
+
+    # Les 4 pages sont téléchargées en même temps, sur un seul client
+    assert elapsed < len(local) * LATENCY
+    assert len(server.ports) <= len(local)
+
+    by_name = {company["name"]: company for company in companies}
+    assert len(by_name) == len(companies) == 40 + 1 + 2 + 1
+    assert by_name["Accor"]["indices"] == ["CAC40", "SBF120"]
+    assert by_name["Accor"]["symbol"] == "AC.PA"
+    assert by_name["Air Liquide"]["indices"] == ["CAC40", "EUROSTOXX50"]
+    assert by_name["Alstom"]["indices"] == ["SBF120"]
+    # Suffixe de la place de l'indice, ou symbole complet affiché par la page
+    assert by_name["Adidas"]["symbol"] == "ADS.DE" and by_name["Adidas"]["exchange"] == "GER"
+    assert by_name["ASML Holding"]["symbol"] == "ASML.AS"
+
+
+def test_failed_index_uses_its_cache(pages, monkeypatch):
+    server, local = pages
+    first = asyncio.run(scrape_universe([local["CAC40"]]))
+    assert len(first) == 40
+
+    # Cache frais : aucune requête
+    requests = len(server.ports)
+    assert asyncio.run(scrape_universe([local["CAC40"]])) == first
+    assert len(server.ports) == requests
+
+    # Cache expiré et page en erreur : la liste expirée plutôt qu'un indice absent
+    monkeypatch.setattr(universe_module.ConstituentCache, "is_fresh", lambda self, entry: False)
+    monkeypatch.setitem(PAGES, "/cac40", "")
+    assert asyncio.run(scrape_universe([local["CAC40"]])) == first